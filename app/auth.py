@@ -1,12 +1,19 @@
 """Authentication and API key management for vibe-llm"""
 import os
+import re
+import math
+import time
 import hashlib
 import hmac
-from typing import Optional
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
 from fastapi import HTTPException, Security, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from datetime import datetime, timedelta, timezone
 import jwt
+from .concurrency import run_blocking
+from .state_store import MemoryStateStore
 
 security = HTTPBearer()
 
@@ -14,22 +21,31 @@ class AuthManager:
     def __init__(self):
         self.master_key = os.getenv("VIBE_LLM_MASTER_KEY", "your-secure-master-key-here")
         self.jwt_secret = os.getenv("VIBE_LLM_JWT_SECRET", "your-jwt-secret-here")
+        # Keys are indexed by their SHA-256 digest; plaintext keys are not kept in memory
         self.valid_api_keys = self._load_api_keys()
+        self.token_cache = OrderedDict()  # JWT -> (payload, exp); LRU of already-verified tokens
+        self.token_cache_size = int(os.getenv("VIBE_LLM_TOKEN_CACHE_SIZE", "1024"))
+        self.token_cache_lock = threading.Lock()
+
+    @staticmethod
+    def _digest(api_key: str) -> bytes:
+        return hashlib.sha256(api_key.encode()).digest()
     
     def _load_api_keys(self) -> dict:
         """Load API keys from environment or config"""
         keys = {}
         
-        # Load from environment variables
-        for i in range(1, 10):  # Support up to 9 client keys
-            key_name = f"VIBE_LLM_CLIENT_KEY_{i}"
-            client_name = f"VIBE_LLM_CLIENT_NAME_{i}"
-            
-            key = os.getenv(key_name)
-            name = os.getenv(client_name, f"client_{i}")
+        # Load from environment variables: any number of VIBE_LLM_CLIENT_KEY_<n> / VIBE_LLM_CLIENT_NAME_<n> pairs
+        for env_name in sorted(os.environ):
+            match = re.fullmatch(r"VIBE_LLM_CLIENT_KEY_(\d+)", env_name)
+            if not match:
+                continue
+            i = match.group(1)
+            key = os.environ[env_name]
+            name = os.getenv(f"VIBE_LLM_CLIENT_NAME_{i}", f"client_{i}")
             
             if key:
-                keys[key] = {
+                keys[self._digest(key)] = {
                     "name": name,
                     "created_at": datetime.now(),
                     "permissions": ["chat", "content", "admin"],  # Default permissions
@@ -37,7 +53,7 @@ class AuthManager:
                 }
         
         # Add master key
-        keys[self.master_key] = {
+        keys[self._digest(self.master_key)] = {
             "name": "master",
             "created_at": datetime.now(),
             "permissions": ["*"],  # All permissions
@@ -48,15 +64,15 @@ class AuthManager:
     
     def verify_api_key(self, api_key: str) -> Optional[dict]:
         """Verify API key and return client info"""
-        if api_key in self.valid_api_keys:
-            return self.valid_api_keys[api_key]
-        return None
+        # Looking up the SHA-256 digest makes timing independent of how much of the key matches
+        return self.valid_api_keys.get(self._digest(api_key))
     
     def create_jwt_token(self, client_info: dict, expires_hours: int = 24) -> str:
         """Create JWT token for authenticated client"""
         payload = {
             "client_name": client_info["name"],
             "permissions": client_info["permissions"],
+            "rate_limit": client_info.get("rate_limit", 1000),
             "exp": datetime.now(timezone.utc) + timedelta(hours=expires_hours),
             "iat": datetime.now(timezone.utc)
         }
@@ -64,15 +80,64 @@ class AuthManager:
     
     def verify_jwt_token(self, token: str) -> Optional[dict]:
         """Verify JWT token and return payload"""
+        now = time.time()
+        with self.token_cache_lock:
+            cached = self.token_cache.get(token)
+            if cached is not None:
+                if cached[1] > now:
+                    self.token_cache.move_to_end(token)
+                    return cached[0]
+                del self.token_cache[token]
+                return None  # Expired since it was verified
         try:
             payload = jwt.decode(token, self.jwt_secret, algorithms=["HS256"])
-            return payload
         except jwt.ExpiredSignatureError:
             return None
         except jwt.InvalidTokenError:
             return None
+        # Only tokens with an expiry are cached, and only until that expiry
+        if "exp" in payload:
+            with self.token_cache_lock:
+                self.token_cache[token] = (payload, payload["exp"])
+                while len(self.token_cache) > self.token_cache_size:
+                    self.token_cache.popitem(last=False)
+        return payload
+
+class RateLimiter:
+    """
+    Per-client sliding-window limits: at most rate_limit requests per period, counted in
+    bucket_seconds buckets in the shared state store so every worker spends the same budget.
+    Store calls block, so async callers go through run_blocking.
+    """
+    def __init__(self, store=None, period: float = 3600, bucket_seconds: float = 60):
+        self.store = store or MemoryStateStore()
+        self.period = period
+        self.bucket_seconds = bucket_seconds
+
+    def acquire(self, client_name: str, rate_limit: int) -> Tuple[bool, float]:
+        """Take one request from the window; returns (allowed, seconds until one is available)."""
+        key = f"ratelimit:{client_name}"
+        now = time.time()
+        current = int(now // self.bucket_seconds)
+        span = max(1, int(math.ceil(self.period / self.bucket_seconds)))
+        # Count first, then read back: the increment is atomic in every store, so concurrent
+        # workers never both see room for the last request
+        self.store.add(key, current, {"requests": 1}, ttl=self.period + self.bucket_seconds)
+        buckets = self.store.buckets(key, range(current - span + 1, current + 1))
+        used = sum(counts.get("requests", 0) for _, counts in buckets)
+        if used <= rate_limit:
+            return True, 0.0
+        # Refused requests do not spend the budget
+        self.store.add(key, current, {"requests": -1}, ttl=self.period + self.bucket_seconds)
+        used -= 1
+        for bucket, counts in buckets:
+            used -= counts.get("requests", 0)
+            if used < rate_limit:
+                return False, max(0.0, (bucket + span) * self.bucket_seconds - now)
+        return False, self.period
 
 auth_manager = AuthManager()
+rate_limiter = RateLimiter()
 
 async def get_current_client(credentials: HTTPAuthorizationCredentials = Security(security)) -> dict:
     """Get current authenticated client from API key or JWT token"""
@@ -89,7 +154,7 @@ async def get_current_client(credentials: HTTPAuthorizationCredentials = Securit
         return {
             "name": jwt_payload["client_name"],
             "permissions": jwt_payload["permissions"],
-            "rate_limit": 1000  # Default for JWT
+            "rate_limit": jwt_payload.get("rate_limit", 1000)  # Default for JWT
         }
     
     raise HTTPException(
@@ -107,6 +172,19 @@ async def get_admin_client(client: dict = Depends(get_current_client)) -> dict:
         )
     return client
 
+def rate_limited(dependency=get_current_client):
+    """Wrap an auth dependency so each call also spends one of the client's rate-limit tokens."""
+    async def enforce(client: dict = Depends(dependency)) -> dict:
+        allowed, retry_after = await run_blocking(rate_limiter.acquire, client["name"], client.get("rate_limit", 1000))
+        if not allowed:
+            raise HTTPException(
+                status_code=429,
+                detail="Rate limit exceeded",
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
+        return client
+    return enforce
+
 def check_permission(client: dict, permission: str) -> bool:
     """Check if client has specific permission"""
     return "*" in client["permissions"] or permission in client["permissions"]
@@ -0,0 +1,183 @@
+"""
+Process-wide pool of long-lived backend instances
+- Keeps one backend per (provider, model) so clients, model info and vLLM weights are reused
+- Bounded by an instance count and an optional memory budget, evicting least recently used
+- Records hits, misses, evictions and load times for monitoring
+- aget serves hits inline and builds missing backends on the blocking pool, off the event loop
+- Evicted backends are retired, not closed: a background thread closes each one outside the
+  pool lock once its in-flight calls (tracked with using()) have finished
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, Optional, Tuple
+from .concurrency import run_blocking
+
+class BackendPool:
+    def __init__(self, factory: Callable[[str, str], Any], max_instances: int = 8,
+                 max_memory_gb: Optional[float] = None, model_memory_gb: Optional[Dict[str, float]] = None,
+                 close_grace: float = 2.0):
+        self.factory = factory
+        self.max_instances = max_instances
+        self.max_memory_gb = max_memory_gb
+        self.model_memory_gb = model_memory_gb or {}
+        self.instances = OrderedDict()  # (provider, model) -> backend, oldest first
+        self.lock = threading.Lock()
+        self.load_locks = {}
+        self.close_grace = close_grace  # Idle seconds before a retired backend is closed
+        self.in_flight = {}  # id(backend) -> calls currently using it
+        self.retiring = []  # [(backend, retired_at)] evicted but not yet closed
+        self.retired = threading.Condition(self.lock)
+        self.closer = None
+        self.stats_data = {"hits": 0, "misses": 0, "evictions": 0, "load_errors": 0,
+                           "load_time_total": 0.0, "load_time_max": 0.0}
+
+    def _memory_of(self, key: Tuple[str, str]) -> float:
+        provider, model = key
+        return self.model_memory_gb.get(f"{provider}:{model}", 0.0)
+
+    def _memory_used(self) -> float:
+        return sum(self._memory_of(k) for k in self.instances)
+
+    def _evict_for(self, key: Tuple[str, str]):
+        # Caller holds self.lock
+        needed = self._memory_of(key)
+        while self.instances and (
+            len(self.instances) >= self.max_instances
+            or (self.max_memory_gb is not None and self._memory_used() + needed > self.max_memory_gb)
+        ):
+            old_key, backend = self.instances.popitem(last=False)
+            self.stats_data["evictions"] += 1
+            logging.info(f"[BackendPool] evicting {old_key[0]}:{old_key[1]}")
+            self._retire(backend)
+
+    def _retire(self, backend):
+        # Caller holds self.lock; closing can block for seconds (vLLM joins its scheduler), so it
+        # happens on the closer thread, once requests that already hold the backend are done
+        self.retiring.append((backend, time.monotonic()))
+        if self.closer is None or not self.closer.is_alive():
+            self.closer = threading.Thread(target=self._close_retired, name="vibe-backend-closer", daemon=True)
+            self.closer.start()
+        self.retired.notify_all()
+
+    def _close_retired(self):
+        while True:
+            with self.lock:
+                while True:
+                    now = time.monotonic()
+                    idle = [(b, t) for b, t in self.retiring
+                            if not self.in_flight.get(id(b)) and now - t >= self.close_grace]
+                    if idle:
+                        self.retiring = [r for r in self.retiring if r not in idle]
+                        break
+                    self.retired.wait(self.close_grace if self.retiring else None)
+            for backend, _ in idle:
+                self._close(backend)
+
+    @staticmethod
+    def _close(backend):
+        close = getattr(backend, "close", None)
+        if callable(close):
+            try:
+                close()
+            except Exception as e:
+                logging.warning(f"[BackendPool] error closing backend: {e}")
+
+    @contextmanager
+    def using(self, backend):
+        """Mark a call in flight on backend, so eviction does not close it underneath the call."""
+        with self.lock:
+            self.in_flight[id(backend)] = self.in_flight.get(id(backend), 0) + 1
+        try:
+            yield backend
+        finally:
+            with self.lock:
+                remaining = self.in_flight.pop(id(backend)) - 1
+                if remaining:
+                    self.in_flight[id(backend)] = remaining
+                else:
+                    self.retired.notify_all()
+
+    def get(self, provider: str, model: str):
+        """Return the pooled backend for (provider, model), building it on first use."""
+        key = (provider, model)
+        with self.lock:
+            if key in self.instances:
+                self.instances.move_to_end(key)
+                self.stats_data["hits"] += 1
+                return self.instances[key]
+            self.stats_data["misses"] += 1
+            load_lock = self.load_locks.setdefault(key, threading.Lock())
+        # Only one thread builds a given backend; others wait and then reuse it
+        with load_lock:
+            with self.lock:
+                if key in self.instances:
+                    self.instances.move_to_end(key)
+                    return self.instances[key]
+            start = time.time()
+            try:
+                backend = self.factory(provider, model)
+            except Exception:
+                with self.lock:
+                    self.stats_data["load_errors"] += 1
+                raise
+            elapsed = time.time() - start
+            with self.lock:
+                self._evict_for(key)
+                self.instances[key] = backend
+                self.stats_data["load_time_total"] += elapsed
+                self.stats_data["load_time_max"] = max(self.stats_data["load_time_max"], elapsed)
+            logging.info(f"[BackendPool] loaded {provider}:{model} in {elapsed:.2f}s")
+            return backend
+
+    def peek(self, provider: str, model: str):
+        """The pooled backend if it is already built (counted as a hit), else None."""
+        key = (provider, model)
+        with self.lock:
+            if key in self.instances:
+                self.instances.move_to_end(key)
+                self.stats_data["hits"] += 1
+                return self.instances[key]
+        return None
+
+    async def aget(self, provider: str, model: str):
+        """get() for async callers: a miss (weight loads, model info lookups) runs in the blocking pool."""
+        backend = self.peek(provider, model)
+        if backend is not None:
+            return backend
+        return await run_blocking(self.get, provider, model)
+
+    def preload(self, model_ids):
+        """Build backends for fully qualified model ids (e.g. 'vllm:llama-3') ahead of traffic."""
+        for model_id in model_ids:
+            provider, _, model = model_id.partition(":")
+            try:
+                self.get(provider, model)
+            except Exception as e:
+                logging.warning(f"[BackendPool] could not preload {model_id}: {e}")
+
+    def evict(self, provider: str, model: str) -> bool:
+        with self.lock:
+            backend = self.instances.pop((provider, model), None)
+            if backend is None:
+                return False
+            self.stats_data["evictions"] += 1
+            self._retire(backend)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            loads = self.stats_data["misses"] - self.stats_data["load_errors"]
+            return {
+                **self.stats_data,
+                "load_time_avg": self.stats_data["load_time_total"] / loads if loads > 0 else 0.0,
+                "size": len(self.instances),
+                "max_instances": self.max_instances,
+                "memory_gb": self._memory_used(),
+                "max_memory_gb": self.max_memory_gb,
+                "instances": [f"{p}:{m}" for p, m in self.instances],
+                "retiring": len(self.retiring),
+            }
@@ -0,0 +1,363 @@
+"""
+Offline batch inference compatible with the OpenAI Files/Batches API
+- Input is JSONL: {"custom_id", "method": "POST", "url": "/v1/chat/completions", "body": {...}} per line
+- Requests run under per-provider batch concurrency caps (a share of the interactive limits)
+  and wait while the model's usage quota is near its limit
+- Results and errors are appended to JSONL files that double as the checkpoint: after a
+  restart, requests whose custom_id is already recorded are skipped
+- Files and batches belong to the client that created them; other clients get KeyError (404)
+- Batch state lives on disk so every worker sees it; a runner holds an exclusive lease
+  (flock) on its batch, so with several workers each batch still runs exactly once
+- State saves, result appends and checkpoint reads run through run_blocking, never on the event loop
+"""
+
+import os
+import copy
+import json
+import fcntl
+import time
+import uuid
+import asyncio
+import logging
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from .concurrency import run_blocking
+
+SUPPORTED_ENDPOINTS = ("/v1/chat/completions", "/v1/completions")
+ACTIVE = ("validating", "in_progress", "finalizing", "cancelling")
+
+class BatchManager:
+    def __init__(self, directory: str, execute: Callable[[str, Dict[str, Any]], Awaitable[Tuple[int, Dict[str, Any]]]],
+                 classify: Callable[[Dict[str, Any]], Tuple[str, str, int]], admit: Callable[[str, int], bool],
+                 limits: Dict[str, int], quota_poll: float = 5.0, checkpoint_interval: float = 2.0):
+        self.directory = directory
+        self.files_dir = os.path.join(directory, "files")
+        self.execute = execute  # (url, body) -> (status_code, response body)
+        self.classify = classify  # body -> (provider, model, estimated tokens)
+        self.admit = admit  # (model, estimated tokens) -> whether quota leaves room now (run in a thread)
+        self.limits = limits
+        self.quota_poll = quota_poll
+        self.checkpoint_interval = checkpoint_interval
+        self.semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.running: Dict[str, Dict[str, Any]] = {}  # Batches this process holds the lease for, with live counts
+        self.tasks: Dict[str, asyncio.Task] = {}
+        os.makedirs(self.files_dir, exist_ok=True)
+
+    # Files
+
+    def file_path(self, file_id: str) -> str:
+        if not file_id.startswith("file-") or "/" in file_id or os.sep in file_id:
+            raise KeyError(file_id)
+        return os.path.join(self.files_dir, f"{file_id}.jsonl")
+
+    def _owner_path(self, file_id: str) -> str:
+        return self.file_path(file_id)[:-len(".jsonl")] + ".owner"
+
+    def _set_owner(self, file_id: str, owner: Optional[str]):
+        if owner is not None:
+            with open(self._owner_path(file_id), "w", encoding="utf-8") as f:
+                f.write(owner)
+
+    def _check_owner(self, file_id: str, owner: Optional[str]):
+        """KeyError unless owner (None = unrestricted) created the file."""
+        if owner is None:
+            return
+        try:
+            with open(self._owner_path(file_id), encoding="utf-8") as f:
+                if f.read() == owner:
+                    return
+        except OSError:
+            pass
+        raise KeyError(file_id)
+
+    def file_info(self, file_id: str, owner: Optional[str] = None, purpose: str = "batch") -> Dict[str, Any]:
+        path = self.file_path(file_id)
+        if not os.path.exists(path):
+            raise KeyError(file_id)
+        self._check_owner(file_id, owner)
+        return {"id": file_id, "object": "file", "bytes": os.path.getsize(path), "created_at": int(os.path.getmtime(path)),
+                "filename": f"{file_id}.jsonl", "purpose": purpose}
+
+    def new_file_path(self, owner: Optional[str] = None) -> Tuple[str, str]:
+        file_id = f"file-{uuid.uuid4().hex}"
+        self._set_owner(file_id, owner)
+        return file_id, self.file_path(file_id)
+
+    # Batches
+
+    def _batch_path(self, batch_id: str, suffix: str = ".json") -> str:
+        if not batch_id.startswith("batch_") or "/" in batch_id or os.sep in batch_id:
+            raise KeyError(batch_id)
+        return os.path.join(self.directory, batch_id + suffix)
+
+    @contextmanager
+    def _state_lock(self, batch_id: str):
+        # Serializes read-modify-write of one batch's state file across workers
+        with open(self._batch_path(batch_id, ".json.lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _load(self, batch_id: str) -> Dict[str, Any]:
+        try:
+            with open(self._batch_path(batch_id)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise KeyError(batch_id)
+
+    def _write(self, batch):
+        path = self._batch_path(batch["id"])
+        with open(path + f".{os.getpid()}.tmp", "w") as f:
+            json.dump(batch, f)
+        os.replace(path + f".{os.getpid()}.tmp", path)
+
+    def _save(self, batch):
+        """Write batch state, first adopting a cancel another worker recorded on disk (blocking)."""
+        with self._state_lock(batch["id"]):
+            try:
+                stored = self._load(batch["id"])
+            except KeyError:
+                stored = {}
+            if stored.get("status") == "cancelling" and batch["status"] in ("validating", "in_progress"):
+                batch.update(status="cancelling", cancelling_at=stored.get("cancelling_at"))
+            self._write(batch)
+
+    async def _asave(self, batch):
+        # The flock can wait on another worker, so save a snapshot in the blocking pool and
+        # apply any adopted cancel back on the loop, where the live batch is updated
+        snapshot = copy.deepcopy(batch)
+        await run_blocking(self._save, snapshot)
+        if snapshot["status"] == "cancelling" and batch["status"] in ("validating", "in_progress"):
+            batch.update(status="cancelling", cancelling_at=snapshot["cancelling_at"])
+
+    def _semaphore(self, provider: str) -> asyncio.Semaphore:
+        if provider not in self.semaphores:
+            self.semaphores[provider] = asyncio.Semaphore(self.limits.get(provider, 4))
+        return self.semaphores[provider]
+
+    def _validate(self, input_path: str, endpoint: str) -> Tuple[int, list]:
+        total, errors, seen = 0, [], set()
+        with open(input_path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                    custom_id = request["custom_id"]
+                    if custom_id in seen:
+                        raise ValueError(f"duplicate custom_id {custom_id}")
+                    if request.get("url", endpoint) != endpoint:
+                        raise ValueError(f"url {request.get('url')} does not match batch endpoint {endpoint}")
+                    if not isinstance(request.get("body"), dict) or not request["body"].get("model"):
+                        raise ValueError("body with a model is required")
+                    seen.add(custom_id)
+                    total += 1
+                except (ValueError, KeyError, TypeError) as e:
+                    errors.append({"code": "invalid_request", "line": line_no, "message": str(e)})
+                    if len(errors) >= 100:
+                        break
+        return total, errors
+
+    async def create(self, input_file_id: str, endpoint: str, completion_window: str = "24h",
+                     metadata: Optional[Dict[str, Any]] = None, owner: Optional[str] = None) -> Dict[str, Any]:
+        if endpoint not in SUPPORTED_ENDPOINTS:
+            raise ValueError(f"Unsupported endpoint {endpoint}; expected one of {SUPPORTED_ENDPOINTS}")
+        input_path = self.file_path(input_file_id)
+        if not os.path.exists(input_path):
+            raise KeyError(input_file_id)
+        self._check_owner(input_file_id, owner)
+        batch_id = f"batch_{uuid.uuid4().hex}"
+        now = int(time.time())
+        batch = {
+            "id": batch_id, "object": "batch", "endpoint": endpoint, "input_file_id": input_file_id,
+            "completion_window": completion_window, "status": "validating", "errors": None,
+            "output_file_id": f"file-{batch_id}-output", "error_file_id": f"file-{batch_id}-errors",
+            "created_at": now, "in_progress_at": None, "completed_at": None, "failed_at": None,
+            "finalizing_at": None, "cancelling_at": None, "cancelled_at": None,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0}, "metadata": metadata or {},
+            "owner": owner,
+        }
+        for file_id in (batch["output_file_id"], batch["error_file_id"]):
+            await run_blocking(self._set_owner, file_id, owner)
+        total, errors = await run_blocking(self._validate, input_path, endpoint)
+        if errors:
+            batch.update(status="failed", failed_at=now, errors={"object": "list", "data": errors})
+        else:
+            batch["request_counts"]["total"] = total
+        await run_blocking(self._save, batch)
+        if batch["status"] == "validating":
+            self.start(batch_id)
+        return batch
+
+    def get(self, batch_id: str, owner: Optional[str] = None) -> Dict[str, Any]:
+        # A batch running here has fresher counts than its last checkpoint; anything else is read from disk
+        batch = self.running.get(batch_id) or self._load(batch_id)
+        if owner is not None and batch.get("owner") != owner:
+            raise KeyError(batch_id)
+        return batch
+
+    def _batch_ids(self):
+        return [name[:-len(".json")] for name in os.listdir(self.directory)
+                if name.startswith("batch_") and name.endswith(".json")]
+
+    def list(self, limit: int = 20, owner: Optional[str] = None):
+        batches = []
+        for batch_id in self._batch_ids():
+            try:
+                batches.append(self.get(batch_id, owner))
+            except (KeyError, ValueError):
+                continue  # Another client's batch, or one removed/being written meanwhile
+        return sorted(batches, key=lambda b: b["created_at"], reverse=True)[:limit]
+
+    def _cancel(self, batch_id: str, owner: Optional[str]) -> Dict[str, Any]:
+        self.get(batch_id, owner)
+        with self._state_lock(batch_id):
+            batch = copy.deepcopy(self.running.get(batch_id) or self._load(batch_id))
+            if batch["status"] in ("validating", "in_progress"):
+                batch.update(status="cancelling", cancelling_at=int(time.time()))
+                self._write(batch)
+        return batch
+
+    async def cancel(self, batch_id: str, owner: Optional[str] = None) -> Dict[str, Any]:
+        batch = await run_blocking(self._cancel, batch_id, owner)
+        # Whichever worker holds the lease sees the cancel at its next checkpoint; if none
+        # does (its process died), the runner started here takes the lease and finalizes it
+        if batch["status"] == "cancelling" and batch_id not in self.tasks:
+            self.start(batch_id)
+        return batch
+
+    def start(self, batch_id: str):
+        self.tasks[batch_id] = asyncio.get_running_loop().create_task(self._run(batch_id))
+
+    def resume(self):
+        """Start runners for batches that were active when a process stopped; the lease keeps one per batch."""
+        for batch_id in self._batch_ids():
+            try:
+                batch = self._load(batch_id)
+            except (KeyError, ValueError):
+                continue
+            if batch["status"] in ACTIVE and batch_id not in self.tasks:
+                self.start(batch_id)
+
+    @staticmethod
+    def _append(path: str, record: Dict[str, Any]):
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+    @staticmethod
+    def _recorded(path: str) -> set:
+        """custom_ids already written to a results file; a torn last line is cut off first."""
+        if not os.path.exists(path):
+            return set()
+        with open(path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+                data = data[:data.rfind(b"\n") + 1]
+        return {json.loads(line)["custom_id"] for line in data.splitlines() if line.strip()}
+
+    def _checkpoint(self, output_path: str, error_path: str) -> Tuple[set, set]:
+        """custom_ids already completed and failed; both result files exist (possibly empty) afterwards."""
+        completed, failed = self._recorded(output_path), self._recorded(error_path)
+        for path in (output_path, error_path):
+            open(path, "a").close()
+        return completed, failed
+
+    async def _run(self, batch_id: str):
+        lease = open(self._batch_path(batch_id, ".lease"), "a")
+        try:
+            fcntl.flock(lease, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            # Another worker (or task) is running this batch
+            lease.close()
+            self.tasks.pop(batch_id, None)
+            return
+        try:
+            batch = await run_blocking(self._load, batch_id)
+            if batch["status"] not in ACTIVE:
+                return
+            logging.info(f"[BatchManager] running {batch_id} in pid {os.getpid()}")
+            self.running[batch_id] = batch
+            await self._process(batch)
+        finally:
+            self.running.pop(batch_id, None)
+            self.tasks.pop(batch_id, None)
+            lease.close()  # Releases the flock
+
+    async def _process(self, batch):
+        batch_id = batch["id"]
+        output_path = self.file_path(batch["output_file_id"])
+        error_path = self.file_path(batch["error_file_id"])
+        completed, failed = await run_blocking(self._checkpoint, output_path, error_path)
+        batch["request_counts"].update(completed=len(completed), failed=len(failed))
+        if batch["status"] == "validating":
+            batch.update(status="in_progress", in_progress_at=int(time.time()))
+        await self._asave(batch)
+        last_save = time.time()
+        in_flight = set()
+
+        async def one(request, semaphore):
+            nonlocal last_save
+            try:
+                try:
+                    status_code, body = await self.execute(batch["endpoint"], request["body"])
+                    error = None if status_code < 400 else {"code": "request_failed", "message": str(body.get("error"))}
+                except Exception as e:
+                    status_code, body, error = 500, {"error": str(e)}, {"code": "request_failed", "message": str(e)}
+            finally:
+                semaphore.release()
+            record = {
+                "id": f"batch_req_{uuid.uuid4().hex}", "custom_id": request["custom_id"],
+                "response": {"status_code": status_code, "request_id": uuid.uuid4().hex, "body": body},
+                "error": error,
+            }
+            await run_blocking(self._append, error_path if error else output_path, record)
+            batch["request_counts"]["failed" if error else "completed"] += 1
+            if time.time() - last_save >= self.checkpoint_interval:
+                last_save = time.time()
+                await self._asave(batch)
+
+        try:
+            with open(self.file_path(batch["input_file_id"]), "r", encoding="utf-8") as f:
+                for line in f:
+                    if batch["status"] == "cancelling":
+                        break
+                    if not line.strip():
+                        continue
+                    request = json.loads(line)
+                    if request["custom_id"] in completed or request["custom_id"] in failed:
+                        continue
+                    provider, model, est_tokens = self.classify(request["body"])
+                    semaphore = self._semaphore(provider)
+                    await semaphore.acquire()
+                    # Hold the slot while the quota refills so the batch never outruns interactive traffic
+                    while not await run_blocking(self.admit, model, est_tokens) and batch["status"] != "cancelling":
+                        await asyncio.sleep(self.quota_poll)
+                        await self._asave(batch)  # Checkpoint, and pick up a cancel from another worker
+                    if batch["status"] == "cancelling":
+                        semaphore.release()
+                        break
+                    task = asyncio.ensure_future(one(request, semaphore))
+                    in_flight.add(task)
+                    task.add_done_callback(in_flight.discard)
+            if batch["status"] != "cancelling":
+                # Every request has been sent; only the in-flight ones are left to record
+                batch.update(status="finalizing", finalizing_at=int(time.time()))
+                await self._asave(batch)
+            if in_flight:
+                await asyncio.gather(*in_flight)
+            now = int(time.time())
+            if batch["status"] == "cancelling":
+                batch.update(status="cancelled", cancelled_at=now)
+            else:
+                batch.update(status="completed", completed_at=now)
+        except Exception as e:
+            logging.warning(f"[BatchManager] {batch_id} failed: {e}")
+            if in_flight:
+                await asyncio.gather(*in_flight, return_exceptions=True)
+            batch.update(status="failed", failed_at=int(time.time()),
+                         errors={"object": "list", "data": [{"code": "batch_failed", "message": str(e)}]})
+        finally:
+            await self._asave(batch)
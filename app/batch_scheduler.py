@@ -0,0 +1,106 @@
+"""
+Dynamic micro-batching for local inference engines
+- Collects concurrent requests for up to max_wait_ms or max_batch_size, whichever comes first
+- Submits them to the engine as one batch and routes each result back to its caller
+- The engine is any callable taking a list of requests and returning a list of results,
+  so it can be stubbed without a GPU
+"""
+
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, List
+
+class MicroBatchScheduler:
+    def __init__(self, generate_batch: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = 16, max_wait_ms: float = 10.0):
+        self.generate_batch = generate_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = queue.Queue()
+        self.stats_data = {"requests": 0, "batches": 0, "max_batch": 0, "errors": 0}
+        self.running = True
+        self.lock = threading.Lock()  # Orders submits against close's shutdown sentinel
+        self.worker = threading.Thread(target=self._run, name="vibe-batcher", daemon=True)
+        self.worker.start()
+
+    def submit(self, request) -> Future:
+        """Queue a request; the returned future resolves with its result once its batch completes."""
+        future = Future()
+        with self.lock:
+            if not self.running:
+                raise RuntimeError("Scheduler is closed")
+            self.queue.put((request, future))
+        return future
+
+    def _collect(self):
+        item = self.queue.get()
+        if item is None:
+            return None
+        batch = [item]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Shutdown requested: finish this batch, then stop
+                self.queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            batch = [(req, fut) for req, fut in batch if fut.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            self.stats_data["requests"] += len(batch)
+            self.stats_data["batches"] += 1
+            self.stats_data["max_batch"] = max(self.stats_data["max_batch"], len(batch))
+            try:
+                results = self.generate_batch([req for req, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"Engine returned {len(results)} results for {len(batch)} requests")
+                for (_, fut), result in zip(batch, results):
+                    fut.set_result(result)
+            except Exception as e:
+                logging.error(f"[MicroBatchScheduler] batch of {len(batch)} failed: {e}")
+                self.stats_data["errors"] += 1
+                for _, fut in batch:
+                    fut.set_exception(e)
+
+    def close(self):
+        """Stop accepting requests, finish the queued ones, and fail any the worker did not reach."""
+        with self.lock:
+            self.running = False
+            self.queue.put(None)
+        self.worker.join(timeout=5)
+        if self.worker.is_alive():
+            return  # Still inside a batch; it drains the queue up to the sentinel afterwards
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None and item[1].set_running_or_notify_cancel():
+                item[1].set_exception(RuntimeError("Scheduler is closed"))
+
+    def stats(self):
+        batches = self.stats_data["batches"]
+        return {
+            **self.stats_data,
+            "avg_batch": self.stats_data["requests"] / batches if batches else 0.0,
+            "queued": self.queue.qsize(),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+        }
@@ -1,18 +1,68 @@
+import hashlib
 import chromadb
 from chromadb.utils import embedding_functions
-from typing import List
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 class ChromaRAG:
-    def __init__(self, db_path="./rag_db"):
+    def __init__(self, db_path="./rag_db", batch_size: int = 256):
         self.client = chromadb.PersistentClient(path=db_path)
-        self.collection = self.client.get_or_create_collection("docs")
         self.embedder = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="all-MiniLM-L6-v2")
+        self.collection = self.client.get_or_create_collection("docs", embedding_function=self.embedder)
+        self.batch_size = batch_size
 
-    def add_documents(self, docs: List[str], metadatas=None):
+    @staticmethod
+    def doc_id(doc: str) -> str:
+        """Content-addressed ID, so re-adding the same text is a no-op rather than a collision."""
+        return hashlib.sha256(doc.encode("utf-8")).hexdigest()
+
+    def _add_batch(self, docs: List[str], metadatas: List[Dict]) -> Tuple[int, int]:
+        unique = {}
+        for doc, meta in zip(docs, metadatas):
+            unique.setdefault(self.doc_id(doc), (doc, meta))
+        existing = set(self.collection.get(ids=list(unique), include=[])["ids"])
+        new_ids = [i for i in unique if i not in existing]
+        if new_ids:
+            self.collection.add(
+                documents=[unique[i][0] for i in new_ids],
+                metadatas=[unique[i][1] or None for i in new_ids],
+                ids=new_ids,
+            )
+        return len(new_ids), len(docs) - len(new_ids)
+
+    def add_documents(self, docs: List[str], metadatas=None) -> Dict[str, int]:
         metadatas = metadatas or [{} for _ in docs]
-        ids = [f"doc_{i}" for i in range(len(docs))]
-        self.collection.add(documents=docs, metadatas=metadatas, ids=ids)
+        added = duplicates = 0
+        for progress in self.ingest(zip(docs, metadatas)):
+            added, duplicates = progress["added"], progress["duplicates"]
+        return {"added": added, "duplicates": duplicates}
+
+    def ingest(self, items: Iterable[Tuple[str, Optional[Dict]]]) -> Iterator[Dict[str, int]]:
+        """
+        Add (doc, metadata) pairs in bounded batches, yielding cumulative progress after each batch.
+        Only one batch is held in memory, so arbitrarily large iterables can be ingested.
+        """
+        docs, metadatas = [], []
+        progress = {"processed": 0, "added": 0, "duplicates": 0, "batches": 0}
+        for doc, meta in items:
+            docs.append(doc)
+            metadatas.append(meta or {})
+            if len(docs) >= self.batch_size:
+                yield self.ingest_batch(docs, metadatas, progress)
+                docs, metadatas = [], []
+        if docs:
+            yield self.ingest_batch(docs, metadatas, progress)
+
+    def ingest_batch(self, docs: List[str], metadatas: List[Dict], progress: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+        """Add one batch, update the running progress counts and return a snapshot of them."""
+        if progress is None:
+            progress = {"processed": 0, "added": 0, "duplicates": 0, "batches": 0}
+        added, duplicates = self._add_batch(docs, metadatas)
+        progress["processed"] += len(docs)
+        progress["added"] += added
+        progress["duplicates"] += duplicates
+        progress["batches"] += 1
+        return dict(progress)
 
     def query(self, query: str, top_k=3):
-        results = self.collection.query(query_texts=[query], n_results=top_k, embedding_function=self.embedder)
+        results = self.collection.query(query_texts=[query], n_results=top_k)
         return [doc for doc in results["documents"][0]]
@@ -0,0 +1,103 @@
+"""
+Per-(provider, model) circuit breakers
+- closed: calls flow; consecutive failures past a threshold open the circuit
+- open: calls fail fast until the recovery timeout elapses
+- half_open: a limited number of trial calls decide between closed and open; trials that
+  never report back (cancelled or hung) are released, or reopen the circuit after the timeout
+"""
+
+import time
+import threading
+from typing import Any, Dict
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a backend whose circuit is open."""
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0, half_open_max_calls: int = 1):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_calls = 0
+        self.trial_started = 0.0
+        self.lock = threading.Lock()
+
+    def _current_state(self) -> str:
+        # Caller holds self.lock
+        if self.state == OPEN and time.time() - self.opened_at >= self.recovery_timeout:
+            self.state = HALF_OPEN
+            self.trial_calls = 0
+        elif (self.state == HALF_OPEN and self.trial_calls >= self.half_open_max_calls
+              and time.time() - self.trial_started >= self.recovery_timeout):
+            # The trial calls never reported back; treat them as failed so callers route around us
+            self.state = OPEN
+            self.opened_at = time.time()
+        return self.state
+
+    def allow(self) -> bool:
+        """Whether a call may proceed now; half-open circuits admit a few trial calls."""
+        with self.lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self.trial_calls < self.half_open_max_calls:
+                self.trial_calls += 1
+                self.trial_started = time.time()
+                return True
+            return False
+
+    def is_open(self) -> bool:
+        with self.lock:
+            return self._current_state() == OPEN
+
+    def release(self):
+        """Give back a trial slot for a call that ended without an outcome (e.g. it was cancelled)."""
+        with self.lock:
+            if self.state == HALF_OPEN and self.trial_calls > 0:
+                self.trial_calls -= 1
+
+    def record_success(self):
+        with self.lock:
+            self.state = CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            state = self._current_state()
+            return {
+                "state": state,
+                "failures": self.failures,
+                "retry_in": max(0.0, self.recovery_timeout - (time.time() - self.opened_at)) if state == OPEN else 0.0,
+            }
+
+class CircuitBreakers:
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0, half_open_max_calls: int = 1):
+        self.settings = dict(failure_threshold=failure_threshold, recovery_timeout=recovery_timeout,
+                             half_open_max_calls=half_open_max_calls)
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.lock = threading.Lock()
+
+    def get(self, model_id: str) -> CircuitBreaker:
+        with self.lock:
+            if model_id not in self.breakers:
+                self.breakers[model_id] = CircuitBreaker(**self.settings)
+            return self.breakers[model_id]
+
+    def is_open(self, model_id: str) -> bool:
+        breaker = self.breakers.get(model_id)
+        return breaker is not None and breaker.is_open()
+
+    def states(self) -> Dict[str, Dict[str, Any]]:
+        return {model_id: breaker.snapshot() for model_id, breaker in list(self.breakers.items())}
@@ -0,0 +1,57 @@
+"""
+Concurrency helpers for keeping the event loop free
+- Bounded thread pool for blocking, CPU/GPU-bound backend calls (e.g. local RAG)
+- Per-provider semaphores so one slow provider cannot absorb every in-flight request
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+DEFAULT_LIMITS = {"io": 64, "hf": 32, "vllm": 32, "rag": 4}
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_workers = 8
+
+def configure_executor(max_workers: int):
+    """Set the size of the blocking-call pool. Must be called before first use."""
+    global _executor_workers
+    _executor_workers = max_workers
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=_executor_workers, thread_name_prefix="vibe-backend")
+    return _executor
+
+async def run_blocking(fn, *args, **kwargs):
+    """Run a blocking callable on the bounded backend pool and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(fn, *args, **kwargs))
+
+class BackendLimits:
+    def __init__(self, limits: Optional[Dict[str, int]] = None):
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.in_flight: Dict[str, int] = {}
+
+    def _semaphore(self, provider: str) -> asyncio.Semaphore:
+        if provider not in self.semaphores:
+            self.semaphores[provider] = asyncio.Semaphore(self.limits.get(provider, 16))
+        return self.semaphores[provider]
+
+    @asynccontextmanager
+    async def slot(self, provider: str):
+        """Hold one of the provider's concurrency slots for the duration of a call."""
+        async with self._semaphore(provider):
+            self.in_flight[provider] = self.in_flight.get(provider, 0) + 1
+            try:
+                yield
+            finally:
+                self.in_flight[provider] -= 1
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {p: {"limit": self.limits.get(p, 16), "in_flight": self.in_flight.get(p, 0)}
+                for p in set(self.limits) | set(self.in_flight)}
@@ -0,0 +1,68 @@
+"""
+Active health checks for model providers
+- Periodically runs a lightweight probe per provider on a background thread
+- Combines probe results with circuit breaker state into each model's health
+- Writes the result into ModelRegistry so /v1/models consumers can see it
+"""
+
+import time
+import logging
+import threading
+from typing import Callable, Dict, Iterable
+
+class HealthProber:
+    def __init__(self, registry, breakers, probes: Dict[str, Callable[[], None]], interval: float = 60,
+                 extra_models: Iterable[str] = ()):
+        self.registry = registry
+        self.breakers = breakers
+        self.probes = probes
+        self.interval = interval
+        self.extra_models = list(extra_models)
+        self.providers = {}  # provider -> {"status", "checked_at", "error"}
+
+    def probe_providers(self):
+        for provider, probe in self.probes.items():
+            start = time.time()
+            try:
+                probe()
+                self.providers[provider] = {"status": "healthy", "checked_at": start, "latency": time.time() - start}
+            except Exception as e:
+                logging.warning(f"[HealthProber] {provider} probe failed: {e}")
+                self.providers[provider] = {"status": "unhealthy", "checked_at": start, "error": str(e)}
+
+    def model_health(self, model_id: str, provider: str) -> str:
+        breaker = self.breakers.breakers.get(model_id)
+        state = breaker.snapshot()["state"] if breaker else "closed"
+        provider_status = self.providers.get(provider, {}).get("status")
+        if state == "open" or provider_status == "unhealthy":
+            return "unhealthy"
+        if state == "half_open":
+            return "degraded"
+        return "healthy" if provider_status == "healthy" or breaker else "unknown"
+
+    def check_once(self):
+        self.probe_providers()
+        # IO discovery lists bare ids; breakers are keyed "provider:model"
+        models = {m["id"]: m.get("provider", "io") for m in self.registry.models}
+        for model_id in set(self.extra_models) | set(self.breakers.breakers):
+            models.setdefault(model_id, model_id.split(":")[0])
+        for model_id, provider in models.items():
+            key = model_id if model_id.startswith(f"{provider}:") else f"{provider}:{model_id}"
+            self.registry.set_health(model_id, self.model_health(key, provider))
+
+    def start(self):
+        def loop():
+            while True:
+                try:
+                    self.check_once()
+                except Exception as e:
+                    logging.error(f"[HealthProber] health check failed: {e}")
+                time.sleep(self.interval)
+        threading.Thread(target=loop, name="vibe-health-prober", daemon=True).start()
+
+    def summary(self) -> Dict:
+        return {
+            "providers": dict(self.providers),
+            "circuits": self.breakers.states(),
+            "models": dict(self.registry.health),
+        }
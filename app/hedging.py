@@ -0,0 +1,85 @@
+"""
+Hedged requests for tail-latency reduction
+- If the primary call has not finished within a per-route latency percentile,
+  fire the same request at an alternate model and take whichever finishes first
+- The loser is cancelled; hedges are capped at a fraction of primary traffic
+"""
+
+import asyncio
+import threading
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+class Hedger:
+    def __init__(self, routes: Optional[Dict[str, Dict[str, Any]]] = None, budget: float = 0.1,
+                 default_delay: float = 2.0, min_delay: float = 0.05, enabled: bool = True):
+        self.routes = routes or {}
+        self.budget = budget
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.counters = defaultdict(lambda: {"requests": 0, "fired": 0, "won": 0, "skipped_budget": 0,
+                                             "skipped_no_alternate": 0})
+
+    def route_config(self, route: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled or route not in self.routes:
+            return None
+        return self.routes[route] or {}
+
+    def delay(self, observed: Optional[float]) -> float:
+        """Hedge delay from the primary's observed percentile latency (or the default without data)."""
+        return max(self.min_delay, observed if observed is not None else self.default_delay)
+
+    def _total(self, key: str) -> int:
+        return sum(c[key] for c in self.counters.values())
+
+    async def run(self, route: str, primary: Callable[[], Awaitable], hedge: Callable[[], Optional[Awaitable]], delay: float):
+        """
+        Await primary(); after delay seconds without a result, start hedge() (if the budget allows
+        and it returns an awaitable) and return the first successful result of the two.
+        """
+        counters = self.counters[route]
+        with self.lock:
+            counters["requests"] += 1
+        primary_task = asyncio.ensure_future(primary())
+        tasks = {primary_task}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return primary_task.result()
+            with self.lock:
+                over_budget = self._total("fired") + 1 > self.budget * self._total("requests")
+                if over_budget:
+                    counters["skipped_budget"] += 1
+            if over_budget:
+                return await primary_task
+            hedge_call = hedge()
+            if hedge_call is None:
+                with self.lock:
+                    counters["skipped_no_alternate"] += 1
+                return await primary_task
+            hedge_task = asyncio.ensure_future(hedge_call)
+            tasks.add(hedge_task)
+            with self.lock:
+                counters["fired"] += 1
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                # Prefer the primary if both finished in the same tick
+                for task in sorted(done, key=lambda t: t is not primary_task):
+                    if task.exception() is None:
+                        if task is hedge_task:
+                            with self.lock:
+                                counters["won"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            routes = {route: dict(c) for route, c in self.counters.items()}
+        return {"budget": self.budget, "routes": routes}
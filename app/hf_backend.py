@@ -1,13 +1,16 @@
 import os
 import logging
-from huggingface_hub import InferenceClient, list_models, model_info
+from huggingface_hub import InferenceClient, AsyncInferenceClient, list_models, model_info
 
 HUGGINGFACE_TOKEN = os.getenv("HUGGINGFACE_TOKEN")
 
 class HuggingFaceBackend:
+    provider = "hf"
+
     def __init__(self, model_name: str):
         self.model_name = model_name
         self.client = InferenceClient(model=model_name, token=HUGGINGFACE_TOKEN)
+        self.async_client = AsyncInferenceClient(model=model_name, token=HUGGINGFACE_TOKEN)
         self.info = None
         try:
             self.info = model_info(model_name)
@@ -47,6 +50,50 @@ class HuggingFaceBackend:
             logging.error(f"HuggingFace inference error: {e}")
             return f"[HuggingFace Error] {e}"
 
+    async def achat(self, prompt: str, max_new_tokens: int = 128, temperature: float = 0.7):
+        tasks = self.get_supported_tasks()
+        try:
+            if "text-generation" in tasks:
+                return await self.async_client.text_generation(
+                    prompt,
+                    max_new_tokens=max_new_tokens,
+                    temperature=temperature,
+                    do_sample=True,
+                    return_full_text=False
+                )
+            elif "conversational" in tasks or "conversation" in tasks:
+                return await self.async_client.conversational(
+                    prompt,
+                    max_new_tokens=max_new_tokens,
+                    temperature=temperature
+                )
+            else:
+                return f"[HuggingFace Error] Model {self.model_name} does not support text-generation or conversational tasks. Supported: {tasks}"
+        except Exception as e:
+            logging.error(f"HuggingFace inference error: {e}")
+            return f"[HuggingFace Error] {e}"
+
+    async def astream(self, prompt: str, max_new_tokens: int = 128, temperature: float = 0.7):
+        """Yield tokens as they are generated; non text-generation models yield one final chunk."""
+        if "text-generation" not in self.get_supported_tasks():
+            yield await self.achat(prompt, max_new_tokens, temperature)
+            return
+        stream = await self.async_client.text_generation(
+            prompt,
+            max_new_tokens=max_new_tokens,
+            temperature=temperature,
+            do_sample=True,
+            return_full_text=False,
+            stream=True
+        )
+        async for token in stream:
+            yield token
+
+    @staticmethod
+    def ping():
+        """Lightweight availability probe; raises if the Hub API is unreachable."""
+        next(iter(list_models(limit=1)))
+
     @staticmethod
     def list_text_generation_models(limit=20):
         # List public models that support text-generation or conversational
@@ -1,15 +1,36 @@
 import os
+import httpx
 import openai
 import requests
 
 IOINTEL_TOKEN = os.getenv("IOINTEL_TOKEN")
+IOINTEL_BASE_URL = "https://api.intelligence.io.solutions/api/v1/"
+
+_async_client = None
+
+def get_async_client() -> openai.AsyncOpenAI:
+    """Shared async client so every IO model reuses one keep-alive connection pool."""
+    global _async_client
+    if _async_client is None:
+        _async_client = openai.AsyncOpenAI(
+            api_key=IOINTEL_TOKEN,
+            base_url=IOINTEL_BASE_URL,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30),
+                timeout=httpx.Timeout(60.0, connect=5.0),
+            ),
+        )
+    return _async_client
 
 class IOIntelligenceBackend:
-    def __init__(self, model_name: str):
+    provider = "io"
+
+    def __init__(self, model_name: str, usage_tracker=None):
         self.model_name = model_name
+        self.usage_tracker = usage_tracker  # Receives token usage reported by the API
         self.client = openai.OpenAI(
             api_key=IOINTEL_TOKEN,
-            base_url="https://api.intelligence.io.solutions/api/v1/",
+            base_url=IOINTEL_BASE_URL,
         )
 
     def chat(self, messages, max_tokens=128, temperature=0.7):
@@ -20,8 +41,47 @@ class IOIntelligenceBackend:
             max_completion_tokens=max_tokens,
             stream=False
         )
+        self._record_usage(response.usage)
+        return response.choices[0].message.content
+
+    async def achat(self, messages, max_tokens=128, temperature=0.7):
+        response = await get_async_client().chat.completions.create(
+            model=self.model_name,
+            messages=messages,
+            temperature=temperature,
+            max_completion_tokens=max_tokens,
+            stream=False
+        )
+        self._record_usage(response.usage)
         return response.choices[0].message.content
 
+    async def astream(self, messages, max_tokens=128, temperature=0.7):
+        """Yield content deltas as the upstream model produces them."""
+        stream = await get_async_client().chat.completions.create(
+            model=self.model_name,
+            messages=messages,
+            temperature=temperature,
+            max_completion_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        async for chunk in stream:
+            if chunk.usage:
+                self._record_usage(chunk.usage)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def _record_usage(self, usage):
+        if self.usage_tracker is not None and usage is not None:
+            self.usage_tracker.record_tokens(f"io:{self.model_name}", usage.total_tokens)
+
+    @staticmethod
+    def ping(timeout: float = 5):
+        """Lightweight availability probe; raises if the API is unreachable or rejects the token."""
+        url = "https://api.intelligence.io.solutions/api/v1/models"
+        headers = {"Authorization": f"Bearer {IOINTEL_TOKEN}"}
+        requests.get(url, headers=headers, timeout=timeout).raise_for_status()
+
     @staticmethod
     def list_io_models():
         url = "https://api.intelligence.io.solutions/api/v1/models"
@@ -1,6 +1,13 @@
 from fastapi import FastAPI, Request, Query
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse, FileResponse
 import os
+import json
+import asyncio
+import time
+import uuid
+import threading
+import hashlib
+import logging
 from dotenv import load_dotenv
 from .registry import ModelRegistry
 from .iointel_backend import IOIntelligenceBackend
@@ -9,14 +16,26 @@ from .hf_backend import HuggingFaceBackend
 from .rag_backend import RAGBackend
 from .task_classifier import TaskClassifier
 from .model_selector import ModelSelector
+from .model_stats import ModelStats
 from .chroma_rag import ChromaRAG
-from .tool_coordinator import ToolCoordinator
+from .tool_coordinator import ToolCoordinator, ShellBusyError
 from .tool_registry import ToolRegistry
 from .usage_tracker import UsageTracker
 from .orchestrator import Orchestrator
 from .telemetry import Telemetry
 from .sanitize import sanitize_input
-from .auth import get_current_client, get_admin_client, check_permission
+from .backend_pool import BackendPool
+from .concurrency import BackendLimits, configure_executor, run_blocking
+from .response_cache import ResponseCache
+from .semantic_cache import SemanticCache
+from .hedging import Hedger
+from .circuit_breaker import CircuitBreakers, CircuitOpenError
+from .health import HealthProber
+from .state_store import create_state_store
+from .request_journal import RequestJournal
+from .batch_jobs import BatchManager
+from .token_budget import TokenCounter, ContextOverflowError
+from .auth import get_current_client, get_admin_client, check_permission, rate_limited, rate_limiter
 from fastapi import Depends
 import yaml
 
@@ -28,14 +47,151 @@ app = FastAPI(title="vibe-llm: Local AI Inference Server")
 DEFAULT_CHAT_MODEL = "io:meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo"
 DEFAULT_CONTENT_MODEL = "io:meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo"
 
-# Initialize registry and discover IO models/agents at startup
-ioregistry = ModelRegistry()
-ioregistry.models = ioregistry._discover_io_models()
-ioregistry.agents = ioregistry._discover_io_agents()
+CONFIG_PATH = "config.yaml"
+
+def load_config(path=CONFIG_PATH):
+    try:
+        with open(path, "r") as f:
+            return yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        return {}
+
+config = load_config()
+
+# Shared state for usage limits, telemetry counts and the registry snapshot (memory, sqlite or redis)
+state_store = create_state_store(config.get("state", {}).get("url") or os.getenv("REDIS_URL"))
+# Per-client rate limits count in the same store, so every worker spends one shared budget
+rate_limiter.store = state_store
+
+# Initialize registry; models/agents are discovered in the background and served from a cached snapshot
+registry_config = config.get("registry", {})
+ioregistry = ModelRegistry(ttl=registry_config.get("ttl", 300), store=state_store)
+
+# Routing index over config.yaml models; rebuilt when the file changes
+model_stats = ModelStats()
+breaker_config = config.get("circuit_breaker", {})
+breakers = CircuitBreakers(
+    failure_threshold=breaker_config.get("failure_threshold", 5),
+    recovery_timeout=breaker_config.get("recovery_timeout", 30),
+    half_open_max_calls=breaker_config.get("half_open_max_calls", 1),
+)
+model_selector = ModelSelector(CONFIG_PATH, stats=model_stats, breakers=breakers)
+task_classifier = TaskClassifier()
 
 # Initialize usage tracker
-usage_tracker = UsageTracker()
-telemetry = Telemetry()
+usage_config = config.get("usage_limits", {})
+usage_tracker = UsageTracker(
+    window=usage_config.get("window", 3600),
+    default_limit=usage_config.get("requests_per_window", 1000),
+    default_token_limit=usage_config.get("tokens_per_window"),
+    lookahead=usage_config.get("lookahead", 60),
+    store=state_store,
+    flush_interval=usage_config.get("flush_interval", 0.5),
+    cache_ttl=usage_config.get("cache_ttl", 1.0),
+)
+for _model_id, _limits in (usage_config.get("models") or {}).items():
+    if "requests_per_window" in _limits:
+        usage_tracker.set_limit(_model_id, _limits["requests_per_window"])
+    if "tokens_per_window" in _limits:
+        usage_tracker.set_token_limit(_model_id, _limits["tokens_per_window"])
+
+# Per-model tokenizers for prompt budgeting and token counts
+tokens_config = config.get("tokens", {})
+token_counter = TokenCounter(
+    default_context=tokens_config.get("default_context", 8192),
+    context_windows=tokens_config.get("context_windows"),
+    tokenizers=tokens_config.get("tokenizers"),
+    default_encoding=tokens_config.get("default_encoding", "cl100k_base"),
+    completion_reserve=tokens_config.get("completion_reserve", 16),
+    cache_size=tokens_config.get("cache_size", 32),
+)
+
+def estimate_tokens(messages, max_tokens: int = 0, model: str = None) -> int:
+    """
+    Prompt + completion token estimate for quota projection. Uses the model's tokenizer when it
+    is already loaded; otherwise ~4 characters per token, so this never blocks on a tokenizer load.
+    """
+    return token_counter.count_messages(model, messages, load=False) + (max_tokens or 0)
+
+async def fit_to_context(model: str, messages, max_tokens: int):
+    """
+    Trim a chat (or cut a raw prompt) to the model's context window, leaving room for the
+    completion. Returns the input to send and {"prompt_tokens", "max_tokens", "trimmed"}.
+    """
+    if isinstance(messages, str):
+        return await run_blocking(token_counter.fit_prompt, model, messages, max_tokens)
+    return await run_blocking(token_counter.fit_messages, model, messages, max_tokens)
+telemetry = Telemetry(store=state_store, max_events=config.get("telemetry", {}).get("max_events", 1000),
+                      flush_interval=config.get("telemetry", {}).get("flush_interval", 1.0))
+
+journal_config = config.get("journal", {})
+journal = RequestJournal(
+    path=journal_config.get("path", "journal/requests.jsonl"),
+    sample_rate=journal_config.get("sample_rate", 1.0),
+    redact_fields=journal_config.get("redact", ["authorization", "api_key", "password", "token"]),
+    max_bytes=journal_config.get("max_bytes", 50 * 1024 * 1024),
+    backups=journal_config.get("backups", 5),
+    compress=journal_config.get("compress", True),
+    batch_size=journal_config.get("batch_size", 100),
+    flush_interval=journal_config.get("flush_interval", 1.0),
+    queue_size=journal_config.get("queue_size", 10000),
+    enabled=journal_config.get("enabled", False),
+)
+JOURNAL_PATHS = tuple(journal_config.get("paths", ["/v1/chat/completions", "/v1/completions", "/api/generate",
+                                                    "/v1/business/chat", "/v1/content/generate"]))
+JOURNAL_MAX_RESPONSE_BYTES = journal_config.get("max_response_bytes", 64 * 1024)
+
+@app.middleware("http")
+async def journal_requests(request: Request, call_next):
+    """Journal sampled JSON requests and their responses (streams are teed, not buffered)."""
+    if request.method != "POST" or not request.url.path.startswith(JOURNAL_PATHS) or not journal.sampled():
+        return await call_next(request)
+    start = time.time()
+    raw = await request.body()
+    try:
+        body = json.loads(raw) if raw else None
+    except ValueError:
+        body = raw.decode(errors="replace")
+    response = await call_next(request)
+    original = response.body_iterator
+
+    async def tee():
+        chunks, size = [], 0
+        try:
+            async for chunk in original:
+                if size < JOURNAL_MAX_RESPONSE_BYTES:
+                    chunks.append(chunk if isinstance(chunk, bytes) else chunk.encode())
+                    size += len(chunks[-1])
+                yield chunk
+        finally:
+            text = b"".join(chunks)[:JOURNAL_MAX_RESPONSE_BYTES].decode(errors="replace")
+            try:
+                payload = json.loads(text)
+            except ValueError:
+                payload = text
+            journal.record({
+                "ts": start, "method": request.method, "path": request.url.path, "query": request.url.query,
+                "status": response.status_code, "latency": time.time() - start,
+                "request": body, "response": payload, "truncated": size > JOURNAL_MAX_RESPONSE_BYTES,
+            })
+    response.body_iterator = tee()
+    return response
+
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    """Per-endpoint request counts and latency histograms (time to response headers for streams)."""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        endpoint = getattr(route, "path", "unmatched")
+        telemetry.observe("http_request_duration_seconds", time.perf_counter() - start,
+                          endpoint=endpoint, method=request.method)
+        telemetry.incr("http_requests_total", endpoint=endpoint, method=request.method, status=status)
 
 @app.get("/")
 def root():
@@ -49,36 +205,352 @@ BACKEND_MAP = {
     'rag': RAGBackend,
 }
 
-def get_backend(model: str, provider: str = None, rag_corpus=None, allow_rotation=True):
+# For demo, RAG models use a static corpus unless one is passed explicitly
+DEFAULT_RAG_CORPUS = [
+    "The capital of France is Paris.",
+    "FastAPI is a modern Python web framework.",
+    "vLLM enables fast LLM inference on GPUs.",
+]
+
+def _build_backend(provider: str, model: str):
+    if provider == 'rag':
+        return RAGBackend(model, DEFAULT_RAG_CORPUS, token_counter=token_counter)
+    if provider == 'io':
+        return IOIntelligenceBackend(model, usage_tracker=usage_tracker)
+    if provider == 'vllm':
+        batching = config.get("vllm_batching", {})
+        return VLLMBackend(model, max_batch_size=batching.get("max_batch_size", 16),
+                           max_wait_ms=batching.get("max_wait_ms", 10))
+    return BACKEND_MAP[provider](model)
+
+pool_config = config.get("backend_pool", {})
+backend_pool = BackendPool(
+    _build_backend,
+    max_instances=pool_config.get("max_instances", 8),
+    max_memory_gb=pool_config.get("max_memory_gb"),
+    model_memory_gb={m["id"]: m["memory_gb"] for m in config.get("models", []) if "memory_gb" in m},
+    close_grace=pool_config.get("close_grace", 2.0),
+)
+
+concurrency_config = config.get("concurrency", {})
+configure_executor(concurrency_config.get("executor_workers", 8))
+backend_limits = BackendLimits(concurrency_config.get("limits"))
+
+def backend_id(backend) -> str:
+    return f"{getattr(backend, 'provider', 'io')}:{getattr(backend, 'model_name', '')}"
+
+_metric_models = (None, None, frozenset())  # (config models, registry models, known ids); rebuilt when either list is swapped
+
+def metric_labels(backend) -> dict:
+    """
+    provider/model labels for backend metrics. Clients can name any io:<model>, so only models
+    in config.yaml or the registry snapshot get their own series; the rest share model="other".
+    """
+    global _metric_models
+    configured, discovered = model_selector.models, ioregistry.models
+    if _metric_models[0] is not configured or _metric_models[1] is not discovered:
+        known = {m["id"] for m in configured}
+        known |= {m["id"] if ":" in m["id"] else f"{m.get('provider', 'io')}:{m['id']}" for m in discovered}
+        _metric_models = (configured, discovered, frozenset(known))
+    provider = getattr(backend, "provider", "io")
+    model = getattr(backend, "model_name", None)
+    return {"provider": provider, "model": model if backend_id(backend) in _metric_models[2] else "other"}
+
+def is_error_response(response) -> bool:
+    # Some backends (HF) report failures as text instead of raising
+    return isinstance(response, str) and response.startswith("[") and "Error]" in response[:40]
+
+async def call_backend(backend, *args, **kwargs):
+    """
+    Await a backend call off the event loop, within its provider's concurrency limit,
+    recording latency, errors and throughput for adaptive routing.
+    """
+    model_id = backend_id(backend)
+    breaker = breakers.get(model_id)
+    if not breaker.allow():
+        raise CircuitOpenError(f"Circuit open for {model_id}; failing fast")
+    try:
+        with backend_pool.using(backend):
+            async with backend_limits.slot(getattr(backend, "provider", "io")):
+                start = time.time()
+                try:
+                    response = await backend.achat(*args, **kwargs)
+                except Exception:
+                    model_stats.record(model_id, time.time() - start, success=False)
+                    breaker.record_failure()
+                    telemetry.incr("backend_calls_total", outcome="error", **metric_labels(backend))
+                    raise
+    except asyncio.CancelledError:
+        # A losing hedge or a dropped client says nothing about the backend; free its trial slot
+        breaker.release()
+        raise
+    success = not is_error_response(response)
+    tokens = len(response.split()) if success and isinstance(response, str) else None
+    model_stats.record(model_id, time.time() - start, success=success, tokens=tokens)
+    labels = metric_labels(backend)
+    telemetry.observe("backend_latency_seconds", time.time() - start, **labels)
+    telemetry.incr("backend_calls_total", outcome="ok" if success else "error", **labels)
+    if success:
+        breaker.record_success()
+    else:
+        breaker.record_failure()
+    return response
+
+cache_config = config.get("response_cache", {})
+response_cache = ResponseCache(
+    max_entries=cache_config.get("max_entries", 1024),
+    ttl=cache_config.get("ttl", 3600),
+    disk_path=cache_config.get("disk_path"),
+    endpoints=cache_config.get("endpoints", []),
+    enabled=cache_config.get("enabled", False),
+    flush_interval=cache_config.get("flush_interval", 0.5),
+    sweep_interval=cache_config.get("sweep_interval", 60),
+)
+
+def is_json(response) -> bool:
+    try:
+        json.loads(response.strip())
+        return True
+    except ValueError:
+        return False
+
+async def cached_chat(endpoint: str, model: str, messages, max_tokens: int, temperature: float, provider: str = None,
+                      validate=None):
+    """
+    Chat through the exact-match response cache when it is enabled for this endpoint.
+    Hits skip get_backend entirely, so they cost no upstream call or usage increment.
+    Backend error strings, and responses the optional validate(response) rejects, are
+    returned but not cached, so the next identical request retries upstream.
+    """
+    use_cache = response_cache.enabled_for(endpoint)
+    if use_cache:
+        key = ResponseCache.make_key(model, messages, provider=provider, max_tokens=max_tokens, temperature=temperature)
+        cached = await response_cache.aget(key)
+        if cached is not None:
+            return cached
+    backend = await get_backend(model, provider, est_tokens=estimate_tokens(messages, max_tokens, model))
+    response = await call_backend(backend, messages, max_tokens, temperature)
+    if use_cache and isinstance(response, str) and not is_error_response(response) \
+            and (validate is None or validate(response)):
+        response_cache.set(key, response)
+    return response
+
+hedging_config = config.get("hedging", {})
+hedger = Hedger(
+    routes=hedging_config.get("routes", {}),
+    budget=hedging_config.get("budget", 0.1),
+    default_delay=hedging_config.get("default_delay", 2.0),
+    min_delay=hedging_config.get("min_delay", 0.05),
+    enabled=hedging_config.get("enabled", False),
+)
+
+def hedge_alternate(model: str, route_config: dict):
+    """Pick an alternate for model: configured alternates, else same-provider chat candidates, skipping limited ones."""
+    provider = model.split(":")[0] if ":" in model else "io"
+    alternates = route_config.get("alternates") or [
+        m for m in model_selector.candidates("chat") if m.split(":")[0] == provider
+    ]
+    alternates = [m for m in alternates if m != model and not usage_tracker.will_exceed(m)]
+    return model_selector.pick(alternates) if alternates else None
+
+async def hedged_chat(route: str, model: str, messages, max_tokens: int, temperature: float):
+    """
+    Chat with model; on hedged routes, if it is slower than its configured latency percentile,
+    race the same request against an alternate model and return whichever finishes first.
+    """
+    backend = await get_backend(model, est_tokens=estimate_tokens(messages, max_tokens, model))
+    route_config = hedger.route_config(route)
+    if route_config is None:
+        return await call_backend(backend, messages, max_tokens, temperature)
+
+    def hedge():
+        alternate = hedge_alternate(model, route_config)
+        if alternate is None:
+            return None
+        async def call_alternate():
+            alternate_backend = await get_backend(alternate, allow_rotation=False,
+                                                  est_tokens=estimate_tokens(messages, max_tokens, alternate))
+            return await call_backend(alternate_backend, messages, max_tokens, temperature)
+        return call_alternate()
+
+    observed = model_stats.percentile(backend_id(backend), route_config.get("percentile", 95))
+    return await hedger.run(route, lambda: call_backend(backend, messages, max_tokens, temperature),
+                            hedge, hedger.delay(observed))
+
+semantic_config = config.get("semantic_cache", {})
+semantic_cache = SemanticCache(
+    threshold=semantic_config.get("threshold", 0.92),
+    max_entries_per_namespace=semantic_config.get("max_entries_per_context", 256),
+    max_namespaces=semantic_config.get("max_contexts", 64),
+    ttl=semantic_config.get("ttl", 3600),
+    routes=semantic_config.get("routes", []),
+    enabled=semantic_config.get("enabled", False),
+)
+
+async def semantic_chat(route: str, context, query_text: str, model: str, messages, max_tokens: int, temperature: float):
+    """
+    Chat through the semantic cache when it is enabled for this route: a prompt whose
+    embedding is close enough to an earlier one for the same model and context reuses
+    that answer. Only query_text is embedded, so shared prompt templates don't dominate.
+    Backend error strings are returned but never stored.
+    """
+    embedding = None
+    if semantic_cache.enabled_for(route):
+        namespace = hashlib.sha256(json.dumps([model, context], sort_keys=True, default=str).encode()).hexdigest()
+        try:
+            embedding = (await run_blocking(lambda: get_chroma_rag().embedder([query_text])))[0]
+        except Exception as e:
+            logging.warning(f"[SemanticCache] embedding failed, bypassing cache: {e}")
+        if embedding is not None:
+            cached = semantic_cache.lookup(namespace, embedding)
+            if cached is not None:
+                return cached
+    start = time.time()
+    response = await hedged_chat(route, model, messages, max_tokens, temperature)
+    if embedding is not None and isinstance(response, str) and not is_error_response(response):
+        semantic_cache.store(namespace, embedding, response, time.time() - start)
+    return response
+
+async def stream_backend(backend, endpoint: str, *args, **kwargs):
+    """
+    Yield text chunks from a backend's astream within its concurrency limit,
+    recording time-to-first-token and inter-token latency in telemetry.
+    """
+    start = time.time()
+    first_token = None
+    last = start
+    gaps = []
+    model_id = backend_id(backend)
+    breaker = breakers.get(model_id)
+    if not breaker.allow():
+        raise CircuitOpenError(f"Circuit open for {model_id}; failing fast")
+    try:
+        with backend_pool.using(backend):
+            async with backend_limits.slot(getattr(backend, "provider", "io")):
+                try:
+                    async for chunk in backend.astream(*args, **kwargs):
+                        now = time.time()
+                        if first_token is None:
+                            first_token = now - start
+                        else:
+                            gaps.append(now - last)
+                        last = now
+                        yield chunk
+                except Exception:
+                    model_stats.record(model_id, time.time() - start, success=False)
+                    breaker.record_failure()
+                    telemetry.incr("backend_calls_total", outcome="error", **metric_labels(backend))
+                    raise
+    except (asyncio.CancelledError, GeneratorExit):
+        # The client disconnected mid-stream; free the trial slot instead of leaking it
+        breaker.release()
+        raise
+    model_stats.record(model_id, last - start, success=True, tokens=len(gaps) + 1 if first_token is not None else None)
+    breaker.record_success()
+    labels = metric_labels(backend)
+    telemetry.observe("backend_latency_seconds", last - start, **labels)
+    if first_token is not None:
+        telemetry.observe("backend_ttft_seconds", first_token, **labels)
+    telemetry.incr("backend_calls_total", outcome="ok", **labels)
+    telemetry.log('stream_latency', {
+        'endpoint': endpoint,
+        'model': getattr(backend, "model_name", None),
+        'ttft': first_token,
+        'itl_avg': sum(gaps) / len(gaps) if gaps else None,
+        'itl_max': max(gaps) if gaps else None,
+        'chunks': len(gaps) + (1 if first_token is not None else 0),
+        'total': last - start,
+    })
+
+def sse_event(data) -> str:
+    return f"data: {data if isinstance(data, str) else json.dumps(data)}\n\n"
+
+def sse_response(events) -> StreamingResponse:
+    """Wrap an async iterator of payloads as a Server-Sent Events response ending with [DONE]."""
+    async def body():
+        try:
+            async for event in events:
+                yield sse_event(event)
+        except Exception as e:
+            yield sse_event({"error": str(e)})
+        yield sse_event("[DONE]")
+    return StreamingResponse(body(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.on_event("startup")
+def start_registry_refresh():
+    ioregistry.start_background_refresh(registry_config.get("refresh_interval"))
+
+health_prober = HealthProber(
+    ioregistry, breakers,
+    probes={"io": IOIntelligenceBackend.ping, "hf": HuggingFaceBackend.ping},
+    interval=config.get("health_check", {}).get("interval", 60),
+    extra_models=[m["id"] for m in config.get("models", [])],
+)
+
+@app.on_event("shutdown")
+def flush_shared_state():
+    # Usage and event counts (and cached responses) are written in batches; don't lose the last one
+    usage_tracker.flush()
+    telemetry.flush()
+    response_cache.flush()
+
+@app.on_event("startup")
+def start_health_checks():
+    if config.get("health_check", {}).get("enabled", True):
+        health_prober.start()
+
+@app.on_event("startup")
+def preload_backends():
+    preload = [m["id"] for m in config.get("models", []) if m.get("preload")]
+    if pool_config.get("preload", False) and preload:
+        backend_pool.preload(preload)
+
+def select_io_model(model: str, est_tokens: int = 0, allow_rotation: bool = True) -> str:
+    """
+    The IO model to call: model itself, or another IO chat model if it is projected to hit its
+    usage limit (or its circuit is open). Counts the request against the chosen model.
+    """
+    if allow_rotation and (usage_tracker.will_exceed(model, est_tokens) or breakers.is_open(model)):
+        # Rotate to next available IO model
+        alternates = [m for m in model_selector.candidates('chat', tags=['io'])
+                      if m.startswith('io:') and m != model and not usage_tracker.will_exceed(m, est_tokens)]
+        if alternates:
+            model = model_selector.pick(alternates)
+    usage_tracker.increment(model)
+    return model
+
+async def get_backend(model: str, provider: str = None, rag_corpus=None, allow_rotation=True, est_tokens: int = 0):
     """
     Select backend based on model/provider naming convention or explicit provider.
-    If usage limit is hit, rotate to next available model for the task.
+    If the model is projected to hit its usage limit (or its circuit is open), rotate to the
+    next available IO model for the task before the limit is actually reached.
+    Backends are served from the process-wide pool so they are built once per (provider, model);
+    building one (weights, model info, pipelines) happens off the event loop.
     """
     if provider == 'io' or (model and model.startswith('io:')):
-        if usage_tracker.is_limited(model):
-            # Rotate to next available IO model
-            from .model_selector import ModelSelector
-            selector = ModelSelector()
-            next_model = selector.select('chat', tags=['io'])
-            if next_model != model:
-                model = next_model
-        usage_tracker.increment(model)
-        return IOIntelligenceBackend(model.replace('io:', ''))
+        # Quota checks may read the shared state store, so they run off the event loop
+        model = await run_blocking(select_io_model, model, est_tokens, allow_rotation)
+        return await backend_pool.aget('io', model.replace('io:', ''))
     elif provider == 'vllm' or (model and model.startswith('vllm:')):
-        return VLLMBackend(model.replace('vllm:', ''))
+        return await backend_pool.aget('vllm', model.replace('vllm:', ''))
     elif provider == 'hf' or (model and model.startswith('hf:')):
-        return HuggingFaceBackend(model.replace('hf:', ''))
+        return await backend_pool.aget('hf', model.replace('hf:', ''))
     elif provider == 'rag' or (model and model.startswith('rag:')):
-        # For demo, use a static corpus
-        corpus = rag_corpus or [
-            "The capital of France is Paris.",
-            "FastAPI is a modern Python web framework.",
-            "vLLM enables fast LLM inference on GPUs.",
-        ]
-        return RAGBackend(model.replace('rag:', ''), corpus)
+        if rag_corpus:
+            # Custom corpora are request-specific and not pooled
+            return await run_blocking(RAGBackend, model.replace('rag:', ''), rag_corpus, token_counter=token_counter)
+        return await backend_pool.aget('rag', model.replace('rag:', ''))
     else:
         # Default to IO Intelligence
-        return IOIntelligenceBackend(model)
+        return await backend_pool.aget('io', model)
+
+def completion_input(backend, prompt: str):
+    """Backend-specific input: chat backends take messages, raw generators take the prompt."""
+    if isinstance(backend, (IOIntelligenceBackend, RAGBackend)):
+        return [{"role": "user", "content": prompt}]
+    if isinstance(backend, (VLLMBackend, HuggingFaceBackend)):
+        return prompt
+    return None
 
 @app.post("/v1/completions")
 async def completions(request: Request):
@@ -88,22 +560,28 @@ async def completions(request: Request):
     provider = body.get("provider")
     max_tokens = body.get("max_tokens", 128)
     temperature = body.get("temperature", 0.7)
+    stream = body.get("stream", False)
     if not model or not prompt:
         return JSONResponse({"error": "Model and prompt must be specified."}, status_code=400)
-    backend = get_backend(model, provider)
+    prompt, budget = await fit_to_context(model, prompt, max_tokens)
+    max_tokens = budget["max_tokens"]
+    backend = await get_backend(model, provider, est_tokens=estimate_tokens(prompt, max_tokens, model))
+    backend_input = completion_input(backend, prompt)
+    if backend_input is None:
+        return JSONResponse({"choices": [{"text": "[Error] Unknown backend type."}]})
+    if stream:
+        completion_id = f"cmpl-{uuid.uuid4().hex}"
+        async def events():
+            async for chunk in stream_backend(backend, 'completions', backend_input, max_tokens, temperature):
+                yield {"id": completion_id, "object": "text_completion", "model": model,
+                       "choices": [{"index": 0, "text": chunk, "finish_reason": None}]}
+            yield {"id": completion_id, "object": "text_completion", "model": model,
+                   "choices": [{"index": 0, "text": "", "finish_reason": "stop"}]}
+        return sse_response(events())
     try:
-        # Use backend-specific logic
-        if isinstance(backend, IOIntelligenceBackend):
-            response = backend.chat([{"role": "user", "content": prompt}], max_tokens, temperature)
-        elif isinstance(backend, VLLMBackend):
-            response = backend.chat(prompt, max_tokens, temperature)
-        elif isinstance(backend, HuggingFaceBackend):
-            response = backend.chat(prompt, max_new_tokens=max_tokens, temperature=temperature)
-        elif isinstance(backend, RAGBackend):
-            response = backend.chat([{"role": "user", "content": prompt}], max_new_tokens=max_tokens, temperature=temperature)
-        else:
-            response = "[Error] Unknown backend type."
-        return JSONResponse({"choices": [{"text": response}]})
+        response = await call_backend(backend, backend_input, max_tokens, temperature)
+        return JSONResponse({"choices": [{"text": response}],
+                             "usage": token_counter.usage(model, budget["prompt_tokens"], response)})
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
 
@@ -115,23 +593,166 @@ async def chat_completions(request: Request):
     provider = body.get("provider")
     max_tokens = body.get("max_tokens", 128)
     temperature = body.get("temperature", 0.7)
+    stream = body.get("stream", False)
     if not model:
         return JSONResponse({"error": "Model must be specified."}, status_code=400)
-    backend = get_backend(model, provider)
     try:
-        response = backend.chat(messages, max_tokens, temperature)
-        return JSONResponse({"choices": [{"message": {"role": "assistant", "content": response}}]})
+        messages, budget = await fit_to_context(model, messages, max_tokens)
+    except ContextOverflowError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    max_tokens = budget["max_tokens"]
+    if stream:
+        backend = await get_backend(model, provider, est_tokens=estimate_tokens(messages, max_tokens, model))
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        async def events():
+            yield {"id": completion_id, "object": "chat.completion.chunk", "model": model,
+                   "choices": [{"index": 0, "delta": {"role": "assistant"}, "finish_reason": None}]}
+            async for chunk in stream_backend(backend, 'chat_completions', messages, max_tokens, temperature):
+                yield {"id": completion_id, "object": "chat.completion.chunk", "model": model,
+                       "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}]}
+            yield {"id": completion_id, "object": "chat.completion.chunk", "model": model,
+                   "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        return sse_response(events())
+    try:
+        response = await cached_chat('chat_completions', model, messages, max_tokens, temperature, provider)
+        return JSONResponse({"choices": [{"message": {"role": "assistant", "content": response}}],
+                             "usage": token_counter.usage(model, budget["prompt_tokens"], response)})
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
 
+def provider_of(model: str, provider: str = None) -> str:
+    """The provider get_backend would route this model to."""
+    for name in ("io", "vllm", "hf", "rag"):
+        if provider == name or (model and model.startswith(f"{name}:")):
+            return name
+    return "io"
+
+async def execute_batch_request(endpoint: str, body):
+    """Run one batch line through the same path as the interactive endpoint; returns (status, body)."""
+    model = body.get("model")
+    max_tokens = body.get("max_tokens", 128)
+    temperature = body.get("temperature", 0.7)
+    if endpoint == "/v1/chat/completions":
+        try:
+            messages, budget = await fit_to_context(model, body.get("messages", []), max_tokens)
+        except ContextOverflowError as e:
+            return 400, {"error": str(e)}
+        response = await cached_chat('batch_chat_completions', model, messages, budget["max_tokens"], temperature,
+                                     body.get("provider"))
+        result = {"id": f"chatcmpl-{uuid.uuid4().hex}", "object": "chat.completion", "created": int(time.time()),
+                  "model": model, "choices": [{"index": 0, "message": {"role": "assistant", "content": response},
+                                               "finish_reason": "stop"}]}
+    else:
+        prompt, budget = await fit_to_context(model, body.get("prompt", ""), max_tokens)
+        backend = await get_backend(model, body.get("provider"), est_tokens=estimate_tokens(prompt, budget["max_tokens"], model))
+        backend_input = completion_input(backend, prompt)
+        if backend_input is None:
+            return 400, {"error": "Unknown backend type"}
+        response = await call_backend(backend, backend_input, budget["max_tokens"], temperature)
+        result = {"id": f"cmpl-{uuid.uuid4().hex}", "object": "text_completion", "created": int(time.time()),
+                  "model": model, "choices": [{"index": 0, "text": response, "finish_reason": "stop"}]}
+    if is_error_response(response):
+        return 502, {"error": response}
+    result["usage"] = token_counter.usage(model, budget["prompt_tokens"], response)
+    return 200, result
+
+def classify_batch_request(body):
+    text = body.get("messages") or body.get("prompt", "")
+    return (provider_of(body.get("model"), body.get("provider")), body.get("model"),
+            estimate_tokens(text, body.get("max_tokens", 128), body.get("model")))
+
+batch_config = config.get("batch", {})
+batch_manager = BatchManager(
+    batch_config.get("dir", "batches"),
+    execute=execute_batch_request,
+    classify=classify_batch_request,
+    # Batches stop short of each quota so interactive requests keep some headroom
+    admit=lambda model, est_tokens: not usage_tracker.will_exceed(model, est_tokens,
+                                                                  reserve=batch_config.get("quota_reserve", 0.2)),
+    # ...and use only a share of each provider's concurrency slots
+    limits={p: max(1, int(limit * batch_config.get("concurrency_share", 0.5)))
+            for p, limit in backend_limits.limits.items()},
+    quota_poll=batch_config.get("quota_poll", 5),
+)
+
+@app.on_event("startup")
+async def resume_batches():
+    batch_manager.resume()
+
+@app.post("/v1/files")
+async def upload_file(request: Request, client: dict = Depends(get_current_client)):
+    """Upload a batch input JSONL file, as a raw body or a multipart `file` field (OpenAI style)."""
+    file_id, path = batch_manager.new_file_path(owner=client["name"])
+    try:
+        with tool_coordinator.atomic_writer(path) as f:
+            if request.headers.get("content-type", "").startswith("multipart/form-data"):
+                form = await request.form()
+                upload = form["file"]
+                while chunk := await upload.read(1024 * 1024):
+                    await run_blocking(f.write, chunk)
+            else:
+                async for chunk in request.stream():
+                    if chunk:
+                        await run_blocking(f.write, chunk)
+    except Exception as e:
+        return JSONResponse({"error": f"Upload failed: {e}"}, status_code=400)
+    return batch_manager.file_info(file_id, owner=client["name"])
+
+@app.get("/v1/files/{file_id}")
+async def get_file(file_id: str, client: dict = Depends(get_current_client)):
+    try:
+        return batch_manager.file_info(file_id, owner=client["name"])
+    except KeyError:
+        return JSONResponse({"error": f"No such file: {file_id}"}, status_code=404)
+
+@app.get("/v1/files/{file_id}/content")
+async def get_file_content(file_id: str, client: dict = Depends(get_current_client)):
+    try:
+        batch_manager.file_info(file_id, owner=client["name"])
+    except KeyError:
+        return JSONResponse({"error": f"No such file: {file_id}"}, status_code=404)
+    return FileResponse(batch_manager.file_path(file_id), media_type="application/jsonl")
+
+@app.post("/v1/batches")
+async def create_batch(request: Request, client: dict = Depends(get_current_client)):
+    body = await request.json()
+    if not body.get("input_file_id") or not body.get("endpoint"):
+        return JSONResponse({"error": "input_file_id and endpoint must be specified"}, status_code=400)
+    try:
+        return await batch_manager.create(body["input_file_id"], body["endpoint"], body.get("completion_window", "24h"),
+                                          body.get("metadata"), owner=client["name"])
+    except KeyError:
+        return JSONResponse({"error": f"No such file: {body['input_file_id']}"}, status_code=404)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+@app.get("/v1/batches")
+async def list_batches(limit: int = 20, client: dict = Depends(get_current_client)):
+    return {"object": "list", "data": await run_blocking(batch_manager.list, limit, owner=client["name"])}
+
+@app.get("/v1/batches/{batch_id}")
+async def get_batch(batch_id: str, client: dict = Depends(get_current_client)):
+    try:
+        return await run_blocking(batch_manager.get, batch_id, owner=client["name"])
+    except KeyError:
+        return JSONResponse({"error": f"No such batch: {batch_id}"}, status_code=404)
+
+@app.post("/v1/batches/{batch_id}/cancel")
+async def cancel_batch(batch_id: str, client: dict = Depends(get_current_client)):
+    try:
+        return await batch_manager.cancel(batch_id, owner=client["name"])
+    except KeyError:
+        return JSONResponse({"error": f"No such batch: {batch_id}"}, status_code=404)
+
 @app.get("/v1/models")
 async def list_models():
-    # Unified model list from all providers
-    ioregistry.discover_all()
+    # Unified model list from all providers, served from the cached snapshot
+    ioregistry.revalidate()
     return {"models": [m["id"] for m in ioregistry.models]}
 
 @app.get("/v1/agents")
 async def list_io_agents():
+    ioregistry.revalidate()
     return {"agents": ioregistry.agents}
 
 @app.get("/openai/verify")
@@ -141,7 +762,7 @@ def openai_verify():
 
 @app.get("/openai/models")
 def openai_models():
-    ioregistry.discover_all()
+    ioregistry.revalidate()
     # Return models in OpenAI format for Open WebUI compatibility
     return {"data": [{"id": m["id"], "object": "model"} for m in ioregistry.models]}
 
@@ -153,34 +774,104 @@ async def api_generate(request: Request):
     rag = body.get("rag", False)
     if not prompt:
         return JSONResponse({"error": "Prompt must be specified."}, status_code=400)
-    classifier = TaskClassifier()
-    task = classifier.classify(prompt)
-    selector = ModelSelector()
-    model_id = selector.select(task, tags)
+    task, confidence, _ = task_classifier.classify_with_confidence(prompt)
+    model_id = model_selector.select(task, tags)
     provider = model_id.split(":")[0] if model_id else None
-    backend = get_backend(model_id, provider)
+    backend = await get_backend(model_id, provider, est_tokens=estimate_tokens(prompt, 128, model_id))
     try:
-        if hasattr(backend, 'chat'):
-            response = backend.chat([{"role": "user", "content": prompt}], 128, 0.7)
-        else:
-            response = backend.generate(prompt, 128, 0.7)
+        response = await call_backend(backend, [{"role": "user", "content": prompt}], 128, 0.7)
         return JSONResponse({
             "model": model_id,
             "task": task,
+            "task_confidence": confidence,
             "response": response
         })
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
 
+_chroma_rag = None
+_chroma_rag_lock = threading.Lock()
+
+def get_chroma_rag() -> ChromaRAG:
+    """Shared ChromaRAG instance, so the client and embedding model are loaded once per process."""
+    global _chroma_rag
+    if _chroma_rag is None:
+        with _chroma_rag_lock:
+            if _chroma_rag is None:
+                rag_config = config.get("rag", {})
+                _chroma_rag = ChromaRAG(rag_config.get("path", "./rag_db"), rag_config.get("ingest_batch_size", 256))
+    return _chroma_rag
+
 @app.post("/api/rag/add")
 async def rag_add(request: Request):
     body = await request.json()
     docs = body.get("docs")
     if not docs or not isinstance(docs, list):
         return JSONResponse({"error": "docs must be a list of strings"}, status_code=400)
-    rag = ChromaRAG()
-    rag.add_documents(docs)
-    return {"status": "added", "count": len(docs)}
+    rag = await run_blocking(get_chroma_rag)
+    result = await run_blocking(rag.add_documents, docs)
+    return {"status": "added", "count": len(docs), **result}
+
+# Progress of streaming ingestions, keyed by job id, for polling from another connection
+ingest_jobs = {}
+MAX_INGEST_JOBS = 100
+
+@app.post("/api/rag/ingest")
+async def rag_ingest(request: Request, job_id: str = Query(None)):
+    """
+    Streaming ingestion: the body is NDJSON, one document per line, either a JSON string
+    or {"text": ..., "metadata": {...}}. The body is consumed incrementally in bounded
+    batches; progress can be polled at /api/rag/ingest/{job_id} while the upload runs.
+    """
+    rag = await run_blocking(get_chroma_rag)
+    job_id = job_id or uuid.uuid4().hex
+    progress = {"job_id": job_id, "status": "running", "processed": 0, "added": 0,
+                "duplicates": 0, "batches": 0, "invalid": 0}
+    ingest_jobs[job_id] = progress
+    while len(ingest_jobs) > MAX_INGEST_JOBS:
+        ingest_jobs.pop(next(iter(ingest_jobs)))
+
+    async def lines():
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *complete, buffer = buffer.split(b"\n")
+            for line in complete:
+                yield line
+        yield buffer
+
+    docs, metadatas = [], []
+    try:
+        async for line in lines():
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+                doc, meta = (item, {}) if isinstance(item, str) else (item["text"], item.get("metadata", {}))
+                if not isinstance(doc, str):
+                    raise ValueError("text must be a string")
+            except (ValueError, KeyError, TypeError):
+                progress["invalid"] += 1
+                continue
+            docs.append(doc)
+            metadatas.append(meta)
+            if len(docs) >= rag.batch_size:
+                await run_blocking(rag.ingest_batch, docs, metadatas, progress)
+                docs, metadatas = [], []
+        if docs:
+            await run_blocking(rag.ingest_batch, docs, metadatas, progress)
+        progress["status"] = "done"
+    except Exception as e:
+        progress["status"] = "failed"
+        progress["error"] = str(e)
+        return JSONResponse(progress, status_code=500)
+    return progress
+
+@app.get("/api/rag/ingest/{job_id}")
+async def rag_ingest_status(job_id: str):
+    if job_id not in ingest_jobs:
+        return JSONResponse({"error": f"Unknown ingest job {job_id}"}, status_code=404)
+    return ingest_jobs[job_id]
 
 @app.post("/api/rag/query")
 async def rag_query(request: Request):
@@ -189,30 +880,62 @@ async def rag_query(request: Request):
     top_k = body.get("top_k", 3)
     if not query:
         return JSONResponse({"error": "query must be specified"}, status_code=400)
-    rag = ChromaRAG()
-    results = rag.query(query, top_k=top_k)
+    rag = await run_blocking(get_chroma_rag)
+    results = await run_blocking(rag.query, query, top_k=top_k)
     return {"results": results}
 
+shell_config = config.get("shell", {})
+SHELL_MAX_TIMEOUT = shell_config.get("max_timeout", 600)
+tool_coordinator = ToolCoordinator(
+    shell_timeout=shell_config.get("timeout", 10),
+    max_output_bytes=shell_config.get("max_output_bytes", 1024 * 1024),
+    max_concurrent_shells=shell_config.get("max_concurrent", 4),
+    queue_timeout=shell_config.get("queue_timeout", 30),
+    max_read_bytes=config.get("files", {}).get("max_read_bytes", 1024 * 1024),
+)
+
 @app.post("/api/tool/shell")
 async def tool_shell(request: Request):
+    """Run a shell command; with "stream": true, stdout/stderr arrive incrementally as SSE."""
     body = await request.json()
     command = body.get("command")
     if not command:
         return JSONResponse({"error": "command must be specified"}, status_code=400)
-    tools = ToolCoordinator()
-    result = tools.run_shell(command)
-    return result
+    timeout = min(float(body.get("timeout") or tool_coordinator.shell_timeout), SHELL_MAX_TIMEOUT)
+    if body.get("stream"):
+        return sse_response(tool_coordinator.astream_shell(command, timeout))
+    try:
+        return await tool_coordinator.arun_shell(command, timeout)
+    except ShellBusyError as e:
+        return JSONResponse({"error": str(e)}, status_code=429)
 
 @app.post("/api/tool/read_file")
 async def tool_read_file(request: Request):
+    """Read a file, optionally a byte range, a line range, or only lines matching `pattern`."""
     body = await request.json()
     path = body.get("path")
     if not path:
         return JSONResponse({"error": "path must be specified"}, status_code=400)
-    tools = ToolCoordinator()
-    result = tools.read_file(path)
+    result = await run_blocking(
+        tool_coordinator.read_file, path,
+        offset=int(body.get("offset") or 0),
+        length=int(body["length"]) if body.get("length") is not None else None,
+        start_line=int(body["start_line"]) if body.get("start_line") is not None else None,
+        end_line=int(body["end_line"]) if body.get("end_line") is not None else None,
+        pattern=body.get("pattern"),
+        ignore_case=bool(body.get("ignore_case")),
+        max_matches=int(body.get("max_matches") or 1000),
+    )
     return result
 
+@app.get("/api/tool/download")
+async def tool_download(path: str, offset: int = 0, length: int = None):
+    """Stream a file (or a byte range of it) without loading it into memory."""
+    if not os.path.isfile(path):
+        return JSONResponse({"error": f"{path} is not a file"}, status_code=404)
+    return StreamingResponse(tool_coordinator.iter_file(path, offset, length), media_type="application/octet-stream",
+                             headers={"Content-Disposition": f'attachment; filename="{os.path.basename(path)}"'})
+
 @app.post("/api/tool/write_file")
 async def tool_write_file(request: Request):
     body = await request.json()
@@ -220,14 +943,39 @@ async def tool_write_file(request: Request):
     content = body.get("content")
     if not path or content is None:
         return JSONResponse({"error": "path and content must be specified"}, status_code=400)
-    tools = ToolCoordinator()
-    result = tools.write_file(path, content)
+    result = await run_blocking(tool_coordinator.write_file, path, content)
     return result
 
+@app.put("/api/tool/upload")
+async def tool_upload(request: Request, path: str):
+    """
+    Stream the raw request body (e.g. chunked transfer encoding) to path. The data lands in a
+    temporary file that replaces path only once the whole body has arrived.
+    """
+    written = 0
+    try:
+        with tool_coordinator.atomic_writer(path) as f:
+            async for chunk in request.stream():
+                if chunk:
+                    await run_blocking(f.write, chunk)
+                    written += len(chunk)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+    return {"status": "written", "bytes": written}
+
+tools_config = config.get("tools", {})
+tool_registry = ToolRegistry(
+    check_interval=tools_config.get("check_interval", 1.0),
+    default_mode=tools_config.get("default_mode", "thread"),
+    default_timeout=tools_config.get("default_timeout", 30),
+    default_max_concurrency=tools_config.get("default_max_concurrency", 4),
+    overrides=tools_config.get("overrides"),
+    thread_workers=tools_config.get("thread_workers", 8),
+)
+
 @app.get("/api/tools")
 async def list_tools():
-    registry = ToolRegistry()
-    return {"tools": registry.list_tools()}
+    return {"tools": tool_registry.list_tools(), "stats": tool_registry.stats()}
 
 @app.post("/api/tools/run")
 async def run_tool(request: Request):
@@ -235,10 +983,21 @@ async def run_tool(request: Request):
     name = body.get("name")
     args = body.get("args", [])
     kwargs = body.get("kwargs", {})
-    registry = ToolRegistry()
-    result = registry.run_tool(name, *args, **kwargs)
+    try:
+        result = await tool_registry.arun(name, args, kwargs)
+    except asyncio.TimeoutError:
+        return JSONResponse({"error": f"Tool {name} timed out"}, status_code=504)
     return result
 
+orchestrator_config = config.get("orchestrator", {})
+orchestrator_settings = dict(
+    max_parallel=orchestrator_config.get("max_parallel", 8),
+    step_timeout=orchestrator_config.get("step_timeout", 60),
+    attempts=orchestrator_config.get("attempts", 3),
+    backoff_base=orchestrator_config.get("backoff_base", 0.5),
+    backoff_max=orchestrator_config.get("backoff_max", 10),
+)
+
 @app.post("/api/orchestrate")
 async def api_orchestrate(request: Request):
     body = await request.json()
@@ -246,27 +1005,70 @@ async def api_orchestrate(request: Request):
     steps = body.get("steps", [])
     if not task or not steps:
         return JSONResponse({"error": "task and steps must be specified"}, status_code=400)
-    from .model_selector import ModelSelector
-    from .tool_registry import ToolRegistry
-    orchestrator = Orchestrator(ModelSelector(), ToolRegistry())
+    orchestrator = Orchestrator(model_selector, tool_registry, **orchestrator_settings)
     # Sanitize all step args/kwargs
     for step in steps:
         if 'args' in step:
             step['args'] = [sanitize_input(str(a)) for a in step['args']]
         if 'kwargs' in step:
             step['kwargs'] = {k: sanitize_input(str(v)) for k, v in step['kwargs'].items()}
-    results = orchestrator.orchestrate(task, steps)
-    telemetry.log('orchestrate', {'task': task, 'steps': steps, 'results': results})
-    return {"results": results}
+    try:
+        run = await orchestrator.run(task, steps)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    telemetry.log('orchestrate', {'task': task, 'steps': run["steps"], 'wall_time': run["wall_time"]})
+    return run
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(telemetry.prometheus(), media_type="text/plain; version=0.0.4")
 
 @app.get("/api/telemetry")
 async def api_telemetry():
-    return telemetry.get_metrics()
+    return {**telemetry.summary(), "event_counts": await run_blocking(telemetry.get_counts), "response_cache": response_cache.stats(), "semantic_cache": semantic_cache.stats(), "journal": journal.stats()}
+
+@app.get("/api/backends")
+async def api_backends():
+    """Backend pool stats: hits, misses, evictions, load times and loaded instances"""
+    batching = {f"{p}:{m}": b.scheduler.stats() for (p, m), b in list(backend_pool.instances.items())
+                if hasattr(b, "scheduler")}
+    return {**backend_pool.stats(), "concurrency": backend_limits.stats(), "batching": batching}
+
+@app.get("/api/routing")
+async def api_routing():
+    """Routing policy and per-model latency, p95, error rate and tokens/sec"""
+    return {"policy": model_selector.routing.get("policy", "first"), "models": model_stats.summary(),
+            "hedging": hedger.stats()}
+
+@app.get("/api/usage")
+async def api_usage():
+    """Per-model used, remaining and projected requests/tokens in the current usage window"""
+    return await run_blocking(usage_tracker.budgets)
+
+@app.get("/api/health")
+async def api_health():
+    """Provider probe results, circuit breaker states and per-model health"""
+    return health_prober.summary()
+
+@app.get("/api/registry")
+async def api_registry():
+    """Model registry snapshot age, size and per-source discovery errors"""
+    return ioregistry.snapshot_info()
 
 # Client-specific endpoints for business applications
 
+@app.post("/v1/admin/reload-routing")
+async def reload_routing(client: dict = Depends(get_admin_client)):
+    """Rebuild the model routing index from config.yaml without waiting for the mtime check"""
+    try:
+        model_selector.reload()
+    except Exception as e:
+        return JSONResponse({"error": f"Reload failed: {str(e)}"}, status_code=500)
+    return {"success": True, "models": len(model_selector.models)}
+
 @app.post("/v1/admin/parse-command")
-async def parse_admin_command(request: Request, client: dict = Depends(get_admin_client)):
+async def parse_admin_command(request: Request, client: dict = Depends(rate_limited(get_admin_client))):
     """Parse natural language admin commands for content management systems"""
     body = await request.json()
     command = body.get("command")
@@ -279,8 +1081,6 @@ async def parse_admin_command(request: Request, client: dict = Depends(get_admin
     command = sanitize_input(command)
     
     # Use AI to parse the command
-    backend = get_backend(DEFAULT_CHAT_MODEL)
-    
     prompt = f"""Parse this admin command for a {context}:
 
 Command: "{command}"
@@ -294,9 +1094,9 @@ Return as JSON:
 {{"target": "...", "action": "...", "parameters": {{...}}}}"""
 
     try:
-        response = backend.chat([{"role": "user", "content": prompt}], max_tokens=256, temperature=0.1)
+        response = await cached_chat('admin_parse_command', DEFAULT_CHAT_MODEL, [{"role": "user", "content": prompt}], max_tokens=256, temperature=0.1,
+                                    validate=is_json)
         # Parse the JSON response
-        import json
         parsed = json.loads(response.strip())
         
         telemetry.log('admin_command_parse', {'command': command, 'context': context, 'parsed': parsed})
@@ -305,13 +1105,14 @@ Return as JSON:
         return JSONResponse({"error": f"Failed to parse command: {str(e)}"}, status_code=500)
 
 @app.post("/v1/business/chat")
-async def business_chat(request: Request, client: dict = Depends(get_current_client)):
+async def business_chat(request: Request, client: dict = Depends(rate_limited())):
     """Chat endpoint tailored for business websites with context awareness"""
     body = await request.json()
     message = body.get("message")
     business_type = body.get("business_type", "service")
     business_context = body.get("business_context", {})
     session_id = body.get("session_id")
+    stream = body.get("stream", False)
     
     if not message:
         return JSONResponse({"error": "message must be specified"}, status_code=400)
@@ -332,10 +1133,22 @@ User Message: {message}
 
 Respond helpfully and professionally, staying in character for this business."""
 
-    backend = get_backend(DEFAULT_CHAT_MODEL)
+    if stream:
+        backend = await get_backend(DEFAULT_CHAT_MODEL, est_tokens=estimate_tokens(context_prompt, 512, DEFAULT_CHAT_MODEL))
+        async def events():
+            async for chunk in stream_backend(backend, 'business_chat', [{"role": "user", "content": context_prompt}], 512, 0.7):
+                yield {"delta": chunk, "session_id": session_id}
+            telemetry.log('business_chat', {
+                'business_type': business_type,
+                'session_id': session_id,
+                'message_length': len(message)
+            })
+            yield {"session_id": session_id, "business_type": business_type, "success": True}
+        return sse_response(events())
     
     try:
-        response = backend.chat([{"role": "user", "content": context_prompt}], max_tokens=512, temperature=0.7)
+        response = await semantic_chat('business_chat', {'business_type': business_type, 'business_context': business_context},
+                                       message, DEFAULT_CHAT_MODEL, [{"role": "user", "content": context_prompt}], max_tokens=512, temperature=0.7)
         
         telemetry.log('business_chat', {
             'business_type': business_type, 
@@ -353,7 +1166,7 @@ Respond helpfully and professionally, staying in character for this business."""
         return JSONResponse({"error": f"Chat failed: {str(e)}"}, status_code=500)
 
 @app.post("/v1/content/generate")
-async def generate_content(request: Request, client: dict = Depends(get_current_client)):
+async def generate_content(request: Request, client: dict = Depends(rate_limited())):
     """Generate content for business websites"""
     body = await request.json()
     content_type = body.get("content_type")  # hero, service_description, testimonial, etc.
@@ -375,10 +1188,8 @@ Requirements: {requirements}
 
 Generate professional, engaging content that converts visitors into customers."""
 
-    backend = get_backend(DEFAULT_CONTENT_MODEL)
-    
     try:
-        content = backend.chat([{"role": "user", "content": prompt}], max_tokens=1024, temperature=0.8)
+        content = await cached_chat('content_generate', DEFAULT_CONTENT_MODEL, [{"role": "user", "content": prompt}], max_tokens=1024, temperature=0.8)
         
         telemetry.log('content_generation', {
             'content_type': content_type,
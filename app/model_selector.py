@@ -1,22 +1,118 @@
+import os
+import time
+import random
+import logging
+import threading
 import yaml
 from .task_classifier import TaskClassifier
 
+class RoutingIndex:
+    """Precomputed task -> tag -> ordered candidates lookup built from the config's model list."""
+    def __init__(self, models):
+        self.models = models
+        self.by_task = {}
+        self.by_task_tag = {}
+        for position, m in enumerate(models):
+            for task in m.get("tasks", []):
+                self.by_task.setdefault(task, []).append(m["id"])
+                for tag in m.get("tags", []):
+                    self.by_task_tag.setdefault((task, tag), []).append((position, m["id"]))
+        self.first = models[0]["id"] if models else None
+        self.cost = {m["id"]: m.get("cost", 0.0) for m in models}
+
+POLICIES = ("first", "lowest_latency", "cheapest", "weighted_random")
+
 class ModelSelector:
-    def __init__(self, config_path="config.yaml"):
-        with open(config_path, "r") as f:
-            self.config = yaml.safe_load(f)
-        self.models = self.config.get("models", [])
-
-    def select(self, task: str, tags=None):
-        tags = tags or []
-        # Prefer models that match the task and tags
-        for m in self.models:
-            if task in m.get("tasks", []):
-                if not tags or any(tag in m.get("tags", []) for tag in tags):
-                    return m["id"]
-        # Fallback: return first model for the task
-        for m in self.models:
-            if task in m.get("tasks", []):
-                return m["id"]
-        # Fallback: return first model
-        return self.models[0]["id"] if self.models else None
+    def __init__(self, config_path="config.yaml", check_interval: float = 1.0, stats=None, breakers=None):
+        self.config_path = config_path
+        self.check_interval = check_interval
+        self.stats = stats  # ModelStats used by the adaptive policies; None means always "first"
+        self.breakers = breakers  # CircuitBreakers; models with open circuits are skipped
+        self.routing = {}
+        self.lock = threading.Lock()
+        self.mtime = None
+        self.last_check = 0.0
+        self.config = {}
+        self.models = []
+        self.index = RoutingIndex([])
+        self.reload()
+
+    def reload(self):
+        """Re-read the config and atomically swap in a freshly built routing index."""
+        with self.lock:
+            mtime = os.path.getmtime(self.config_path)
+            with open(self.config_path, "r") as f:
+                config = yaml.safe_load(f) or {}
+            models = config.get("models", [])
+            index = RoutingIndex(models)
+            routing = config.get("routing", {})
+            if routing.get("policy", "first") not in POLICIES:
+                raise ValueError(f"Unknown routing policy {routing.get('policy')}; expected one of {POLICIES}")
+            self.config, self.models, self.index, self.routing, self.mtime = config, models, index, routing, mtime
+            self.last_check = time.time()
+        logging.info(f"[ModelSelector] loaded {len(models)} models from {self.config_path}")
+
+    def _maybe_reload(self):
+        # stat() the file at most once per check_interval; reparse only when it changed
+        now = time.time()
+        if now - self.last_check < self.check_interval:
+            return
+        self.last_check = now
+        try:
+            if os.path.getmtime(self.config_path) != self.mtime:
+                self.reload()
+        except Exception as e:
+            logging.warning(f"[ModelSelector] config reload failed, keeping current index: {e}")
+
+    def candidates(self, task: str, tags=None):
+        """Eligible model ids in config order: task+tag matches if any, else task matches."""
+        index = self.index
+        if tags:
+            matched = set()
+            for tag in tags:
+                matched.update(index.by_task_tag.get((task, tag), []))
+            if matched:
+                return [model_id for _, model_id in sorted(matched)]
+        return list(index.by_task.get(task, []))
+
+    def select(self, task: str, tags=None, policy: str = None):
+        self._maybe_reload()
+        candidates = self.candidates(task, tags or [])
+        if not candidates:
+            # Fallback: return first model
+            return self.index.first
+        return self.pick(candidates, policy)
+
+    def pick(self, candidates, policy: str = None):
+        """Choose among eligible candidates using live model stats and the configured policy."""
+        policy = policy or self.routing.get("policy", "first")
+        if self.breakers is not None:
+            # Skip open circuits unless every candidate is open
+            candidates = [m for m in candidates if not self.breakers.is_open(m)] or candidates
+        if policy == "first" or self.stats is None or len(candidates) == 1:
+            return candidates[0]
+        stats = {m: self.stats.get(m) for m in candidates}
+        # Drop degraded models unless every candidate is degraded; after a cooldown they
+        # become eligible again so a recovered provider can earn traffic back
+        max_error_rate = self.routing.get("max_error_rate", 0.5)
+        min_samples = self.routing.get("min_samples", 5)
+        cooldown = self.routing.get("degraded_cooldown", 30)
+        now = time.time()
+        healthy = [m for m in candidates
+                   if not (stats[m] and stats[m]["requests"] >= min_samples and stats[m]["error_rate"] > max_error_rate
+                           and now - stats[m]["last_seen"] < cooldown)]
+        candidates = healthy or candidates
+        if policy == "cheapest":
+            return min(candidates, key=lambda m: self.index.cost.get(m, 0.0))
+        # Untried models are explored: first under lowest_latency, at the best observed weight otherwise
+        def expected_latency(m):
+            if stats[m] is None:
+                return 0.0
+            if not stats[m]["ewma_latency"]:
+                return float("inf")  # Tried but never succeeded
+            return stats[m]["ewma_latency"] * (1 + stats[m]["error_rate"])
+        if policy == "lowest_latency":
+            return min(candidates, key=expected_latency)
+        weights = {m: 1 / expected_latency(m) for m in candidates if stats[m] is not None}
+        default = max(weights.values()) if weights else 1.0
+        return random.choices(candidates, weights=[max(weights.get(m, default), 1e-6) for m in candidates])[0]
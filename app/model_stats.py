@@ -0,0 +1,70 @@
+"""
+Online per-model performance statistics for adaptive routing
+- EWMA latency, p95 over a recent window, EWMA error rate and tokens/sec
+- Recorded around each backend call; read by ModelSelector routing policies
+"""
+
+import time
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+class ModelStats:
+    def __init__(self, alpha: float = 0.2, window: int = 200):
+        self.alpha = alpha
+        self.window = window
+        self.stats: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+
+    def _entry(self, model_id: str) -> Dict[str, Any]:
+        if model_id not in self.stats:
+            self.stats[model_id] = {
+                "requests": 0, "errors": 0, "ewma_latency": None, "error_rate": 0.0,
+                "tokens_per_sec": None, "recent": deque(maxlen=self.window), "last_seen": None,
+            }
+        return self.stats[model_id]
+
+    def record(self, model_id: str, latency: float, success: bool = True, tokens: Optional[int] = None):
+        a = self.alpha
+        with self.lock:
+            s = self._entry(model_id)
+            s["requests"] += 1
+            s["last_seen"] = time.time()
+            s["error_rate"] = (1 - a) * s["error_rate"] + a * (0.0 if success else 1.0)
+            if not success:
+                s["errors"] += 1
+                return
+            s["recent"].append(latency)
+            s["ewma_latency"] = latency if s["ewma_latency"] is None else (1 - a) * s["ewma_latency"] + a * latency
+            if tokens and latency > 0:
+                tps = tokens / latency
+                s["tokens_per_sec"] = tps if s["tokens_per_sec"] is None else (1 - a) * s["tokens_per_sec"] + a * tps
+
+    def get(self, model_id: str) -> Optional[Dict[str, Any]]:
+        """Snapshot for one model, or None if it has never been called."""
+        with self.lock:
+            s = self.stats.get(model_id)
+            if s is None:
+                return None
+            recent = sorted(s["recent"])
+            return {
+                "requests": s["requests"],
+                "errors": s["errors"],
+                "ewma_latency": s["ewma_latency"],
+                "p95_latency": recent[max(0, int(len(recent) * 0.95) - 1)] if recent else None,
+                "error_rate": s["error_rate"],
+                "tokens_per_sec": s["tokens_per_sec"],
+                "last_seen": s["last_seen"],
+            }
+
+    def percentile(self, model_id: str, q: float) -> Optional[float]:
+        """q-th percentile (0-100) of recent successful latencies, or None without samples."""
+        with self.lock:
+            s = self.stats.get(model_id)
+            recent = sorted(s["recent"]) if s else []
+        if not recent:
+            return None
+        return recent[min(len(recent) - 1, max(0, int(len(recent) * q / 100.0 + 0.5) - 1))]
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        return {model_id: self.get(model_id) for model_id in list(self.stats)}
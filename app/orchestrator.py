@@ -1,33 +1,154 @@
+"""
+DAG-based orchestration of tool steps
+- Steps declare `id` and `depends_on`, and may reference earlier outputs as "{{step_id}}" or "{{step_id.field}}"
+- Independent steps run concurrently (at most max_parallel), each in its tool's execution mode
+- Per-step timeouts, retries with exponential backoff and full jitter; thread-mode steps are
+  not retried after a timeout, since the abandoned thread is still running
+- A failed step cancels every step that depends on it, directly or transitively
+"""
+
+import re
 import time
+import random
+import asyncio
 import logging
+from typing import Any, Dict, List
+from .sanitize import sanitize_input
+
+REFERENCE = re.compile(r"\{\{\s*([\w\-]+)((?:\.[\w\-]+)*)\s*\}\}")
 
 class Orchestrator:
-    def __init__(self, model_selector, tool_registry):
+    def __init__(self, model_selector, tool_registry, max_parallel: int = 8, step_timeout: float = 60.0,
+                 attempts: int = 3, backoff_base: float = 0.5, backoff_max: float = 10.0):
         self.model_selector = model_selector
         self.tool_registry = tool_registry
+        self.max_parallel = max_parallel
+        self.step_timeout = step_timeout
+        self.attempts = attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
 
-    def orchestrate(self, task, steps):
-        results = []
+    def plan(self, steps) -> Dict[str, List[str]]:
+        """
+        Assign ids (default: position) and return step id -> dependencies, including ones
+        implied by output references. Raises ValueError on unknown ids or cycles.
+        """
+        for position, step in enumerate(steps):
+            step.setdefault("id", str(position))
+        ids = [step["id"] for step in steps]
+        if len(set(ids)) != len(ids):
+            raise ValueError("Step ids must be unique")
+        deps = {}
         for step in steps:
-            tool = self.tool_registry.tools.get(step['tool'])
-            if not tool:
-                results.append({"error": f"Tool {step['tool']} not found"})
-                continue
-            retries = 0
-            while retries < 3:
-                try:
-                    result = tool(*step.get('args', []), **step.get('kwargs', {}))
-                    if self.validate(result):
-                        results.append(result)
-                        break
-                    else:
-                        retries += 1
-                except Exception as e:
-                    logging.error(f"Orchestration error: {e}")
-                    retries += 1
-            else:
-                results.append({"error": f"Step {step['tool']} failed after retries"})
-        return results
+            referenced = {m.group(1) for value in self._strings(step) for m in REFERENCE.finditer(value)}
+            deps[step["id"]] = list(dict.fromkeys(list(step.get("depends_on", [])) + sorted(referenced)))
+            unknown = [d for d in deps[step["id"]] if d not in ids]
+            if unknown:
+                raise ValueError(f"Step {step['id']} depends on unknown step(s) {unknown}")
+        # Kahn's algorithm: anything left unvisited is on a cycle
+        remaining = {step_id: len(d) for step_id, d in deps.items()}
+        ready = [step_id for step_id, n in remaining.items() if n == 0]
+        visited = 0
+        while ready:
+            current = ready.pop()
+            visited += 1
+            for step_id, d in deps.items():
+                if current in d:
+                    remaining[step_id] -= 1
+                    if remaining[step_id] == 0:
+                        ready.append(step_id)
+        if visited != len(ids):
+            raise ValueError(f"Dependency cycle among steps {[s for s, n in remaining.items() if n > 0]}")
+        return deps
+
+    @staticmethod
+    def _strings(step):
+        values = list(step.get("args", [])) + list(step.get("kwargs", {}).values())
+        return [v for v in values if isinstance(v, str)]
+
+    def _resolve(self, value, outputs):
+        """Replace output references: a whole-string reference keeps the output's type."""
+        if not isinstance(value, str):
+            return value
+        def lookup(match):
+            result = outputs[match.group(1)]
+            for field in filter(None, match.group(2).split(".")):
+                result = result[int(field)] if isinstance(result, (list, tuple)) else result[field]
+            return result
+        whole = REFERENCE.fullmatch(value.strip())
+        if whole:
+            return lookup(whole)
+        return REFERENCE.sub(lambda m: sanitize_input(str(lookup(m))), value)
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff before retry number attempt + 1."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def _execute(self, step, outputs) -> Dict[str, Any]:
+        if not self.tool_registry.has(step["tool"]):
+            return {"status": "failed", "attempts": 0, "error": f"Tool {step['tool']} not found"}
+        try:
+            args = [self._resolve(a, outputs) for a in step.get("args", [])]
+            kwargs = {k: self._resolve(v, outputs) for k, v in step.get("kwargs", {}).items()}
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            return {"status": "failed", "attempts": 0, "error": f"Unresolvable reference: {e}"}
+        timeout = step.get("timeout", self.step_timeout)
+        attempts = max(1, step.get("attempts", self.attempts))
+        error = None
+        for attempt in range(attempts):
+            try:
+                result = await self.tool_registry.arun(step["tool"], args, kwargs, timeout=timeout)
+                if self.validate(result):
+                    return {"status": "ok", "attempts": attempt + 1, "result": result}
+                error = "Result failed validation"
+            except asyncio.TimeoutError:
+                error = f"Timed out after {timeout}s"
+                # A timed-out thread keeps running and holding a tool slot; retrying would only stack more
+                if self.tool_registry.settings(step["tool"])["mode"] == "thread":
+                    return {"status": "failed", "attempts": attempt + 1,
+                            "error": f"Step {step['tool']} failed: {error}"}
+            except Exception as e:
+                logging.error(f"Orchestration error: {e}")
+                error = str(e)
+            if attempt < attempts - 1:
+                await asyncio.sleep(self.backoff(attempt))
+        return {"status": "failed", "attempts": attempts, "error": f"Step {step['tool']} failed after retries: {error}"}
+
+    async def run(self, task, steps) -> Dict[str, Any]:
+        """Execute steps as a DAG; returns results in step order plus per-step status and timings."""
+        deps = self.plan(steps)
+        by_id = {step["id"]: step for step in steps}
+        semaphore = asyncio.Semaphore(self.max_parallel)
+        outputs, status = {}, {}
+        start = time.time()
+
+        async def run_step(step_id):
+            for dep in deps[step_id]:
+                await futures[dep]
+            failed = [dep for dep in deps[step_id] if status[dep]["status"] != "ok"]
+            if failed:
+                status[step_id] = {"status": "cancelled", "attempts": 0,
+                                   "error": f"Cancelled: dependency {failed[0]} did not complete"}
+                return
+            async with semaphore:
+                step_start = time.time()
+                status[step_id] = await self._execute(by_id[step_id], outputs)
+                status[step_id]["duration"] = time.time() - step_start
+            if status[step_id]["status"] == "ok":
+                outputs[step_id] = status[step_id]["result"]
+
+        futures = {step_id: asyncio.ensure_future(run_step(step_id)) for step_id in deps}
+        await asyncio.gather(*futures.values())
+        results = [outputs[s["id"]] if s["id"] in outputs else {"error": status[s["id"]]["error"]} for s in steps]
+        return {
+            "results": results,
+            "steps": {s["id"]: {k: v for k, v in status[s["id"]].items() if k != "result"} for s in steps},
+            "wall_time": time.time() - start,
+        }
+
+    def orchestrate(self, task, steps):
+        """Synchronous entry point returning only the per-step results."""
+        return asyncio.run(self.run(task, steps))["results"]
 
     def validate(self, result):
         # Placeholder: always true, can add more logic
@@ -2,27 +2,66 @@ import os
 from typing import List, Dict, Any
 from transformers import pipeline
 import torch
+from .concurrency import run_blocking
+from .vector_index import VectorIndex
 
 class RAGBackend:
     """
     Simple RAG (Retrieval-Augmented Generation) backend using HuggingFace pipelines and local corpus.
     """
-    def __init__(self, model_name: str, corpus: List[str]):
+    provider = "rag"
+
+    def __init__(self, model_name: str, corpus: List[str], token_counter=None):
         self.model_name = model_name
-        self.corpus = corpus
+        self.token_counter = token_counter  # Bounds retrieved context to the model's prompt budget
+        self.corpus = []
         self.device = 0 if torch.cuda.is_available() else -1
         self.generator = pipeline("text-generation", model=model_name, device=self.device)
         # For demo: use a simple embedding model for retrieval
         self.embedder = pipeline("feature-extraction", model="sentence-transformers/all-MiniLM-L6-v2", device=self.device)
+        # Corpus embeddings are computed once and kept as a normalized matrix
+        self.index = VectorIndex()
+        self.add_documents(corpus)
+
+    def embed(self, texts: List[str]):
+        # First-token embedding per text, computed in batches
+        outputs = self.embedder(texts, batch_size=32)
+        return [out[0][0] for out in outputs]
+
+    def add_documents(self, docs: List[str]):
+        """Embed new documents and append them to the corpus index."""
+        if not docs:
+            return
+        embeddings = self.embed(docs)
+        # Extend the corpus before the index so concurrent searches never see unknown rows
+        self.corpus.extend(docs)
+        self.index.add(embeddings)
+
+    def retrieve_batch(self, queries: List[str], top_k: int = 3) -> List[List[str]]:
+        # Embed all queries together and score them against the corpus matrix in one product
+        hits = self.index.search_batch(self.embed(queries), top_k)
+        return [[self.corpus[i] for i, _ in row] for row in hits]
 
     def retrieve(self, query: str, top_k: int = 3) -> List[str]:
-        # Embed query and corpus, return top_k most similar
-        import numpy as np
-        query_emb = self.embedder(query)[0][0]
-        corpus_embs = [self.embedder(doc)[0][0] for doc in self.corpus]
-        sims = [np.dot(query_emb, doc_emb) / (np.linalg.norm(query_emb) * np.linalg.norm(doc_emb)) for doc_emb in corpus_embs]
-        top_indices = np.argsort(sims)[-top_k:][::-1]
-        return [self.corpus[i] for i in top_indices]
+        return self.retrieve_batch([query], top_k)[0]
+
+    def fit_context(self, docs: List[str], query: str, max_new_tokens: int) -> str:
+        """Join retrieved docs, best first, up to the tokens left after the query and completion."""
+        if self.token_counter is None:
+            return "\n".join(docs)
+        model_id = f"rag:{self.model_name}"
+        remaining = (self.token_counter.prompt_budget(model_id, max_new_tokens)
+                     - self.token_counter.count(model_id, f"Context:\n\n\nUser: {query}\nAssistant:"))
+        kept = []
+        for doc in docs:
+            tokens = self.token_counter.count(model_id, doc + "\n")
+            if tokens > remaining:
+                # Partially include the doc that crosses the budget, then stop
+                kept.append(self.token_counter.truncate(model_id, doc, remaining - 1))
+                break
+            kept.append(doc)
+            remaining -= tokens
+        return "\n".join(d for d in kept if d)
 
     def chat(self, messages: List[Dict[str, Any]], max_new_tokens: int = 128, temperature: float = 0.7):
         # Use last user message as query
@@ -31,8 +70,15 @@ class RAGBackend:
             if m.get("role") == "user":
                 query = m.get("content", "")
                 break
-        context_docs = self.retrieve(query)
-        context = "\n".join(context_docs)
+        context = self.fit_context(self.retrieve(query), query, max_new_tokens)
         prompt = f"Context:\n{context}\n\nUser: {query}\nAssistant:"
         response = self.generator(prompt, max_new_tokens=max_new_tokens, temperature=temperature, do_sample=True)[0]["generated_text"]
         return response[len(prompt):].strip()
+
+    async def achat(self, messages: List[Dict[str, Any]], max_new_tokens: int = 128, temperature: float = 0.7):
+        # Embedding and generation run locally; keep them off the event loop
+        return await run_blocking(self.chat, messages, max_new_tokens, temperature)
+
+    async def astream(self, messages: List[Dict[str, Any]], max_new_tokens: int = 128, temperature: float = 0.7):
+        # The local pipeline returns whole completions, so the stream is a single chunk
+        yield await self.achat(messages, max_new_tokens, temperature)
@@ -6,35 +6,134 @@ Unified Model & Agent Registry for vibe-llm
 """
 
 from typing import List, Dict, Any
+import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from .iointel_backend import IOIntelligenceBackend
 
 class ModelRegistry:
-    def __init__(self):
+    def __init__(self, ttl: float = 300, store=None):
         self.models = []  # List of dicts: {id, provider, tasks, health, ...}
         self.agents = []  # List of dicts: {id, provider, description, ...}
+        self.ttl = ttl
+        self.refreshed_at = 0.0
+        self.last_error = {}  # source -> last discovery error
+        self._sources = {}  # source -> last good result
+        self.health = {}  # model id -> health, reapplied to each new snapshot
+        self._refresh_lock = threading.Lock()
+        self.store = store  # Optional shared state store; workers reuse each other's fresh snapshots
 
     def discover_all(self):
         """Discover models and agents from all providers."""
-        self.models = self._discover_io_models() + self._discover_hf_models()
-        self.agents = self._discover_io_agents()
+        self.refresh()
 
-    def _discover_hf_models(self) -> List[Dict[str, Any]]:
-        from .hf_backend import HuggingFaceBackend
+    def refresh(self):
+        """
+        Run every provider's discovery concurrently and swap in a new snapshot.
+        A source that fails keeps its last good result instead of emptying the listing.
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            return  # A refresh is already running; readers keep the current snapshot
         try:
-            model_ids = HuggingFaceBackend.list_text_generation_models(limit=20)
-            return [{
-                "id": f"hf:{m}",
-                "provider": "hf",
-                "tasks": ["chat", "text-generation"],
-                "health": "unknown"
-            } for m in model_ids]
+            if self._adopt_shared():
+                return  # Another worker refreshed recently; skip the upstream calls
+            discoveries = {
+                "io_models": self._discover_io_models,
+                "hf_models": self._discover_hf_models,
+                "io_agents": self._discover_io_agents,
+            }
+            with ThreadPoolExecutor(max_workers=len(discoveries)) as pool:
+                futures = {name: pool.submit(fn) for name, fn in discoveries.items()}
+            for name, future in futures.items():
+                try:
+                    self._sources[name] = future.result()
+                    self.last_error.pop(name, None)
+                except Exception as e:
+                    logging.warning(f"[ModelRegistry] {name} discovery failed, keeping last snapshot: {e}")
+                    self.last_error[name] = str(e)
+            # Rebind whole lists so concurrent readers always see a consistent snapshot
+            models = self._sources.get("io_models", []) + self._sources.get("hf_models", [])
+            self.models = [{**m, "health": self.health.get(m["id"], m.get("health", "unknown"))} for m in models]
+            self.agents = self._sources.get("io_agents", [])
+            self.refreshed_at = time.time()
+            self._publish_shared()
+        finally:
+            self._refresh_lock.release()
+
+    def _adopt_shared(self) -> bool:
+        """Swap in the shared snapshot if it is fresh and newer than ours."""
+        if self.store is None:
+            return False
+        try:
+            shared = self.store.get_json("registry:snapshot")
         except Exception as e:
-            logging.warning(f"Could not discover HuggingFace models: {e}")
-            return []
+            logging.warning(f"[ModelRegistry] reading shared snapshot failed: {e}")
+            return False
+        if not shared or shared["refreshed_at"] <= self.refreshed_at or time.time() - shared["refreshed_at"] > self.ttl:
+            return False
+        self.models = [{**m, "health": self.health.get(m["id"], m.get("health", "unknown"))} for m in shared["models"]]
+        self.agents = shared["agents"]
+        self.refreshed_at = shared["refreshed_at"]
+        return True
+
+    def _publish_shared(self):
+        if self.store is None:
+            return
+        try:
+            self.store.set_json("registry:snapshot", {
+                "models": self.models, "agents": self.agents, "refreshed_at": self.refreshed_at,
+            })
+        except Exception as e:
+            logging.warning(f"[ModelRegistry] publishing shared snapshot failed: {e}")
+
+    def is_stale(self) -> bool:
+        return time.time() - self.refreshed_at > self.ttl
+
+    def revalidate(self):
+        """Stale-while-revalidate: if the snapshot is stale, refresh it in the background."""
+        if self.is_stale() and not self._refresh_lock.locked():
+            threading.Thread(target=self.refresh, name="vibe-registry-refresh", daemon=True).start()
+
+    def start_background_refresh(self, interval: float = None):
+        """Refresh the snapshot now and then every interval seconds (default: ttl) on a daemon thread."""
+        def loop():
+            while True:
+                self.refresh()
+                time.sleep(interval or self.ttl)
+        threading.Thread(target=loop, name="vibe-registry-refresh", daemon=True).start()
+
+    def set_health(self, model_id: str, health: str):
+        self.health[model_id] = health
+        for m in self.models:
+            if m["id"] == model_id:
+                m["health"] = health
+
+    def snapshot_info(self) -> Dict[str, Any]:
+        return {
+            "refreshed_at": self.refreshed_at,
+            "age": time.time() - self.refreshed_at if self.refreshed_at else None,
+            "ttl": self.ttl,
+            "models": len(self.models),
+            "agents": len(self.agents),
+            "errors": dict(self.last_error),
+        }
+
+    def _discover_hf_models(self) -> List[Dict[str, Any]]:
+        from .hf_backend import HuggingFaceBackend
+        model_ids = HuggingFaceBackend.list_text_generation_models(limit=20)
+        return [{
+            "id": f"hf:{m}",
+            "provider": "hf",
+            "tasks": ["chat", "text-generation"],
+            "health": "unknown"
+        } for m in model_ids]
 
     def _discover_io_models(self):
         model_ids = IOIntelligenceBackend.list_io_models()
+        errors = [m for m in model_ids if isinstance(m, str) and m.startswith("[IO Intelligence Error]")]
+        if errors:
+            raise RuntimeError(errors[0])
         # Add metadata for each model
         return [{
             "id": m,
@@ -45,6 +144,9 @@ class ModelRegistry:
 
     def _discover_io_agents(self):
         agents = IOIntelligenceBackend.list_io_agents()
+        errors = [a["error"] for a in agents if isinstance(a, dict) and "error" in a]
+        if errors:
+            raise RuntimeError(errors[0])
         # Add provider field
         return [{**a, "provider": "io"} for a in agents if isinstance(a, dict) and "id" in a]
 
@@ -64,6 +166,6 @@ class ModelRegistry:
         return results
 
 # Usage example (to be used in main.py or routers):
-# registry = ModelRegistry()
-# registry.discover_all()
+# registry = ModelRegistry(ttl=300)
+# registry.refresh()  # or registry.revalidate() on reads to refresh stale snapshots in the background
 # models = registry.get_models(task="text-generation")
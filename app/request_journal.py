@@ -0,0 +1,142 @@
+"""
+Request/response journal for vibe-llm
+- record() only samples and enqueues; a background thread redacts, batches and writes JSONL
+- Files rotate at max_bytes, keeping `backups` older files, optionally gzip-compressed
+- read_journal() yields records back (plain or .gz) so load_test.py can replay traffic
+"""
+
+import os
+import glob
+import gzip
+import json
+import queue
+import random
+import logging
+import threading
+from typing import Any, Dict, Iterable, Iterator
+
+REDACTED = "[REDACTED]"
+
+def redact(value: Any, fields) -> Any:
+    """Copy of value with every dict entry whose key is in fields (case-insensitive) masked."""
+    if isinstance(value, dict):
+        return {k: REDACTED if str(k).lower() in fields else redact(v, fields) for k, v in value.items()}
+    if isinstance(value, list):
+        return [redact(v, fields) for v in value]
+    return value
+
+class RequestJournal:
+    def __init__(self, path: str = "journal/requests.jsonl", sample_rate: float = 1.0, redact_fields: Iterable[str] = (),
+                 max_bytes: int = 50 * 1024 * 1024, backups: int = 5, compress: bool = True,
+                 batch_size: int = 100, flush_interval: float = 1.0, queue_size: int = 10000, enabled: bool = True):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.redact_fields = {f.lower() for f in redact_fields}
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.compress = compress
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enabled = enabled
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def sampled(self) -> bool:
+        """Decide up front whether to journal a request, so unsampled ones cost nothing."""
+        return self.enabled and (self.sample_rate >= 1.0 or random.random() < self.sample_rate)
+
+    def record(self, record: Dict[str, Any]) -> bool:
+        """Enqueue without blocking; drops (and counts) the record if the writer is behind."""
+        self.start()
+        try:
+            self.queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="vibe-request-journal", daemon=True)
+                self.thread.start()
+
+    def _next_batch(self):
+        batch = [self.queue.get()]  # Block until there is something to write
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get(timeout=self.flush_interval))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        while True:
+            batch = self._next_batch()
+            try:
+                lines = "".join(json.dumps(redact(r, self.redact_fields), default=str) + "\n" for r in batch)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(lines)
+                    size = f.tell()
+                self.written += len(batch)
+                if size >= self.max_bytes:
+                    self._rotate()
+            except Exception as e:
+                self.dropped += len(batch)
+                logging.warning(f"[RequestJournal] writing {len(batch)} records failed: {e}")
+
+    def _rotate(self):
+        # requests.jsonl -> requests.jsonl.1[.gz] -> ... -> requests.jsonl.<backups>[.gz], oldest removed
+        suffix = ".gz" if self.compress else ""
+        oldest = f"{self.path}.{self.backups}{suffix}"
+        if os.path.exists(oldest):
+            os.remove(oldest)
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}{suffix}"):
+                os.replace(f"{self.path}.{i}{suffix}", f"{self.path}.{i + 1}{suffix}")
+        if self.backups <= 0:
+            os.remove(self.path)
+        elif self.compress:
+            with open(self.path, "rb") as src, gzip.open(f"{self.path}.1.gz", "wb") as dst:
+                dst.writelines(src)
+            os.remove(self.path)
+        else:
+            os.replace(self.path, f"{self.path}.1")
+        self.rotations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "sample_rate": self.sample_rate,
+            "queued": self.queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "rotations": self.rotations,
+        }
+
+def journal_files(path: str):
+    """The live file and its rotated backups, oldest first; path may also be a glob."""
+    if any(c in path for c in "*?["):
+        return sorted(glob.glob(path))
+    def backup_number(p):
+        number = p[len(path) + 1:].split(".")[0]
+        return int(number) if number.isdigit() else -1
+    backups = [p for p in glob.glob(f"{glob.escape(path)}.*") if backup_number(p) > 0]
+    backups.sort(key=backup_number, reverse=True)
+    return backups + ([path] if os.path.exists(path) else [])
+
+def read_journal(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield journal records in write order across rotated (possibly gzipped) files."""
+    for file_path in journal_files(path):
+        opener = gzip.open if file_path.endswith(".gz") else open
+        with opener(file_path, "rt", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
@@ -0,0 +1,182 @@
+"""
+Exact-match response cache for backend completions
+- Keys on model, normalized messages and sampling parameters
+- In-memory LRU bounded by entry count, with per-entry TTL
+- Optional SQLite tier that survives restarts; the memory tier is checked inline, disk reads go
+  through aget on the blocking pool, and writes plus the expiry sweep run on a background thread
+"""
+
+import json
+import time
+import atexit
+import logging
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from .concurrency import run_blocking
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600, disk_path: Optional[str] = None,
+                 endpoints: Optional[List[str]] = None, enabled: bool = True, flush_interval: float = 0.5,
+                 sweep_interval: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self.endpoints = set(endpoints or [])
+        self.entries = OrderedDict()  # key -> (expires_at, response)
+        self.lock = threading.Lock()
+        self.stats_data = {"hits": 0, "disk_hits": 0, "misses": 0, "sets": 0, "evictions": 0,
+                           "expired": 0, "bytes": 0, "bytes_served": 0}
+        self.db = None
+        self.disk_path = disk_path
+        self.db_lock = threading.Lock()  # Disk I/O never holds self.lock, so memory hits never wait on it
+        self.flush_interval = flush_interval
+        self.sweep_interval = sweep_interval
+        self.last_sweep = time.time()
+        self.pending = {}  # key -> (expires_at, serialized) not yet written to disk
+        self.thread = None
+        if disk_path:
+            self.db = sqlite3.connect(disk_path, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, expires_at REAL, response TEXT)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS responses_expires ON responses (expires_at)")
+            self.db.commit()
+
+    def enabled_for(self, endpoint: str) -> bool:
+        return self.enabled and endpoint in self.endpoints
+
+    @staticmethod
+    def make_key(model: str, messages, **params) -> str:
+        """Hash of the request; whitespace differences in message content do not change the key."""
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        normalized = [{"role": m.get("role", "user"), "content": " ".join(str(m.get("content", "")).split())}
+                      for m in messages]
+        payload = json.dumps({"model": model, "messages": normalized, "params": params}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _memory_get(self, key: str, now: float):
+        # Caller holds self.lock; returns the serialized response or None
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, response = entry
+        if expires_at > now:
+            self.entries.move_to_end(key)
+            self.stats_data["hits"] += 1
+            self.stats_data["bytes_served"] += len(response)
+            return response
+        self._remove(key)
+        self.stats_data["expired"] += 1
+        return None
+
+    def _disk_get(self, key: str, now: float) -> Optional[Any]:
+        """Read key from the disk tier and promote it to memory (blocking)."""
+        row = None
+        if self.db is not None:
+            with self.db_lock:
+                row = self.db.execute("SELECT expires_at, response FROM responses WHERE key = ?", (key,)).fetchone()
+        with self.lock:
+            if row and row[0] > now:
+                self._store(key, row[0], row[1])
+                self.stats_data["disk_hits"] += 1
+                self.stats_data["bytes_served"] += len(row[1])
+                return json.loads(row[1])
+            self.stats_data["misses"] += 1
+            return None
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self.lock:
+            response = self._memory_get(key, now)
+        if response is not None:
+            return json.loads(response)
+        return self._disk_get(key, now)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """get() for async callers: memory hits are served inline, disk lookups on the blocking pool."""
+        now = time.time()
+        with self.lock:
+            response = self._memory_get(key, now)
+            if response is None and self.db is None:
+                self.stats_data["misses"] += 1
+                return None
+        if response is not None:
+            return json.loads(response)
+        return await run_blocking(self._disk_get, key, now)
+
+    def set(self, key: str, response: Any, ttl: Optional[float] = None):
+        """Store in memory now; the disk copy is written by the background writer."""
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        serialized = json.dumps(response)
+        with self.lock:
+            self._store(key, expires_at, serialized)
+            self.stats_data["sets"] += 1
+            if self.db is not None:
+                self.pending[key] = (expires_at, serialized)
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self._run, name="vibe-cache-writer", daemon=True)
+                    self.thread.start()
+                    atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logging.warning(f"[ResponseCache] writing to {self.disk_path} failed: {e}")
+
+    def flush(self):
+        """Write pending entries to disk in one transaction, sweeping expired rows every sweep_interval."""
+        if self.db is None:
+            return
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        now = time.time()
+        sweep = now - self.last_sweep >= self.sweep_interval
+        if not pending and not sweep:
+            return
+        try:
+            with self.db_lock, self.db:
+                self.db.executemany("INSERT OR REPLACE INTO responses (key, expires_at, response) VALUES (?, ?, ?)",
+                                    [(key, expires_at, serialized) for key, (expires_at, serialized) in pending.items()])
+                if sweep:
+                    self.db.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+                    self.last_sweep = now
+        except Exception:
+            with self.lock:
+                # Keep them for the next attempt, unless a newer value was set meanwhile
+                for key, entry in pending.items():
+                    self.pending.setdefault(key, entry)
+            raise
+
+    def _store(self, key: str, expires_at: float, serialized: str):
+        # Caller holds self.lock
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = (expires_at, serialized)
+        self.stats_data["bytes"] += len(serialized)
+        while len(self.entries) > self.max_entries:
+            oldest = next(iter(self.entries))
+            self._remove(oldest)
+            self.stats_data["evictions"] += 1
+
+    def _remove(self, key: str):
+        _, serialized = self.entries.pop(key)
+        self.stats_data["bytes"] -= len(serialized)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.stats_data["hits"] + self.stats_data["disk_hits"] + self.stats_data["misses"]
+            hits = self.stats_data["hits"] + self.stats_data["disk_hits"]
+            return {
+                **self.stats_data,
+                "entries": len(self.entries),
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "endpoints": sorted(self.endpoints),
+                "disk": self.db is not None,
+            }
@@ -0,0 +1,117 @@
+"""
+Semantic response cache for near-paraphrase prompts
+- Stores (embedding, response) pairs per namespace (e.g. model + business context)
+- Returns a stored response when a new prompt's cosine similarity clears a threshold
+- Bounded: fixed slots per namespace (LRU within), LRU across namespaces, per-entry TTL
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+class _Namespace:
+    def __init__(self, capacity: int, dim: int):
+        self.matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self.valid = np.zeros(capacity, dtype=bool)
+        self.last_used = np.zeros(capacity, dtype=np.float64)
+        self.expires_at = np.zeros(capacity, dtype=np.float64)
+        self.responses: List[Any] = [None] * capacity
+        self.latencies = np.zeros(capacity, dtype=np.float64)
+
+class SemanticCache:
+    def __init__(self, threshold: float = 0.92, max_entries_per_namespace: int = 256,
+                 max_namespaces: int = 64, ttl: float = 3600, routes: Optional[List[str]] = None,
+                 enabled: bool = True):
+        self.threshold = threshold
+        self.capacity = max_entries_per_namespace
+        self.max_namespaces = max_namespaces
+        self.ttl = ttl
+        self.routes = set(routes or [])
+        self.enabled = enabled
+        self.namespaces = OrderedDict()  # namespace -> _Namespace
+        self.lock = threading.Lock()
+        self.stats_data = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0,
+                           "saved_latency_total": 0.0, "hit_similarity_total": 0.0}
+
+    def enabled_for(self, route: str) -> bool:
+        return self.enabled and route in self.routes
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, namespace: str, embedding) -> Optional[Any]:
+        """Return the stored response most similar to embedding, if it clears the threshold."""
+        query = self._normalize(embedding)
+        now = time.time()
+        with self.lock:
+            ns = self.namespaces.get(namespace)
+            if ns is None:
+                self.stats_data["misses"] += 1
+                return None
+            self.namespaces.move_to_end(namespace)
+            live = ns.valid & (ns.expires_at > now)
+            ns.valid = live
+            if not live.any():
+                self.stats_data["misses"] += 1
+                return None
+            scores = ns.matrix @ query
+            scores[~live] = -1.0
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.stats_data["misses"] += 1
+                return None
+            ns.last_used[best] = now
+            self.stats_data["hits"] += 1
+            self.stats_data["saved_latency_total"] += float(ns.latencies[best])
+            self.stats_data["hit_similarity_total"] += float(scores[best])
+            return ns.responses[best]
+
+    def store(self, namespace: str, embedding, response: Any, latency: float = 0.0):
+        """Cache a response, replacing the least recently used (or an expired) slot when full."""
+        vector = self._normalize(embedding)
+        now = time.time()
+        with self.lock:
+            ns = self.namespaces.get(namespace)
+            if ns is None:
+                ns = _Namespace(self.capacity, vector.shape[0])
+                self.namespaces[namespace] = ns
+                while len(self.namespaces) > self.max_namespaces:
+                    _, dropped = self.namespaces.popitem(last=False)
+                    self.stats_data["evictions"] += int(dropped.valid.sum())
+            self.namespaces.move_to_end(namespace)
+            free = np.flatnonzero(~ns.valid | (ns.expires_at <= now))
+            if len(free):
+                slot = int(free[0])
+            else:
+                slot = int(np.argmin(ns.last_used))
+                self.stats_data["evictions"] += 1
+            ns.matrix[slot] = vector
+            ns.valid[slot] = True
+            ns.last_used[slot] = now
+            ns.expires_at[slot] = now + self.ttl
+            ns.responses[slot] = response
+            ns.latencies[slot] = latency
+            self.stats_data["stores"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            hits = self.stats_data["hits"]
+            lookups = hits + self.stats_data["misses"]
+            return {
+                "hits": hits,
+                "misses": self.stats_data["misses"],
+                "stores": self.stats_data["stores"],
+                "evictions": self.stats_data["evictions"],
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "saved_latency_total": self.stats_data["saved_latency_total"],
+                "avg_hit_similarity": self.stats_data["hit_similarity_total"] / hits if hits else 0.0,
+                "entries": int(sum(ns.valid.sum() for ns in self.namespaces.values())),
+                "namespaces": len(self.namespaces),
+                "threshold": self.threshold,
+                "routes": sorted(self.routes),
+            }
@@ -0,0 +1,201 @@
+"""
+Pluggable shared state for usage limits, telemetry counters and the registry snapshot
+- memory://          per-process (single worker, the default)
+- sqlite:///path.db  shared by all workers on one host
+- redis://host:port  shared across hosts, with pipelined atomic increments
+All stores expose the same small interface: time-bucketed counters, sets and JSON blobs.
+Expired counters are swept at most every expire_interval seconds, not on every write.
+Calls block (disk or network), so callers keep them off the event loop or batch them.
+"""
+
+import json
+import time
+import sqlite3
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+class MemoryStateStore:
+    def __init__(self, expire_interval: float = 60.0):
+        self.expire_interval = expire_interval
+        self.last_expire = time.time()
+        self.counters = defaultdict(lambda: defaultdict(int))  # (key, bucket) -> field -> value
+        self.expiry = {}
+        self.sets = defaultdict(set)
+        self.blobs = {}
+        self.lock = threading.Lock()
+
+    def add(self, key: str, bucket: float, amounts: Dict[str, int], ttl: Optional[float] = None):
+        """Atomically add amounts to the counters of (key, bucket)."""
+        with self.lock:
+            counters = self.counters[(key, bucket)]
+            for field, amount in amounts.items():
+                counters[field] += amount
+            if ttl is not None:
+                self.expiry[(key, bucket)] = time.time() + ttl
+            self._expire()
+
+    def _expire(self):
+        # Caller holds self.lock
+        now = time.time()
+        if now - self.last_expire < self.expire_interval:
+            return
+        self.last_expire = now
+        for k in [k for k, expires_at in self.expiry.items() if expires_at <= now]:
+            self.counters.pop(k, None)
+            self.expiry.pop(k, None)
+
+    def buckets(self, key: str, starts: Iterable[float]) -> List[Tuple[float, Dict[str, int]]]:
+        """Counters for the given bucket starts of key, skipping empty and expired buckets."""
+        now = time.time()
+        with self.lock:
+            return [(s, dict(self.counters[(key, s)])) for s in starts if (key, s) in self.counters
+                    and self.expiry.get((key, s), now + 1) > now]
+
+    def add_member(self, key: str, member: str):
+        with self.lock:
+            self.sets[key].add(member)
+
+    def members(self, key: str) -> List[str]:
+        with self.lock:
+            return sorted(self.sets[key])
+
+    def set_json(self, key: str, value: Any):
+        with self.lock:
+            self.blobs[key] = json.dumps(value)
+
+    def get_json(self, key: str) -> Optional[Any]:
+        with self.lock:
+            raw = self.blobs.get(key)
+        return json.loads(raw) if raw is not None else None
+
+class SQLiteStateStore:
+    def __init__(self, path: str, busy_timeout: float = 10.0, expire_interval: float = 60.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.expire_interval = expire_interval
+        self.last_expire = 0.0
+        self.expire_lock = threading.Lock()
+        self.local = threading.local()
+        db = self._db()
+        db.execute("CREATE TABLE IF NOT EXISTS counters (key TEXT, bucket REAL, field TEXT, value INTEGER, "
+                   "expires_at REAL, PRIMARY KEY (key, bucket, field))")
+        db.execute("CREATE INDEX IF NOT EXISTS counters_expires_at ON counters (expires_at)")
+        db.execute("CREATE TABLE IF NOT EXISTS members (key TEXT, member TEXT, PRIMARY KEY (key, member))")
+        db.execute("CREATE TABLE IF NOT EXISTS blobs (key TEXT PRIMARY KEY, value TEXT)")
+        db.commit()
+
+    def _db(self) -> sqlite3.Connection:
+        # One connection per thread; SQLite serializes writers across processes
+        if not hasattr(self.local, "db"):
+            db = sqlite3.connect(self.path, timeout=self.busy_timeout)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self.local.db = db
+        return self.local.db
+
+    def add(self, key: str, bucket: float, amounts: Dict[str, int], ttl: Optional[float] = None):
+        db = self._db()
+        expires_at = time.time() + ttl if ttl is not None else None
+        with db:
+            db.executemany(
+                "INSERT INTO counters (key, bucket, field, value, expires_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (key, bucket, field) DO UPDATE SET value = value + excluded.value, expires_at = excluded.expires_at",
+                [(key, bucket, field, amount, expires_at) for field, amount in amounts.items()],
+            )
+        self._expire(db)
+
+    def _expire(self, db):
+        # Sweep in its own short transaction, and only every expire_interval per process
+        with self.expire_lock:
+            if time.time() - self.last_expire < self.expire_interval:
+                return
+            self.last_expire = time.time()
+        with db:
+            db.execute("DELETE FROM counters WHERE expires_at <= ?", (time.time(),))
+
+    def buckets(self, key: str, starts: Iterable[float]) -> List[Tuple[float, Dict[str, int]]]:
+        starts = list(starts)
+        if not starts:
+            return []
+        rows = self._db().execute(
+            "SELECT bucket, field, value FROM counters WHERE key = ? AND bucket >= ? AND bucket <= ? "
+            "AND (expires_at IS NULL OR expires_at > ?)",
+            (key, min(starts), max(starts), time.time()),
+        ).fetchall()
+        wanted = set(starts)
+        result = defaultdict(dict)
+        for bucket, field, value in rows:
+            if bucket in wanted:
+                result[bucket][field] = value
+        return sorted(result.items())
+
+    def add_member(self, key: str, member: str):
+        db = self._db()
+        with db:
+            db.execute("INSERT OR IGNORE INTO members (key, member) VALUES (?, ?)", (key, member))
+
+    def members(self, key: str) -> List[str]:
+        rows = self._db().execute("SELECT member FROM members WHERE key = ? ORDER BY member", (key,)).fetchall()
+        return [r[0] for r in rows]
+
+    def set_json(self, key: str, value: Any):
+        db = self._db()
+        with db:
+            db.execute("INSERT OR REPLACE INTO blobs (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def get_json(self, key: str) -> Optional[Any]:
+        row = self._db().execute("SELECT value FROM blobs WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+class RedisStateStore:
+    def __init__(self, url: str, prefix: str = "vibe"):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("The redis package is required for redis:// state URLs (pip install redis)") from e
+        self.redis = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+
+    def _key(self, *parts) -> str:
+        return ":".join([self.prefix, *map(str, parts)])
+
+    def add(self, key: str, bucket: float, amounts: Dict[str, int], ttl: Optional[float] = None):
+        name = self._key("c", key, bucket)
+        # MULTI/EXEC pipeline: all increments and the expiry land atomically in one round trip
+        pipe = self.redis.pipeline(transaction=True)
+        for field, amount in amounts.items():
+            pipe.hincrby(name, field, amount)
+        if ttl is not None:
+            pipe.expire(name, int(ttl) + 1)
+        pipe.execute()
+
+    def buckets(self, key: str, starts: Iterable[float]) -> List[Tuple[float, Dict[str, int]]]:
+        starts = list(starts)
+        pipe = self.redis.pipeline(transaction=False)
+        for s in starts:
+            pipe.hgetall(self._key("c", key, s))
+        return [(s, {f: int(v) for f, v in values.items()}) for s, values in zip(starts, pipe.execute()) if values]
+
+    def add_member(self, key: str, member: str):
+        self.redis.sadd(self._key("s", key), member)
+
+    def members(self, key: str) -> List[str]:
+        return sorted(self.redis.smembers(self._key("s", key)))
+
+    def set_json(self, key: str, value: Any):
+        self.redis.set(self._key("b", key), json.dumps(value))
+
+    def get_json(self, key: str) -> Optional[Any]:
+        raw = self.redis.get(self._key("b", key))
+        return json.loads(raw) if raw is not None else None
+
+def create_state_store(url: Optional[str] = None):
+    """Build a store from a URL: memory:// (default), sqlite:///path/to.db or redis://..."""
+    if not url or url.startswith("memory://"):
+        return MemoryStateStore()
+    if url.startswith("sqlite:///"):
+        return SQLiteStateStore(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisStateStore(url)
+    raise ValueError(f"Unsupported state store URL: {url}")
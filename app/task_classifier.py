@@ -1,18 +1,77 @@
 import re
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 
-# Simple rule-based classifier for MVP
+# Keywords per task, in priority order (earlier tasks win ties). This is the original
+# classifier's vocabulary; SUFFIXES covers regular inflections, and the forms it misses that
+# the original substring match still caught ("debugging", "debugger") are listed explicitly.
+TASK_KEYWORDS = {
+    "debugging": ["fix", "bug", "buggy", "error", "debug", "debugging", "debugged", "debugger"],
+    "refactoring": ["refactor", "clean up", "improve"],
+    "documentation": ["doc", "docs", "docstring", "document", "documentation", "explain"],
+    "internet-search": ["search", "google", "web"],
+    "file-operations": ["file", "read", "write", "open"],
+}
+DEFAULT_TASK = "code-generation"
+
+# Inflections accepted after any keyword ("fix" -> "fixes", "fixed", "fixing"; "improve" -> "improved")
+SUFFIXES = r"(?:s|es|d|ed|ing)?"
+
+def _trie_pattern(words: List[str]) -> str:
+    """
+    Compile words into one regex with shared prefixes factored out, so matching cost
+    depends on prompt length rather than on how many keywords there are.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node) -> str:
+        end = "" in node
+        branches = [(r"\s+" if ch == " " else re.escape(ch)) + build(child)
+                    for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if end else body
+
+    return build(trie)
+
+# Rule-based classifier: one compiled, word-bounded pass over the prompt
 class TaskClassifier:
+    def __init__(self, keywords: Optional[Dict[str, List[str]]] = None):
+        self.keywords = keywords or TASK_KEYWORDS
+        self.tasks = list(self.keywords)
+        self.keyword_task = {}
+        for task, words in self.keywords.items():
+            for word in words:
+                self.keyword_task.setdefault(" ".join(word.lower().split()), task)
+        self.pattern = re.compile(rf"\b({_trie_pattern(list(self.keyword_task))}){SUFFIXES}\b", re.IGNORECASE)
+
+    def scores(self, prompt: str) -> Dict[str, int]:
+        """Number of keyword hits per task."""
+        counts = dict.fromkeys(self.tasks, 0)
+        for match in self.pattern.finditer(prompt):
+            keyword = " ".join(match.group(1).lower().split())
+            counts[self.keyword_task[keyword]] += 1
+        return counts
+
+    def classify_with_confidence(self, prompt: str) -> Tuple[str, float, Dict[str, int]]:
+        """Return (task, confidence, scores); confidence is the winning task's share of all hits."""
+        counts = self.scores(prompt)
+        total = sum(counts.values())
+        if not total:
+            return DEFAULT_TASK, 0.0, counts
+        # max() keeps the first of equal scores, so ties go to the higher-priority task
+        task = max(self.tasks, key=lambda t: counts[t])
+        return task, counts[task] / total, counts
+
     def classify(self, prompt: str) -> str:
-        prompt = prompt.lower()
-        if any(word in prompt for word in ["fix", "bug", "error", "debug"]):
-            return "debugging"
-        if any(word in prompt for word in ["refactor", "clean up", "improve"]):
-            return "refactoring"
-        if any(word in prompt for word in ["doc", "documentation", "explain"]):
-            return "documentation"
-        if any(word in prompt for word in ["search", "google", "web"]):
-            return "internet-search"
-        if any(word in prompt for word in ["file", "read", "write", "open"]):
-            return "file-operations"
-        return "code-generation"
+        return self.classify_with_confidence(prompt)[0]
+
+    def classify_batch(self, prompts: List[str], with_confidence: bool = False) -> List:
+        if with_confidence:
+            return [self.classify_with_confidence(p)[:2] for p in prompts]
+        return [self.classify(p) for p in prompts]
@@ -1,16 +1,204 @@
+"""
+Bounded telemetry for vibe-llm
+- Raw events are kept in per-event ring buffers (max_events each), never unbounded lists
+- Streaming aggregates: labelled counters and HDR-style latency histograms
+- Summaries for /api/telemetry and Prometheus text exposition for /metrics
+"""
+
+import math
 import time
+import atexit
 import logging
-from collections import defaultdict
+import threading
+from collections import defaultdict, deque
+from typing import Any, Dict, Optional
+
+# Fixed `le` boundaries (seconds) used when exporting histograms to Prometheus
+PROMETHEUS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+class LatencyHistogram:
+    """
+    Log-linear buckets with bounded relative error (HDR-style): any value from min_value up
+    is recorded in O(1) into a sparse bucket whose width is `precision` of its value, so
+    quantiles stay within that error at a memory cost of a few hundred counters at most.
+    """
+    def __init__(self, precision: float = 0.02, min_value: float = 1e-4):
+        self.base = math.log1p(precision)
+        self.min_value = min_value
+        self.counts = defaultdict(int)  # bucket index -> count
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def _index(self, value: float) -> int:
+        return 0 if value <= self.min_value else int(math.log(value / self.min_value) / self.base) + 1
+
+    def _upper(self, index: int) -> float:
+        return self.min_value * math.exp(self.base * index)
+
+    def record(self, value: float):
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (0-1), capped at the observed max."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._upper(index), self.max)
+        return self.max
+
+    def cumulative(self, bounds):
+        """Counts of values <= each bound, for Prometheus `le` buckets."""
+        ordered = sorted(self.counts.items())
+        result, seen, i = [], 0, 0
+        for bound in bounds:
+            while i < len(ordered) and self._upper(ordered[i][0]) <= bound:
+                seen += ordered[i][1]
+                i += 1
+            result.append(seen)
+        return result
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "max": self.max if self.count else None,
+        }
+
+def _labels(labels: Dict[str, Any]):
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+def _format_labels(labels, extra=()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
 
 class Telemetry:
-    def __init__(self):
-        self.metrics = defaultdict(list)
+    def __init__(self, store=None, max_events: int = 1000, flush_interval: float = 1.0):
+        self.max_events = max_events
+        self.flush_interval = flush_interval
+        self.metrics = defaultdict(lambda: deque(maxlen=self.max_events))  # event -> recent (timestamp, value)
+        self.event_totals = defaultdict(int)  # event -> count since start, including entries dropped from the ring
+        self.counters = defaultdict(int)  # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> LatencyHistogram
+        self.store = store  # Optional shared state store for event counts across workers
+        self.pending = defaultdict(int)  # event -> count not yet written to the store
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def current_time(self) -> float:
+        return time.time()
 
     def log(self, event, value):
-        self.metrics[event].append((time.time(), value))
-        logging.info(f"[Telemetry] {event}: {value}")
+        with self.lock:
+            self.metrics[event].append((time.time(), value))
+            self.event_totals[event] += 1
+            if self.store is not None:
+                # Shared counts are written in batches by a background thread, never on the request path
+                self.pending[event] += 1
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self._run, name="vibe-telemetry-flush", daemon=True)
+                    self.thread.start()
+                    atexit.register(self.flush)
+        # Lazy %-formatting: large payloads are only stringified if INFO logging is enabled
+        logging.info("[Telemetry] %s: %s", event, value)
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = dict(self.pending), defaultdict(int)
+        if not pending:
+            return
+        try:
+            self.store.add("telemetry:events", 0, pending)
+        except Exception as e:
+            logging.warning(f"[Telemetry] shared counter update failed: {e}")
+            with self.lock:
+                for event, count in pending.items():
+                    self.pending[event] += count
+
+    def incr(self, name: str, amount: float = 1, **labels):
+        with self.lock:
+            self.counters[(name, _labels(labels))] += amount
+
+    def observe(self, name: str, seconds: float, **labels):
+        """Record a latency (seconds) into the histogram for name + labels."""
+        key = (name, _labels(labels))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram()
+            histogram.record(seconds)
 
     def get_metrics(self, event=None):
-        if event:
-            return self.metrics[event]
-        return dict(self.metrics)
+        """Recent raw events (at most max_events per event)."""
+        with self.lock:
+            if event:
+                return list(self.metrics.get(event, ()))
+            return {name: list(values) for name, values in self.metrics.items()}
+
+    def get_counts(self):
+        """Event counts across all workers sharing the store (this worker's only without one)."""
+        if self.store is None:
+            with self.lock:
+                return dict(self.event_totals)
+        buckets = self.store.buckets("telemetry:events", [0])
+        counts = dict(buckets[0][1]) if buckets else {}
+        with self.lock:
+            for event, count in self.pending.items():
+                counts[event] = counts.get(event, 0) + count
+        return counts
+
+    def summary(self) -> Dict[str, Any]:
+        """Aggregates only: event counts, counters and latency quantiles per label set."""
+        with self.lock:
+            events = {name: {"count": self.event_totals[name], "buffered": len(values),
+                             "last": values[-1][0] if values else None}
+                      for name, values in self.metrics.items()}
+            counters = defaultdict(list)
+            for (name, labels), value in self.counters.items():
+                counters[name].append({**dict(labels), "value": value})
+            latency = defaultdict(list)
+            for (name, labels), histogram in self.histograms.items():
+                latency[name].append({**dict(labels), **histogram.summary()})
+        return {"events": events, "counters": dict(counters), "latency": dict(latency)}
+
+    def prometheus(self, prefix: str = "vibe_llm") -> str:
+        """All counters and histograms in the Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            lines.append(f"# TYPE {prefix}_events_total counter")
+            for event, count in sorted(self.event_totals.items()):
+                lines.append(f"{prefix}_events_total{_format_labels([('event', event)])} {count}")
+            typed = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {prefix}_{name} counter")
+                    typed.add(name)
+                lines.append(f"{prefix}_{name}{_format_labels(labels)} {value}")
+            for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                if name not in typed:
+                    lines.append(f"# TYPE {prefix}_{name} histogram")
+                    typed.add(name)
+                for bound, count in zip(PROMETHEUS_BUCKETS, histogram.cumulative(PROMETHEUS_BUCKETS)):
+                    lines.append(f"{prefix}_{name}_bucket{_format_labels(labels, [('le', bound)])} {count}")
+                lines.append(f"{prefix}_{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {histogram.count}")
+                lines.append(f"{prefix}_{name}_sum{_format_labels(labels)} {histogram.total}")
+                lines.append(f"{prefix}_{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,212 @@
+"""
+Tokenizer-aware prompt budgeting
+- One tokenizer per model, loaded on first use and kept in a small LRU: Hugging Face
+  tokenizers for hf/vllm/rag models, tiktoken encodings for IO models (both optional;
+  without them counts fall back to ~4 characters per token)
+- fit_messages trims the oldest turns (keeping system messages and the latest turn) so a
+  chat fits the model's context window with room for the completion, and clamps max_tokens
+- truncate cuts text such as retrieved RAG context to a token budget
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD = 4  # Role and separators per chat message, as in OpenAI's accounting
+REPLY_OVERHEAD = 3  # Tokens priming the assistant reply
+
+class ContextOverflowError(ValueError):
+    """Raised when a prompt cannot fit the context window without emptying the latest turn."""
+
+class _TiktokenTokenizer:
+    def __init__(self, encoding: str):
+        import tiktoken
+        self.encoding = tiktoken.get_encoding(encoding)
+        self.model_max_length = None
+
+    def encode(self, text: str) -> List[int]:
+        return self.encoding.encode(text, disallowed_special=())
+
+    def decode(self, ids: List[int]) -> str:
+        return self.encoding.decode(ids)
+
+class _HFTokenizer:
+    def __init__(self, name: str):
+        from transformers import AutoTokenizer
+        self.tokenizer = AutoTokenizer.from_pretrained(name)
+        self.model_max_length = self.tokenizer.model_max_length
+
+    def encode(self, text: str) -> List[int]:
+        return self.tokenizer.encode(text, add_special_tokens=False)
+
+    def decode(self, ids: List[int]) -> str:
+        return self.tokenizer.decode(ids)
+
+class TokenCounter:
+    def __init__(self, default_context: int = 8192, context_windows: Optional[Dict[str, int]] = None,
+                 tokenizers: Optional[Dict[str, str]] = None, default_encoding: str = "cl100k_base",
+                 completion_reserve: int = 16, cache_size: int = 32):
+        self.default_context = default_context
+        self.context_windows = context_windows or {}  # model id -> context window in tokens
+        self.tokenizers = tokenizers or {}  # model id -> "tiktoken:<encoding>" or a Hugging Face tokenizer name
+        self.default_encoding = default_encoding
+        self.completion_reserve = completion_reserve  # Completion tokens always left free, even if max_tokens is tiny
+        self.cache_size = cache_size
+        self.cache: "OrderedDict[str, Any]" = OrderedDict()  # model id -> tokenizer, or None for the heuristic
+        self.lock = threading.Lock()
+
+    def _spec(self, model: str) -> str:
+        if model in self.tokenizers:
+            return self.tokenizers[model]
+        provider, _, name = model.partition(":") if ":" in model else ("io", "", model)
+        if provider in ("hf", "vllm", "rag"):
+            return name
+        return f"tiktoken:{self.default_encoding}"
+
+    def tokenizer(self, model: Optional[str], load: bool = True):
+        """The model's tokenizer, or None when it falls back to the character heuristic."""
+        if not model:
+            return None
+        with self.lock:
+            if model in self.cache:
+                self.cache.move_to_end(model)
+                return self.cache[model]
+        if not load:
+            return None
+        spec = self._spec(model)
+        try:
+            if spec.startswith("tiktoken:"):
+                tokenizer = _TiktokenTokenizer(spec[len("tiktoken:"):])
+            else:
+                tokenizer = _HFTokenizer(spec)
+        except Exception as e:
+            # Failures are cached too, so a missing package or offline hub is only tried once
+            logging.warning(f"[TokenCounter] no tokenizer for {model} ({spec}), estimating: {e}")
+            tokenizer = None
+        with self.lock:
+            self.cache[model] = tokenizer
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return tokenizer
+
+    def context_window(self, model: Optional[str]) -> int:
+        if model in self.context_windows:
+            return self.context_windows[model]
+        tokenizer = self.tokenizer(model)
+        # Tokenizers without a real limit report a huge sentinel model_max_length
+        limit = getattr(tokenizer, "model_max_length", None)
+        if limit and limit < 10_000_000:
+            return int(limit)
+        return self.default_context
+
+    def count(self, model: Optional[str], text: str, load: bool = True) -> int:
+        text = text or ""
+        tokenizer = self.tokenizer(model, load)
+        if tokenizer is None:
+            return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+        return len(tokenizer.encode(text))
+
+    def count_messages(self, model: Optional[str], messages, load: bool = True) -> int:
+        """Prompt tokens for a chat message list (or a plain prompt string)."""
+        if isinstance(messages, str):
+            return self.count(model, messages, load)
+        return sum(self.count(model, str(m.get("content") or ""), load) + MESSAGE_OVERHEAD
+                   for m in messages) + REPLY_OVERHEAD
+
+    def prompt_budget(self, model: Optional[str], max_tokens: int) -> int:
+        """Prompt tokens available once the completion is reserved; a huge max_tokens gets at most half the window."""
+        window = self.context_window(model)
+        return window - max(self.completion_reserve, min(max_tokens or 0, window // 2))
+
+    def truncate(self, model: Optional[str], text: str, max_tokens: int, keep: str = "head") -> str:
+        """Cut text to at most max_tokens, keeping its start ("head") or its end ("tail")."""
+        if max_tokens <= 0:
+            return ""
+        tokenizer = self.tokenizer(model)
+        if tokenizer is None:
+            limit = max_tokens * CHARS_PER_TOKEN
+            if len(text) <= limit:
+                return text
+            return text[:limit] if keep == "head" else text[-limit:]
+        ids = tokenizer.encode(text)
+        if len(ids) <= max_tokens:
+            return text
+        return tokenizer.decode(ids[:max_tokens] if keep == "head" else ids[-max_tokens:])
+
+    def fit_messages(self, model: Optional[str], messages: List[Dict[str, Any]],
+                     max_tokens: int) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """
+        Drop the oldest non-system turns until the prompt plus the completion fits the context
+        window, replacing them with a one-line note. If that is not enough, shorten system messages
+        (keeping their start), then the latest turn (keeping its end); raises ContextOverflowError
+        rather than send an empty latest turn. Returns the messages and
+        {"prompt_tokens", "max_tokens", "trimmed"}, with prompt_tokens counted on what is sent.
+        """
+        window = self.context_window(model)
+        budget = self.prompt_budget(model, max_tokens)
+        counts = [self.count(model, str(m.get("content") or "")) + MESSAGE_OVERHEAD for m in messages]
+        total = sum(counts) + REPLY_OVERHEAD
+        kept = list(range(len(messages)))
+        dropped = 0
+        # Oldest first, never the system prompt or the turn being answered
+        for i in range(len(messages) - 1):
+            if total <= budget:
+                break
+            if messages[i].get("role") == "system":
+                continue
+            kept.remove(i)
+            total -= counts[i]
+            dropped += 1
+        fitted = [messages[i] for i in kept]
+        if dropped:
+            note = {"role": "system", "content": f"[{dropped} earlier messages omitted to fit the context window]"}
+            position = next((n for n, m in enumerate(fitted) if m.get("role") != "system"), len(fitted))
+            fitted.insert(position, note)
+            total += self.count(model, note["content"]) + MESSAGE_OVERHEAD
+        earlier_system = sorted((n for n, m in enumerate(fitted[:-1]) if m.get("role") == "system"),
+                                key=lambda n: -len(str(fitted[n].get("content") or "")))
+        for n in earlier_system:
+            if total <= budget:
+                break
+            fitted[n] = self._shrink(model, fitted[n], total - budget, keep="head")
+            total = self.count_messages(model, fitted)
+        fitted = [m for m in fitted[:-1] if m.get("role") != "system" or m.get("content")] + fitted[-1:]
+        # Token boundaries can shift when text is re-encoded, so shrink the latest turn until the recount fits
+        for _ in range(3):
+            total = self.count_messages(model, fitted)
+            if total <= budget or not fitted:
+                break
+            fitted[-1] = self._shrink(model, fitted[-1], total - budget, keep="tail")
+            if not fitted[-1].get("content"):
+                raise ContextOverflowError(f"Prompt does not fit the {window}-token context window of {model} "
+                                           f"with {max_tokens} completion tokens")
+        total = self.count_messages(model, fitted)
+        if dropped:
+            logging.info(f"[TokenCounter] {model}: trimmed {dropped} messages to fit {window} tokens")
+        return fitted, {"prompt_tokens": total, "max_tokens": max(1, min(max_tokens or 1, window - total)),
+                        "trimmed": dropped}
+
+    def _shrink(self, model: Optional[str], message: Dict[str, Any], excess: int, keep: str) -> Dict[str, Any]:
+        """The message with its content cut by excess tokens."""
+        content = str(message.get("content") or "")
+        allowed = self.count(model, content) - excess
+        return {**message, "content": self.truncate(model, content, allowed, keep=keep)}
+
+    def fit_prompt(self, model: Optional[str], prompt: str, max_tokens: int) -> Tuple[str, Dict[str, int]]:
+        """Completion-style variant of fit_messages: keep the end of an over-long prompt."""
+        window = self.context_window(model)
+        budget = self.prompt_budget(model, max_tokens)
+        tokens = self.count(model, prompt)
+        if tokens > budget:
+            prompt = self.truncate(model, prompt, budget, keep="tail")
+            tokens = self.count(model, prompt)
+        return prompt, {"prompt_tokens": tokens, "max_tokens": max(1, min(max_tokens or 1, window - tokens)),
+                        "trimmed": 0}
+
+    def usage(self, model: Optional[str], prompt_tokens: int, completion: Any) -> Dict[str, int]:
+        """OpenAI-style usage block for a finished request."""
+        completion_tokens = self.count(model, completion if isinstance(completion, str) else "", load=False)
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens}
@@ -1,24 +1,258 @@
+"""
+Shell and file tools for MCP/Context7 integration
+- run_shell: blocking, for scripts and the CLI
+- astream_shell / arun_shell: asyncio subprocesses that stream output incrementally, with an
+  output byte cap, a timeout and a global concurrency limit shared by all requests; output is
+  buffered in a bounded queue, so a slow reader backpressures the command
+- read_file: byte-range, line-range and grep reads over an mmap, capped at max_read_bytes
+- iter_file / atomic_writer: streaming download and rename-on-complete writes
+"""
+
+import os
+import re
+import mmap
+import signal
+import asyncio
+import codecs
+import tempfile
 import subprocess
-from typing import Dict
+from contextlib import contextmanager
+from typing import AsyncIterator, Dict, Iterator, Optional
+
+READ_CHUNK = 4096
+STREAM_BUFFER_CHUNKS = 16  # Chunks buffered per command before the pipes stop being read
+
+class ShellBusyError(Exception):
+    """Raised when no shell slot frees up within the queue timeout."""
 
 class ToolCoordinator:
+    def __init__(self, shell_timeout: float = 10, max_output_bytes: int = 1024 * 1024,
+                 max_concurrent_shells: int = 4, queue_timeout: float = 30, max_read_bytes: int = 1024 * 1024):
+        self.shell_timeout = shell_timeout
+        self.max_read_bytes = max_read_bytes
+        self.max_output_bytes = max_output_bytes
+        self.queue_timeout = queue_timeout
+        self.shell_semaphore = asyncio.Semaphore(max_concurrent_shells)
+        self.running = 0
+
     def run_shell(self, command: str) -> Dict:
         try:
-            result = subprocess.run(command, shell=True, capture_output=True, text=True, timeout=10)
+            result = subprocess.run(command, shell=True, capture_output=True, text=True, timeout=self.shell_timeout)
             return {"stdout": result.stdout, "stderr": result.stderr, "returncode": result.returncode}
         except Exception as e:
             return {"error": str(e)}
 
-    def read_file(self, path: str) -> Dict:
+    @staticmethod
+    def _kill(proc):
+        # The shell runs in its own session, so this also stops anything it spawned
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    async def astream_shell(self, command: str, timeout: float = None) -> AsyncIterator[Dict]:
+        """
+        Yield {"stream": "stdout"|"stderr", "data": text} as output arrives, then a final
+        {"returncode", "truncated", "timed_out"}. Output past max_output_bytes or a run past
+        the timeout kills the command; so does the consumer going away.
+        """
+        timeout = self.shell_timeout if timeout is None else timeout
+        try:
+            await asyncio.wait_for(self.shell_semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise ShellBusyError(f"No shell slot free within {self.queue_timeout}s")
+        self.running += 1
+        proc = None
+        try:
+            proc = await asyncio.create_subprocess_shell(command, stdout=asyncio.subprocess.PIPE,
+                                                         stderr=asyncio.subprocess.PIPE, start_new_session=True)
+            # Bounded, so a slow consumer stalls the readers, the pipes fill up and the command
+            # blocks on write instead of its output piling up in memory until the timeout
+            queue = asyncio.Queue(maxsize=STREAM_BUFFER_CHUNKS)
+
+            async def pump(name, pipe):
+                decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+                while True:
+                    chunk = await pipe.read(READ_CHUNK)
+                    if not chunk:
+                        break
+                    await queue.put((name, len(chunk), decoder.decode(chunk)))
+                await queue.put((name, 0, decoder.decode(b"", final=True)))
+                await queue.put(None)
+
+            readers = [asyncio.ensure_future(pump("stdout", proc.stdout)),
+                       asyncio.ensure_future(pump("stderr", proc.stderr))]
+            deadline = asyncio.get_running_loop().time() + timeout
+            total = 0
+            open_streams = 2
+            truncated = timed_out = False
+            while open_streams:
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    # A full queue never makes get() wait, so check the deadline here as well
+                    timed_out = True
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), max(0.0, remaining))
+                except asyncio.TimeoutError:
+                    timed_out = True
+                    break
+                if item is None:
+                    open_streams -= 1
+                    continue
+                name, size, text = item
+                allowed = self.max_output_bytes - total
+                total += size
+                if total > self.max_output_bytes:
+                    truncated = True
+                    # Cut on the decoded text; close enough to the byte cap for display purposes
+                    if allowed > 0:
+                        yield {"stream": name, "data": text[:allowed]}
+                    break
+                if text:
+                    yield {"stream": name, "data": text}
+            if truncated or timed_out:
+                self._kill(proc)
+            for reader in readers:
+                reader.cancel()
+            await asyncio.gather(*readers, return_exceptions=True)
+            # wait() only returns once both pipes reach EOF, so discard what the killed command left in them
+            for pipe in (proc.stdout, proc.stderr):
+                while await pipe.read(READ_CHUNK):
+                    pass
+            returncode = await proc.wait()
+            yield {"returncode": returncode, "truncated": truncated, "timed_out": timed_out}
+        finally:
+            if proc is not None and proc.returncode is None:
+                self._kill(proc)
+            self.running -= 1
+            self.shell_semaphore.release()
+
+    async def arun_shell(self, command: str, timeout: float = None) -> Dict:
+        """Non-streaming form of astream_shell with the same shape as run_shell."""
+        output = {"stdout": [], "stderr": []}
+        result = {}
+        async for event in self.astream_shell(command, timeout):
+            if "stream" in event:
+                output[event["stream"]].append(event["data"])
+            else:
+                result = event
+        return {"stdout": "".join(output["stdout"]), "stderr": "".join(output["stderr"]), **result}
+
+    def read_file(self, path: str, offset: int = 0, length: Optional[int] = None, start_line: Optional[int] = None,
+                  end_line: Optional[int] = None, pattern: Optional[str] = None, ignore_case: bool = False,
+                  max_matches: int = 1000) -> Dict:
+        """
+        Read part of a file without loading it: a byte range (offset/length), a 1-based inclusive
+        line range (start_line/end_line), or the lines matching a regex (pattern). Content is
+        capped at max_read_bytes; `next_offset` tells the caller where to continue.
+        """
         try:
-            with open(path, "r") as f:
-                return {"content": f.read()}
+            size = os.path.getsize(path)
+            if size == 0:
+                # mmap cannot map an empty file
+                return {"matches": [], "truncated": False} if pattern is not None else \
+                    {"content": "", "offset": 0, "length": 0, "size": 0, "next_offset": None}
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if pattern is not None:
+                    return self._grep(mm, size, pattern, ignore_case, max_matches)
+                if start_line is not None or end_line is not None:
+                    return self._read_lines(mm, size, start_line or 1, end_line)
+                return self._read_range(mm, size, offset, length)
         except Exception as e:
             return {"error": str(e)}
 
+    def _read_range(self, mm, size, offset, length) -> Dict:
+        offset = min(max(0, offset), size)
+        length = self.max_read_bytes if length is None else min(length, self.max_read_bytes)
+        end = min(size, offset + max(0, length))
+        return {
+            "content": mm[offset:end].decode("utf-8", errors="replace"),
+            "offset": offset,
+            "length": end - offset,
+            "size": size,
+            "next_offset": end if end < size else None,
+        }
+
+    def _read_lines(self, mm, size, start_line, end_line) -> Dict:
+        pos = 0
+        for _ in range(start_line - 1):
+            newline = mm.find(b"\n", pos)
+            if newline == -1:
+                return {"content": "", "start_line": start_line, "end_line": start_line - 1, "size": size, "next_offset": None}
+            pos = newline + 1
+        end, line = pos, start_line - 1
+        limit = min(size, pos + self.max_read_bytes)
+        while end < limit and (end_line is None or line < end_line):
+            newline = mm.find(b"\n", end, limit)
+            end = limit if newline == -1 else newline + 1
+            line += 1
+        return {
+            "content": mm[pos:end].decode("utf-8", errors="replace"),
+            "start_line": start_line,
+            "end_line": line,
+            "size": size,
+            "next_offset": end if end < size else None,
+        }
+
+    def _grep(self, mm, size, pattern, ignore_case, max_matches) -> Dict:
+        # The regex scans the mapping directly; newlines are only counted between hits
+        regex = re.compile(pattern.encode(), re.MULTILINE | (re.IGNORECASE if ignore_case else 0))
+        matches, counted_to, line, last_start = [], 0, 1, -1
+        for match in regex.finditer(mm):
+            line_start = mm.rfind(b"\n", 0, match.start()) + 1
+            if line_start == last_start:
+                continue  # One entry per matching line
+            if len(matches) >= max_matches:
+                return {"matches": matches, "truncated": True}
+            line += mm[counted_to:line_start].count(b"\n")
+            counted_to = last_start = line_start
+            line_end = mm.find(b"\n", match.start())
+            line_end = size if line_end == -1 else line_end
+            matches.append({"line": line, "text": mm[line_start:min(line_end, line_start + 4096)].decode("utf-8", errors="replace")})
+        return {"matches": matches, "truncated": False}
+
+    def iter_file(self, path: str, offset: int = 0, length: Optional[int] = None, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """Yield a byte range of a file in chunks, for streaming downloads."""
+        with open(path, "rb") as f:
+            f.seek(offset)
+            remaining = length
+            while remaining is None or remaining > 0:
+                chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    @contextmanager
+    def atomic_writer(self, path: str, mode: str = "wb"):
+        """
+        Write to a temporary file beside path and rename it over path only on success,
+        so readers never see a partial file and a failed upload leaves the old one intact.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".part")
+        try:
+            # mkstemp creates 0600; keep the replaced file's mode, or the usual umask default for new files
+            if os.path.exists(path):
+                os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+            else:
+                umask = os.umask(0)
+                os.umask(umask)
+                os.chmod(tmp_path, 0o666 & ~umask)
+            with os.fdopen(fd, mode) as f:
+                yield f
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
     def write_file(self, path: str, content: str) -> Dict:
         try:
-            with open(path, "w") as f:
+            with self.atomic_writer(path, "w") as f:
                 f.write(content)
             return {"status": "written"}
         except Exception as e:
@@ -1,28 +1,206 @@
+"""
+Shared tool registry for vibe-llm
+- Discovers tools from app/tools/ by file name only; each module is imported on first use
+- Re-scans at most every check_interval seconds and reloads modules whose file changed
+- Per-tool execution mode (inline, thread or process) with a timeout and a concurrency cap,
+  taken from module attributes MODE / TIMEOUT / MAX_CONCURRENCY and overridable in config
+- Timed-out thread-mode calls cannot be stopped; they hold their concurrency slot until the
+  thread returns, so a hung tool cannot take over the shared thread pool
+"""
+
 import os
+import time
+import asyncio
+import logging
+import functools
 import importlib
-from typing import Dict, Callable
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Dict, Callable, Optional
+
+MODES = ("inline", "thread", "process")
+
+def _call_in_process(module_name, args, kwargs):
+    # Runs in a pool worker: import (once per worker) and call the tool's run()
+    return importlib.import_module(module_name).run(*args, **kwargs)
 
 class ToolRegistry:
-    def __init__(self, tools_dir="app/tools"):
+    def __init__(self, tools_dir="app/tools", package="app.tools", check_interval: float = 1.0,
+                 default_mode: str = "thread", default_timeout: float = 30.0, default_max_concurrency: int = 4,
+                 overrides: Optional[Dict[str, Dict[str, Any]]] = None, thread_workers: int = 8):
         self.tools_dir = tools_dir
-        self.tools = self._discover_tools()
-
-    def _discover_tools(self) -> Dict[str, Callable]:
-        tools = {}
-        if not os.path.exists(self.tools_dir):
-            return tools
-        for fname in os.listdir(self.tools_dir):
-            if fname.endswith(".py") and not fname.startswith("_"):
-                modname = fname[:-3]
-                mod = importlib.import_module(f"app.tools.{modname}")
-                if hasattr(mod, "run"):
-                    tools[modname] = mod.run
-        return tools
+        self.package = package
+        self.check_interval = check_interval
+        self.defaults = {"mode": default_mode, "timeout": default_timeout, "max_concurrency": default_max_concurrency}
+        self.overrides = overrides or {}
+        self.files = {}  # tool name -> mtime of its file at the last scan
+        self.modules = {}  # tool name -> (module, mtime it was loaded at)
+        self.semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.process_pools: Dict[str, ProcessPoolExecutor] = {}
+        self.thread_pool = ThreadPoolExecutor(max_workers=thread_workers, thread_name_prefix="vibe-tool")
+        self.counts = {}  # tool name -> {"calls", "errors", "timeouts"}
+        self.last_scan = 0.0
+        self.lock = threading.RLock()
+        self._scan()
+
+    def _scan(self):
+        files = {}
+        if os.path.exists(self.tools_dir):
+            for entry in os.scandir(self.tools_dir):
+                if entry.name.endswith(".py") and not entry.name.startswith("_"):
+                    files[entry.name[:-3]] = entry.stat().st_mtime
+        with self.lock:
+            for name in set(self.files) - set(files):
+                self._unload(name)
+            self.files = files
+            self.last_scan = time.time()
+
+    def _maybe_rescan(self):
+        if time.time() - self.last_scan >= self.check_interval:
+            self._scan()
+
+    def _unload(self, name):
+        # Caller holds self.lock; process workers hold the old module, so their pool goes too
+        self.modules.pop(name, None)
+        self.semaphores.pop(name, None)  # Settings may change with the new code
+        pool = self.process_pools.pop(name, None)
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _module(self, name):
+        """Import the tool on first use, or reload it if its file changed since."""
+        self._maybe_rescan()
+        with self.lock:
+            mtime = self.files.get(name)
+            if mtime is None:
+                return None
+            loaded = self.modules.get(name)
+            if loaded is not None and loaded[1] == mtime:
+                return loaded[0]
+            if loaded is not None:
+                self._unload(name)
+                module = importlib.reload(loaded[0])
+                logging.info(f"[ToolRegistry] reloaded {name}")
+            else:
+                module = importlib.import_module(f"{self.package}.{name}")
+            if not hasattr(module, "run"):
+                return None
+            self.modules[name] = (module, mtime)
+            return module
+
+    def get(self, name) -> Optional[Callable]:
+        module = self._module(name)
+        return module.run if module is not None else None
+
+    def has(self, name) -> bool:
+        self._maybe_rescan()
+        return name in self.files
+
+    def settings(self, name) -> Dict[str, Any]:
+        """Execution settings: defaults < module MODE/TIMEOUT/MAX_CONCURRENCY < config overrides."""
+        module = self._module(name)
+        settings = dict(self.defaults)
+        for key in settings:
+            if module is not None and hasattr(module, key.upper()):
+                settings[key] = getattr(module, key.upper())
+        settings.update(self.overrides.get(name, {}))
+        if settings["mode"] not in MODES:
+            raise ValueError(f"Unknown execution mode {settings['mode']} for tool {name}; expected one of {MODES}")
+        return settings
+
+    @property
+    def tools(self) -> Dict[str, Callable]:
+        """Every tool's callable (imports all of them; prefer get())."""
+        return {name: fn for name in list(self.files) if (fn := self.get(name)) is not None}
 
     def list_tools(self):
-        return list(self.tools.keys())
+        self._maybe_rescan()
+        return sorted(self.files)
 
     def run_tool(self, name, *args, **kwargs):
-        if name in self.tools:
-            return self.tools[name](*args, **kwargs)
+        fn = self.get(name)
+        if fn is not None:
+            return fn(*args, **kwargs)
         return {"error": f"Tool {name} not found"}
+
+    def _process_pool(self, name, workers) -> ProcessPoolExecutor:
+        with self.lock:
+            if name not in self.process_pools:
+                # spawn, not fork: the server process has live threads and event loops
+                self.process_pools[name] = ProcessPoolExecutor(max_workers=workers,
+                                                               mp_context=multiprocessing.get_context("spawn"))
+            return self.process_pools[name]
+
+    def _kill_process_pool(self, name):
+        with self.lock:
+            pool = self.process_pools.pop(name, None)
+        if pool is None:
+            return
+        for process in list(getattr(pool, "_processes", {}).values()):
+            process.kill()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    async def arun(self, name, args=(), kwargs=None, timeout: float = None):
+        """
+        Run a tool in its configured mode within its concurrency cap. Raises asyncio.TimeoutError
+        past the timeout; process-mode tools are killed then. Thread-mode ones can only be
+        abandoned, so they keep their concurrency slot until the thread actually returns.
+        """
+        kwargs = kwargs or {}
+        fn = self.get(name)
+        if fn is None:
+            return {"error": f"Tool {name} not found"}
+        settings = self.settings(name)
+        timeout = timeout if timeout is not None else settings["timeout"]
+        counts = self.counts.setdefault(name, {"calls": 0, "errors": 0, "timeouts": 0, "abandoned": 0})
+        if name not in self.semaphores:
+            self.semaphores[name] = asyncio.Semaphore(settings["max_concurrency"])
+        semaphore = self.semaphores[name]
+        await semaphore.acquire()
+        release = True
+        counts["calls"] += 1
+        loop = asyncio.get_running_loop()
+        try:
+            if settings["mode"] == "inline":
+                return fn(*args, **kwargs)
+            if settings["mode"] == "process":
+                pool = self._process_pool(name, settings["max_concurrency"])
+                return await asyncio.wait_for(
+                    loop.run_in_executor(pool, _call_in_process, fn.__module__, tuple(args), kwargs), timeout)
+            thread_future = self.thread_pool.submit(functools.partial(fn, *args, **kwargs))
+            try:
+                return await asyncio.wait_for(asyncio.wrap_future(thread_future), timeout)
+            except asyncio.TimeoutError:
+                if not thread_future.done():
+                    release = False
+                    counts["abandoned"] += 1
+                    thread_future.add_done_callback(lambda _: self._release_abandoned(loop, semaphore, counts))
+                raise
+        except asyncio.TimeoutError:
+            counts["timeouts"] += 1
+            if settings["mode"] == "process":
+                self._kill_process_pool(name)
+            raise
+        except Exception:
+            counts["errors"] += 1
+            raise
+        finally:
+            if release:
+                semaphore.release()
+
+    @staticmethod
+    def _release_abandoned(loop, semaphore, counts):
+        # Runs on the tool's thread once a timed-out call finally returns
+        def release():
+            counts["abandoned"] -= 1
+            semaphore.release()
+        try:
+            loop.call_soon_threadsafe(release)
+        except RuntimeError:
+            pass  # The loop that ran the call is gone, and its semaphore with it
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: {"loaded": name in self.modules, **self.counts.get(name, {"calls": 0, "errors": 0, "timeouts": 0, "abandoned": 0}),
+                       **({"settings": self.settings(name)} if name in self.modules else {})}
+                for name in self.list_tools()}
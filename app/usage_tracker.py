@@ -1,32 +1,191 @@
 import time
+import atexit
+import logging
 import threading
 from collections import defaultdict
+from .state_store import MemoryStateStore
 
 class UsageTracker:
-    def __init__(self):
-        self.usage = defaultdict(lambda: {"count": 0, "last_reset": time.time()})
-        self.locks = defaultdict(threading.Lock)
-        self.limits = defaultdict(lambda: 1000)  # Default: 1000 calls per hour per model
+    """
+    Sliding-window request and token accounting per model.
+    Usage is kept in fixed-width time buckets (default one minute) over a rolling window
+    (default one hour), so limits free up gradually instead of resetting all at once.
+    Buckets live in a state store, so a sqlite:// or redis:// store enforces limits across workers.
+    Store I/O stays off the request path: increments are buffered and written by a background
+    thread every flush_interval, and bucket reads are cached for cache_ttl seconds per model,
+    with this worker's unflushed increments always added on top.
+    """
+    def __init__(self, window: float = 3600, bucket_seconds: float = 60, default_limit: int = 1000,
+                 default_token_limit: int = None, lookahead: float = 60, rate_horizon: float = 300, store=None,
+                 flush_interval: float = 0.5, cache_ttl: float = 1.0):
+        self.window = window
+        self.bucket_seconds = bucket_seconds
+        self.lookahead = lookahead
+        self.rate_horizon = rate_horizon
+        self.store = store or MemoryStateStore()
+        self.limits = defaultdict(lambda: default_limit)  # Requests per window per model
+        self.token_limits = defaultdict(lambda: default_token_limit)  # Tokens per window; None = unlimited
+        self.flush_interval = flush_interval
+        self.cache_ttl = cache_ttl
+        self.pending = defaultdict(lambda: {"requests": 0, "tokens": 0})  # (model, bucket) -> not yet in the store
+        self.flushing = {}  # Increments being written right now, still counted until the cache refreshes
+        self.known_models = set()  # Models already added to the shared "usage:models" set
+        self.cache = {}  # model -> (fetched_at, [(bucket, {field: value})]) from the store
+        self.lock = threading.Lock()
+        self.thread = None
 
     def set_limit(self, model_id, limit):
         self.limits[model_id] = limit
 
+    def set_token_limit(self, model_id, limit):
+        self.token_limits[model_id] = limit
+
+    def _add(self, model_id, requests=0, tokens=0):
+        # Buckets are keyed by integer index so every worker agrees on the boundaries
+        with self.lock:
+            pending = self.pending[(model_id, int(time.time() // self.bucket_seconds))]
+            pending["requests"] += requests
+            pending["tokens"] += tokens
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="vibe-usage-flush", daemon=True)
+                self.thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logging.warning(f"[UsageTracker] flushing usage to the state store failed: {e}")
+
+    def flush(self):
+        """Write buffered increments to the store; on failure they are kept for the next attempt."""
+        with self.lock:
+            pending, self.pending = self.pending, defaultdict(lambda: {"requests": 0, "tokens": 0})
+            self.flushing = pending
+        written = set()
+        try:
+            for (model_id, bucket), amounts in pending.items():
+                self.store.add(f"usage:{model_id}", bucket, amounts, ttl=self.window + self.bucket_seconds)
+                written.add((model_id, bucket))
+                if model_id not in self.known_models:
+                    self.store.add_member("usage:models", model_id)
+                    self.known_models.add(model_id)
+        finally:
+            with self.lock:
+                self.flushing = {}
+                for key, amounts in pending.items():
+                    if key not in written:
+                        for field, amount in amounts.items():
+                            self.pending[key][field] += amount
+                    self.cache.pop(key[0], None)  # The store now holds what was pending
+
+    def _buckets(self, model_id, now):
+        """[(bucket_start, requests, tokens)] for buckets still inside the window."""
+        current = int(now // self.bucket_seconds)
+        oldest = int((now - self.window) // self.bucket_seconds)
+        with self.lock:
+            cached = self.cache.get(model_id)
+        if cached is None or now - cached[0] >= self.cache_ttl:
+            cached = (now, self.store.buckets(f"usage:{model_id}", range(oldest, current + 1)))
+            with self.lock:
+                self.cache[model_id] = cached
+        counts = defaultdict(lambda: [0, 0])
+        for i, c in cached[1]:
+            counts[i][0] += c.get("requests", 0)
+            counts[i][1] += c.get("tokens", 0)
+        with self.lock:
+            unflushed = list(self.pending.items()) + list(self.flushing.items())
+        for (pending_model, i), amounts in unflushed:
+            if pending_model == model_id:
+                counts[i][0] += amounts["requests"]
+                counts[i][1] += amounts["tokens"]
+        return [(i * self.bucket_seconds, r, t) for i, (r, t) in sorted(counts.items())
+                if i * self.bucket_seconds > now - self.window]
+
+    def _totals(self, buckets, now, since=None):
+        since = now - self.window if since is None else since
+        requests = tokens = 0
+        for start, r, t in buckets:
+            if start > since - self.bucket_seconds:
+                requests += r
+                tokens += t
+        return requests, tokens
+
     def increment(self, model_id):
-        with self.locks[model_id]:
-            now = time.time()
-            if now - self.usage[model_id]["last_reset"] > 3600:
-                self.usage[model_id]["count"] = 0
-                self.usage[model_id]["last_reset"] = now
-            self.usage[model_id]["count"] += 1
-            return self.usage[model_id]["count"]
-
-    def is_limited(self, model_id):
-        with self.locks[model_id]:
-            now = time.time()
-            if now - self.usage[model_id]["last_reset"] > 3600:
-                self.usage[model_id]["count"] = 0
-                self.usage[model_id]["last_reset"] = now
-            return self.usage[model_id]["count"] >= self.limits[model_id]
+        self._add(model_id, requests=1)
+
+    def record_tokens(self, model_id, tokens):
+        """Add tokens actually consumed (e.g. the OpenAI-compatible `usage.total_tokens`)."""
+        if not tokens:
+            return
+        self._add(model_id, tokens=tokens)
+
+    def is_limited(self, model_id, buckets=None, now=None):
+        now = time.time() if now is None else now
+        buckets = self._buckets(model_id, now) if buckets is None else buckets
+        requests, tokens = self._totals(buckets, now)
+        token_limit = self.token_limits[model_id]
+        return requests >= self.limits[model_id] or (token_limit is not None and tokens >= token_limit)
+
+    def projection(self, model_id, lookahead=None, buckets=None, now=None):
+        """
+        Projected (requests, tokens) in the window lookahead seconds from now: current usage,
+        plus the recent burn rate carried forward, minus buckets that will have aged out.
+        """
+        lookahead = self.lookahead if lookahead is None else lookahead
+        now = time.time() if now is None else now
+        buckets = self._buckets(model_id, now) if buckets is None else buckets
+        requests, tokens = self._totals(buckets, now)
+        recent_requests, recent_tokens = self._totals(buckets, now, since=now - self.rate_horizon)
+        expiring_requests = expiring_tokens = 0
+        for start, r, t in buckets:
+            if start <= now + lookahead - self.window:
+                expiring_requests += r
+                expiring_tokens += t
+        horizon = min(self.rate_horizon, self.window)
+        return (
+            max(0.0, requests + recent_requests / horizon * lookahead - expiring_requests),
+            max(0.0, tokens + recent_tokens / horizon * lookahead - expiring_tokens),
+        )
+
+    def will_exceed(self, model_id, est_tokens=0, lookahead=None, reserve=0.0):
+        """
+        True if this request plus projected consumption would hit the model's request or token limit.
+        reserve (0-1) holds back that share of each limit, e.g. for interactive traffic.
+        """
+        now = time.time()
+        buckets = self._buckets(model_id, now)  # One read serves both checks
+        if self.is_limited(model_id, buckets, now):
+            return True
+        requests, tokens = self.projection(model_id, lookahead, buckets, now)
+        limit = self.limits[model_id] * (1 - reserve)
+        token_limit = self.token_limits[model_id]
+        return requests + 1 > limit or (token_limit is not None and tokens + est_tokens > token_limit * (1 - reserve))
 
     def get_usage(self, model_id):
-        return self.usage[model_id]["count"]
+        now = time.time()
+        return self._totals(self._buckets(model_id, now), now)[0]
+
+    def get_budget(self, model_id):
+        """Used, limit, remaining and projected consumption for requests and tokens in the current window."""
+        now = time.time()
+        buckets = self._buckets(model_id, now)
+        requests, tokens = self._totals(buckets, now)
+        projected_requests, projected_tokens = self.projection(model_id, buckets=buckets, now=now)
+        token_limit = self.token_limits[model_id]
+        return {
+            "window_seconds": self.window,
+            "requests": {"used": requests, "limit": self.limits[model_id],
+                         "remaining": max(0, self.limits[model_id] - requests), "projected": round(projected_requests, 1)},
+            "tokens": {"used": tokens, "limit": token_limit,
+                       "remaining": None if token_limit is None else max(0, token_limit - tokens),
+                       "projected": round(projected_tokens, 1)},
+        }
+
+    def budgets(self):
+        with self.lock:
+            local = {model_id for model_id, _ in self.pending}
+        return {model_id: self.get_budget(model_id)
+                for model_id in sorted(set(self.store.members("usage:models")) | local)}
@@ -0,0 +1,59 @@
+"""
+In-memory dense vector index for small-to-medium corpora
+- Stores L2-normalized embeddings in one contiguous float32 matrix
+- Scores queries with a single matrix product and selects top-k with argpartition
+- Grows incrementally as documents are added
+"""
+
+import threading
+from typing import List, Tuple
+import numpy as np
+
+class VectorIndex:
+    def __init__(self, dim: int = 0):
+        self.dim = dim
+        self.matrix = np.zeros((0, dim), dtype=np.float32)
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    @staticmethod
+    def normalize(vectors) -> np.ndarray:
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def add(self, vectors):
+        """Append embeddings (one row per document) to the index."""
+        vectors = self.normalize(vectors)
+        with self.lock:
+            if len(self) == 0:
+                self.dim = vectors.shape[1]
+                self.matrix = vectors
+            else:
+                # Rebinding (not resizing in place) keeps concurrent searches on a consistent snapshot
+                self.matrix = np.vstack([self.matrix, vectors])
+
+    def search_batch(self, query_vectors, top_k: int = 3) -> List[List[Tuple[int, float]]]:
+        """Return (row, cosine similarity) pairs for each query, best first."""
+        matrix = self.matrix
+        queries = self.normalize(query_vectors)
+        n = matrix.shape[0]
+        if n == 0 or top_k <= 0:
+            return [[] for _ in range(queries.shape[0])]
+        k = min(top_k, n)
+        scores = queries @ matrix.T  # (queries, docs)
+        if k < n:
+            candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.tile(np.arange(n), (scores.shape[0], 1))
+        results = []
+        for row, cand in zip(scores, candidates):
+            order = cand[np.argsort(-row[cand])]
+            results.append([(int(i), float(row[i])) for i in order])
+        return results
+
+    def search(self, query_vector, top_k: int = 3) -> List[Tuple[int, float]]:
+        return self.search_batch([query_vector], top_k)[0]
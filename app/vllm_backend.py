@@ -1,17 +1,42 @@
 import os
+import asyncio
 from vllm import LLM, SamplingParams
+from .batch_scheduler import MicroBatchScheduler
 
 class VLLMBackend:
-    def __init__(self, model_name: str):
+    provider = "vllm"
+
+    def __init__(self, model_name: str, max_batch_size: int = 16, max_wait_ms: float = 10.0):
         self.model_name = model_name
         self.llm = LLM(model=model_name, dtype="auto")
+        # Concurrent requests are coalesced into one llm.generate call
+        self.scheduler = MicroBatchScheduler(self._generate_batch, max_batch_size, max_wait_ms)
 
-    def chat(self, prompt: str, max_tokens: int = 128, temperature: float = 0.7):
+    def _generate_batch(self, requests):
+        prompts = [prompt for prompt, _ in requests]
+        sampling_params = [params for _, params in requests]
+        outputs = self.llm.generate(prompts, sampling_params)
+        return [output.outputs[0].text.strip() for output in outputs]
+
+    def _submit(self, prompt: str, max_tokens: int, temperature: float):
         sampling_params = SamplingParams(
             temperature=temperature,
             max_tokens=max_tokens,
             top_p=1.0,
             stop=None
         )
-        outputs = self.llm.generate([prompt], sampling_params)
-        return outputs[0].outputs[0].text.strip()
+        return self.scheduler.submit((prompt, sampling_params))
+
+    def chat(self, prompt: str, max_tokens: int = 128, temperature: float = 0.7):
+        return self._submit(prompt, max_tokens, temperature).result()
+
+    async def achat(self, prompt: str, max_tokens: int = 128, temperature: float = 0.7):
+        # Await the batch result directly; no executor thread is held while queued
+        return await asyncio.wrap_future(self._submit(prompt, max_tokens, temperature))
+
+    async def astream(self, prompt: str, max_tokens: int = 128, temperature: float = 0.7):
+        # The offline LLM engine returns whole completions, so the stream is a single chunk
+        yield await self.achat(prompt, max_tokens, temperature)
+
+    def close(self):
+        self.scheduler.close()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""Micro-benchmark for TaskClassifier on long prompts and large vocabularies.
+
+Prompts are 10k characters (the sanitize_input cap); the vocabulary is padded with
+synthetic keywords to show classification cost as it grows:
+
+    python classifier_bench.py --vocab-sizes 30 300 3000
+"""
+import argparse
+import random
+import string
+import time
+from app.task_classifier import TaskClassifier, TASK_KEYWORDS
+
+def synthetic_keywords(count, rng):
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10))))
+    return sorted(words)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vocab-sizes", type=int, nargs="+", default=[30, 300, 3000])
+    parser.add_argument("--prompt-chars", type=int, default=10000)
+    parser.add_argument("--prompts", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    filler = "please generate a helper function for the payment module and fix the failing test ".split()
+    prompts = []
+    for _ in range(args.prompts):
+        words = []
+        while sum(len(w) + 1 for w in words) < args.prompt_chars:
+            words.append(rng.choice(filler))
+        prompts.append(" ".join(words)[:args.prompt_chars])
+
+    for size in args.vocab_sizes:
+        keywords = {task: list(words) for task, words in TASK_KEYWORDS.items()}
+        extra = synthetic_keywords(max(0, size - sum(len(w) for w in keywords.values())), rng)
+        tasks = list(keywords)
+        for i, word in enumerate(extra):
+            keywords[tasks[i % len(tasks)]].append(word)
+        classifier = TaskClassifier(keywords)
+        start = time.perf_counter()
+        classifier.classify_batch(prompts)
+        per_prompt = (time.perf_counter() - start) * 1000 / len(prompts)
+        print(f"vocab={sum(len(w) for w in keywords.values()):>6}  chars={args.prompt_chars}  per-prompt={per_prompt:.3f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Concurrent load generator for vibe-llm endpoints.
+
+Runs the same request at increasing client concurrency and reports throughput
+and latency, e.g.:
+
+    python load_test.py --url http://localhost:8000/v1/chat/completions --levels 1 4 16 64
+
+With --replay, requests recorded by the request journal (including rotated,
+gzipped files) are re-sent instead, e.g. to compare routing configs:
+
+    python load_test.py --replay journal/requests.jsonl --base-url http://localhost:8000 --levels 8
+"""
+import argparse
+import asyncio
+import json
+import time
+import httpx
+from app.request_journal import read_journal
+
+DEFAULT_BODY = {
+    "model": "io:meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo",
+    "messages": [{"role": "user", "content": "Say hello."}],
+    "max_tokens": 16,
+}
+
+async def run_level(client, requests, headers, concurrency):
+    """Send (method, url, body) requests through `concurrency` workers."""
+    latencies = []
+    errors = 0
+    total = len(requests)
+    queue = asyncio.Queue()
+    for request in requests:
+        queue.put_nowait(request)
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            method, url, body = queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                resp = await client.request(method, url, json=body, headers=headers)
+                if resp.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "throughput_rps": round(total / elapsed, 2),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000/v1/chat/completions")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests-per-client", type=int, default=8)
+    parser.add_argument("--body", help="JSON request body (defaults to a short chat completion)")
+    parser.add_argument("--api-key", help="Bearer token for authenticated endpoints")
+    parser.add_argument("--replay", help="Request journal file (or glob) to replay instead of --body")
+    parser.add_argument("--base-url", default="http://localhost:8000", help="Server to replay journaled paths against")
+    parser.add_argument("--limit", type=int, help="Replay at most this many journaled requests per level")
+    args = parser.parse_args()
+
+    if args.replay:
+        recorded = []
+        for record in read_journal(args.replay):
+            url = args.base_url.rstrip("/") + record["path"] + (f"?{record['query']}" if record.get("query") else "")
+            recorded.append((record.get("method", "POST"), url, record.get("request")))
+            if args.limit and len(recorded) >= args.limit:
+                break
+    body = json.loads(args.body) if args.body else DEFAULT_BODY
+    headers = {"Authorization": f"Bearer {args.api_key}"} if args.api_key else {}
+    limits = httpx.Limits(max_connections=max(args.levels), max_keepalive_connections=max(args.levels))
+    async with httpx.AsyncClient(timeout=120, limits=limits) as client:
+        for level in args.levels:
+            requests = recorded if args.replay else [("POST", args.url, body)] * (level * args.requests_per_client)
+            result = await run_level(client, requests, headers, level)
+            print(json.dumps(result))
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""Benchmark RAG retrieval latency against corpus size.
+
+Uses random embeddings with the all-MiniLM-L6-v2 dimensionality, so it measures
+the scoring/selection path of app.vector_index without loading any model:
+
+    python rag_bench.py --sizes 1000 10000 100000 --queries 200
+"""
+import argparse
+import time
+import numpy as np
+from app.vector_index import VectorIndex
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+    for size in args.sizes:
+        index = VectorIndex()
+        index.add(rng.standard_normal((size, args.dim), dtype=np.float32))
+        start = time.perf_counter()
+        for q in queries:
+            index.search(q, args.top_k)
+        single_ms = (time.perf_counter() - start) * 1000 / args.queries
+        start = time.perf_counter()
+        index.search_batch(queries, args.top_k)
+        batch_ms = (time.perf_counter() - start) * 1000 / args.queries
+        print(f"corpus={size:>8}  per-query={single_ms:.3f} ms  batched per-query={batch_ms:.3f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import time
+import threading
+
+import pytest
+
+from app.backend_pool import BackendPool
+
+class SlowClosingBackend:
+    def __init__(self, name, close_seconds=0.5):
+        self.name = name
+        self.close_seconds = close_seconds
+        self.closed = threading.Event()
+
+    def close(self):
+        time.sleep(self.close_seconds)
+        self.closed.set()
+
+@pytest.fixture
+def pool():
+    return BackendPool(lambda provider, model: SlowClosingBackend(model), max_instances=1, close_grace=0.05)
+
+def test_eviction_closes_outside_the_lock(pool):
+    first = pool.get("vllm", "a")
+    pool.get("vllm", "b")  # Evicts a
+    start = time.monotonic()
+    assert pool.peek("vllm", "b") is not None
+    assert time.monotonic() - start < 0.1  # Not stuck behind a's close()
+    assert first.closed.wait(5)
+    assert pool.stats()["retiring"] == 0
+
+def test_evicted_backend_stays_open_while_in_use(pool):
+    first = pool.get("vllm", "a")
+    with pool.using(first):
+        pool.get("vllm", "b")
+        time.sleep(0.3)
+        assert not first.closed.is_set()
+        assert pool.stats()["retiring"] == 1
+    assert first.closed.wait(5)
+
+def test_explicit_evict_also_waits_for_in_flight_calls(pool):
+    backend = pool.get("vllm", "a")
+    with pool.using(backend):
+        assert pool.evict("vllm", "a")
+        time.sleep(0.2)
+        assert not backend.closed.is_set()
+    assert backend.closed.wait(5)
+    assert not pool.evict("vllm", "a")
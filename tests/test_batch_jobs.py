@@ -0,0 +1,61 @@
+import json
+import asyncio
+import threading
+
+from app.batch_jobs import BatchManager
+
+def _manager(directory, execute):
+    return BatchManager(str(directory), execute, lambda body: ("io", body["model"], 10),
+                        lambda model, tokens: True, {"io": 2}, checkpoint_interval=0)
+
+def _upload(manager, count):
+    file_id, path = manager.new_file_path(owner="me")
+    with open(path, "w") as f:
+        for i in range(count):
+            f.write(json.dumps({"custom_id": f"r{i}", "url": "/v1/chat/completions",
+                                "body": {"model": "io:m", "messages": []}}) + "\n")
+    return file_id
+
+def test_batch_passes_through_finalizing_and_saves_off_the_loop(tmp_path):
+    async def execute(url, body):
+        await asyncio.sleep(0.01)
+        return 200, {"ok": True}
+    manager = _manager(tmp_path, execute)
+    saves = []
+    save = manager._save
+    manager._save = lambda batch: saves.append((batch["status"], threading.current_thread())) or save(batch)
+
+    async def scenario():
+        batch = await manager.create(_upload(manager, 5), "/v1/chat/completions", owner="me")
+        await manager.tasks[batch["id"]]
+        return manager.get(batch["id"], owner="me")
+    batch = asyncio.run(scenario())
+    assert batch["status"] == "completed"
+    assert batch["request_counts"] == {"total": 5, "completed": 5, "failed": 0}
+    assert batch["finalizing_at"] is not None
+    statuses = [status for status, _ in saves]
+    assert statuses.index("finalizing") < statuses.index("completed")
+    assert all(thread is not threading.main_thread() for _, thread in saves)
+
+def test_resumed_batch_skips_recorded_requests(tmp_path):
+    calls = []
+    async def execute(url, body):
+        calls.append(body)
+        return 200, {"ok": True}
+    manager = _manager(tmp_path, execute)
+
+    async def scenario():
+        batch = await manager.create(_upload(manager, 4), "/v1/chat/completions", owner="me")
+        manager.tasks[batch["id"]].cancel()  # The worker died before running it
+        await asyncio.sleep(0)
+        output = manager.file_path(batch["output_file_id"])
+        with open(output, "w") as f:
+            f.write(json.dumps({"custom_id": "r0"}) + "\n" + '{"custom_id": "r1"')  # Torn last line
+        restarted = _manager(tmp_path, execute)
+        restarted.resume()
+        await restarted.tasks[batch["id"]]
+        return restarted.get(batch["id"])
+    batch = asyncio.run(scenario())
+    assert batch["status"] == "completed"
+    assert len(calls) == 3
+    assert batch["request_counts"]["completed"] == 4
@@ -0,0 +1,114 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.batch_scheduler import MicroBatchScheduler
+
+class StubEngine:
+    """List-in/list-out engine that records each batch it was given."""
+
+    def __init__(self, delay=0.0, fail=False):
+        self.batches = []
+        self.delay = delay
+        self.fail = fail
+        self.lock = threading.Lock()
+
+    def __call__(self, requests):
+        with self.lock:
+            self.batches.append(list(requests))
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("engine exploded")
+        return [f"out:{r}" for r in requests]
+
+@pytest.fixture
+def make_scheduler():
+    schedulers = []
+    def make(engine, **kwargs):
+        scheduler = MicroBatchScheduler(engine, **kwargs)
+        schedulers.append(scheduler)
+        return scheduler
+    yield make
+    for scheduler in schedulers:
+        scheduler.close()
+
+def test_concurrent_requests_share_a_batch_and_get_their_own_results(make_scheduler):
+    engine = StubEngine()
+    scheduler = make_scheduler(engine, max_batch_size=64, max_wait_ms=200)
+    futures = [scheduler.submit(i) for i in range(10)]
+    assert [f.result(timeout=5) for f in futures] == [f"out:{i}" for i in range(10)]
+    assert engine.batches == [list(range(10))]
+    assert scheduler.stats()["batches"] == 1
+
+def test_max_batch_size_splits_batches(make_scheduler):
+    engine = StubEngine()
+    scheduler = make_scheduler(engine, max_batch_size=4, max_wait_ms=200)
+    futures = [scheduler.submit(i) for i in range(10)]
+    assert [f.result(timeout=5) for f in futures] == [f"out:{i}" for i in range(10)]
+    assert [len(b) for b in engine.batches] == [4, 4, 2]
+    assert scheduler.stats()["max_batch"] == 4
+
+def test_max_wait_bounds_the_wait_for_a_lone_request(make_scheduler):
+    engine = StubEngine()
+    scheduler = make_scheduler(engine, max_batch_size=16, max_wait_ms=50)
+    start = time.monotonic()
+    assert scheduler.submit("solo").result(timeout=5) == "out:solo"
+    # Flushed after max_wait_ms even though the batch never filled up
+    assert time.monotonic() - start < 1.0
+    late = scheduler.submit("late")
+    assert late.result(timeout=5) == "out:late"
+    assert engine.batches == [["solo"], ["late"]]
+
+def test_results_route_to_callers_across_threads(make_scheduler):
+    engine = StubEngine(delay=0.01)
+    scheduler = make_scheduler(engine, max_batch_size=8, max_wait_ms=20)
+    with ThreadPoolExecutor(16) as pool:
+        results = list(pool.map(lambda i: scheduler.submit(i).result(timeout=5), range(64)))
+    assert results == [f"out:{i}" for i in range(64)]
+    assert sum(len(b) for b in engine.batches) == 64
+    assert all(len(b) <= 8 for b in engine.batches)
+
+def test_engine_failure_fails_every_future_in_the_batch(make_scheduler):
+    engine = StubEngine(fail=True)
+    scheduler = make_scheduler(engine, max_batch_size=8, max_wait_ms=100)
+    futures = [scheduler.submit(i) for i in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="engine exploded"):
+            future.result(timeout=5)
+    assert scheduler.stats()["errors"] == 1
+
+def test_wrong_result_count_fails_the_batch(make_scheduler):
+    scheduler = make_scheduler(lambda requests: requests[:-1], max_batch_size=8, max_wait_ms=100)
+    futures = [scheduler.submit(i) for i in range(2)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="1 results for 2 requests"):
+            future.result(timeout=5)
+
+def test_closed_scheduler_rejects_new_requests():
+    scheduler = MicroBatchScheduler(StubEngine(), max_wait_ms=1)
+    scheduler.close()
+    with pytest.raises(RuntimeError):
+        scheduler.submit("x")
+
+def test_close_fails_requests_the_worker_never_reached():
+    started = threading.Event()
+    release = threading.Event()
+
+    def engine(requests):
+        started.set()
+        release.wait()
+        return requests
+
+    scheduler = MicroBatchScheduler(engine, max_batch_size=1, max_wait_ms=1)
+    first = scheduler.submit("first")
+    started.wait(5)
+    queued = scheduler.submit("queued")
+    scheduler.worker.join = lambda timeout=None: None  # Pretend the worker is gone
+    scheduler.worker.is_alive = lambda: False
+    scheduler.close()
+    with pytest.raises(RuntimeError, match="closed"):
+        queued.result(timeout=1)
+    release.set()
+    assert first.result(timeout=5) == "first"
@@ -0,0 +1,54 @@
+import time
+import multiprocessing
+
+import pytest
+
+from app.auth import RateLimiter
+from app.state_store import MemoryStateStore, SQLiteStateStore
+
+def _acquire(path, attempts, results):
+    # Runs in a separate process: one uvicorn worker's share of a client's traffic
+    limiter = RateLimiter(store=SQLiteStateStore(path))
+    results.put(sum(limiter.acquire("client", 30)[0] for _ in range(attempts)))
+
+def test_workers_share_one_budget(tmp_path):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    path = str(tmp_path / "state.db")
+    workers = [context.Process(target=_acquire, args=(path, 20, results)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    allowed = sum(results.get(timeout=30) for _ in workers)
+    for worker in workers:
+        worker.join(30)
+        assert worker.exitcode == 0
+    assert allowed == 30
+
+def test_refused_requests_do_not_spend_the_budget():
+    store = MemoryStateStore()
+    limiter = RateLimiter(store=store)
+    assert all(limiter.acquire("a", 3)[0] for _ in range(3))
+    for _ in range(5):
+        allowed, retry_after = limiter.acquire("a", 3)
+        assert not allowed and retry_after > 0
+    assert limiter.acquire("b", 3)[0]  # Clients are counted separately
+    assert RateLimiter(store=store).acquire("a", 4)[0]  # A higher limit still has room
+
+def test_window_slides(monkeypatch):
+    now = [10_000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    limiter = RateLimiter(store=MemoryStateStore(), period=600, bucket_seconds=60)
+    assert limiter.acquire("a", 2)[0]
+    now[0] += 120
+    assert limiter.acquire("a", 2)[0]
+    allowed, retry_after = limiter.acquire("a", 2)
+    assert not allowed
+    # The first request's bucket leaves the window first
+    assert retry_after == pytest.approx(480, abs=60)
+    now[0] += retry_after
+    assert limiter.acquire("a", 2)[0]
+    assert not limiter.acquire("a", 2)[0]
+
+def test_zero_limit_is_always_refused():
+    allowed, retry_after = RateLimiter(store=MemoryStateStore()).acquire("a", 0)
+    assert not allowed and retry_after > 0
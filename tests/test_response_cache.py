@@ -0,0 +1,50 @@
+import asyncio
+import threading
+
+from app.response_cache import ResponseCache
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ResponseCache(disk_path=path, flush_interval=60)
+    cache.set("k", {"a": 1})
+    assert ResponseCache(disk_path=path).get("k") is None  # Not written until the writer flushes
+    cache.flush()
+    reopened = ResponseCache(disk_path=path)
+    assert reopened.get("k") == {"a": 1}
+    assert reopened.stats()["disk_hits"] == 1
+    assert reopened.get("k") == {"a": 1}
+    assert reopened.stats()["hits"] == 1  # Promoted to memory
+
+def test_memory_hits_do_not_wait_for_disk(tmp_path):
+    cache = ResponseCache(disk_path=str(tmp_path / "cache.db"), flush_interval=60)
+    cache.set("k", "v")
+
+    async def lookup():
+        with cache.db_lock:  # A slow disk write in progress
+            return await asyncio.wait_for(cache.aget("k"), 1)
+    assert asyncio.run(lookup()) == "v"
+
+def test_disk_reads_run_off_the_event_loop(tmp_path):
+    path = str(tmp_path / "cache.db")
+    writer = ResponseCache(disk_path=path)
+    writer.set("k", "v")
+    writer.flush()
+    cache = ResponseCache(disk_path=path)
+    threads = []
+    original = cache._disk_get
+    cache._disk_get = lambda *a: threads.append(threading.current_thread()) or original(*a)
+
+    async def lookup():
+        return await cache.aget("k"), await cache.aget("missing")
+    assert asyncio.run(lookup()) == ("v", None)
+    assert all(t is not threading.main_thread() for t in threads) and len(threads) == 2
+    assert cache.stats()["misses"] == 1
+
+def test_expired_rows_are_swept_periodically(tmp_path):
+    cache = ResponseCache(disk_path=str(tmp_path / "cache.db"), sweep_interval=0)
+    cache.set("old", "v", ttl=-1)
+    cache.set("new", "v")
+    cache.flush()
+    cache.flush()
+    rows = cache.db.execute("SELECT key FROM responses").fetchall()
+    assert rows == [("new",)]
@@ -0,0 +1,75 @@
+import time
+import multiprocessing
+
+import pytest
+
+from app.state_store import SQLiteStateStore, MemoryStateStore, create_state_store
+from app.usage_tracker import UsageTracker
+
+def _spend(path, requests):
+    # Runs in a separate process: one worker's share of the traffic
+    tracker = UsageTracker(store=SQLiteStateStore(path))
+    for _ in range(requests):
+        tracker.increment("io:shared")
+        tracker.record_tokens("io:shared", 10)
+    tracker.flush()
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "state.db")
+
+def test_sqlite_limits_are_shared_across_processes(db_path):
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_spend, args=(db_path, 25)) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+        assert worker.exitcode == 0
+    tracker = UsageTracker(store=SQLiteStateStore(db_path), default_limit=50, default_token_limit=1000)
+    assert tracker.get_usage("io:shared") == 50
+    assert tracker.get_budget("io:shared")["tokens"]["used"] == 500
+    assert tracker.is_limited("io:shared")
+    assert "io:shared" in tracker.budgets()
+
+def test_two_trackers_on_one_database_enforce_one_limit(db_path):
+    first = UsageTracker(store=SQLiteStateStore(db_path), default_limit=4, cache_ttl=0)
+    second = UsageTracker(store=SQLiteStateStore(db_path), default_limit=4, cache_ttl=0)
+    for _ in range(2):
+        first.increment("io:m")
+        second.increment("io:m")
+    assert not first.is_limited("io:m")  # Each worker alone has only seen its own two
+    first.flush()
+    second.flush()
+    assert first.is_limited("io:m") and second.is_limited("io:m")
+    assert first.will_exceed("io:m")
+
+def test_unflushed_increments_count_locally():
+    tracker = UsageTracker(store=MemoryStateStore(), default_limit=3, flush_interval=60)
+    for _ in range(3):
+        tracker.increment("io:m")
+    assert tracker.get_usage("io:m") == 3
+    assert tracker.is_limited("io:m")
+    tracker.flush()
+    assert tracker.get_usage("io:m") == 3  # Moved to the store, not double counted
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_expired_buckets_are_not_read(backend, db_path, monkeypatch):
+    store = create_state_store("memory://" if backend == "memory" else f"sqlite:///{db_path}")
+    store.add("k", 1, {"n": 2}, ttl=10)
+    store.add("k", 2, {"n": 3}, ttl=1000)
+    assert store.buckets("k", [1, 2]) == [(1, {"n": 2}), (2, {"n": 3})]
+    # Expired rows disappear from reads even before the periodic sweep removes them
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 100)
+    assert store.buckets("k", [1, 2]) == [(2, {"n": 3})]
+
+def test_json_blobs_and_members(db_path):
+    for store in (MemoryStateStore(), SQLiteStateStore(db_path)):
+        store.set_json("registry:snapshot", {"models": [1, 2]})
+        assert store.get_json("registry:snapshot") == {"models": [1, 2]}
+        assert store.get_json("missing") is None
+        store.add_member("usage:models", "b")
+        store.add_member("usage:models", "a")
+        store.add_member("usage:models", "a")
+        assert store.members("usage:models") == ["a", "b"]
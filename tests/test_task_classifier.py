@@ -0,0 +1,68 @@
+import pytest
+
+from app.task_classifier import TaskClassifier, DEFAULT_TASK
+
+def substring_classify(prompt):
+    # The original classifier, kept as the reference for routing
+    prompt = prompt.lower()
+    for task, words in [("debugging", ["fix", "bug", "error", "debug"]),
+                        ("refactoring", ["refactor", "clean up", "improve"]),
+                        ("documentation", ["doc", "documentation", "explain"]),
+                        ("internet-search", ["search", "google", "web"]),
+                        ("file-operations", ["file", "read", "write", "open"])]:
+        if any(word in prompt for word in words):
+            return task
+    return DEFAULT_TASK
+
+# Prompts the compiled classifier must route exactly as the original substring classifier did
+BASELINE = [
+    ("Help me with debugging this", "debugging"),
+    ("We debugged it yesterday", "debugging"),
+    ("The debugger shows a null pointer", "debugging"),
+    ("This buggy loop never ends", "debugging"),
+    ("I am documenting the API", "documentation"),
+    ("Add a docstring to this method", "documentation"),
+    ("Fix the failing test", "debugging"),
+    ("This fixes the bug in the parser", "debugging"),
+    ("Why does this raise an error?", "debugging"),
+    ("Please refactor this class", "refactoring"),
+    ("Clean up the imports", "refactoring"),
+    ("This improves the cache", "refactoring"),
+    ("Explain what this function does", "documentation"),
+    ("Add docs for the CLI", "documentation"),
+    ("Write documentation for the endpoints", "documentation"),
+    ("Search the web for FastAPI examples", "internet-search"),
+    ("Google the latest release notes", "internet-search"),
+    ("Open the config and read the port", "file-operations"),
+    ("Create a sorting function", DEFAULT_TASK),
+    # Words outside the original vocabulary keep their original (default) routing
+    ("The app crashes with a traceback", DEFAULT_TASK),
+    ("Simplify this and add a comment", DEFAULT_TASK),
+    ("List the directory", DEFAULT_TASK),
+]
+
+@pytest.fixture(scope="module")
+def classifier():
+    return TaskClassifier()
+
+@pytest.mark.parametrize("prompt,task", BASELINE)
+def test_baseline_routing(classifier, prompt, task):
+    assert substring_classify(prompt) == task
+    assert classifier.classify(prompt) == task
+
+@pytest.mark.parametrize("prompt,old,new", [
+    # The intended change: keywords no longer match inside unrelated words
+    ("Update the user profile page", "file-operations", DEFAULT_TASK),
+    ("Add a docker compose setup", "documentation", DEFAULT_TASK),
+    ("Rewrite the webhook handler", "internet-search", DEFAULT_TASK),
+])
+def test_keywords_are_word_bounded(classifier, prompt, old, new):
+    assert substring_classify(prompt) == old
+    assert classifier.classify(prompt) == new
+
+def test_confidence_and_batch(classifier):
+    task, confidence, scores = classifier.classify_with_confidence("fix the bug, then explain it")
+    assert task == "debugging"
+    assert scores["debugging"] == 2 and scores["documentation"] == 1
+    assert confidence == pytest.approx(2 / 3)
+    assert classifier.classify_batch(["fix it", "docs please"]) == ["debugging", "documentation"]
@@ -0,0 +1,36 @@
+import pytest
+
+from app.token_budget import TokenCounter, ContextOverflowError
+
+MODEL = "io:test"
+
+@pytest.fixture
+def counter():
+    # Without tiktoken installed this uses the ~4 chars/token estimate; the assertions only
+    # compare against the counter's own counts, so they hold with a real tokenizer too
+    return TokenCounter(default_context=100, completion_reserve=10)
+
+def test_drops_oldest_turns_first(counter):
+    messages = [{"role": "system", "content": "be brief"}] + [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": "x" * 80} for i in range(9)]
+    fitted, budget = counter.fit_messages(MODEL, messages, 20)
+    assert fitted[0] == messages[0]
+    assert fitted[-1] == messages[-1]
+    assert budget["trimmed"] > 0
+    assert budget["prompt_tokens"] == counter.count_messages(MODEL, fitted) <= counter.prompt_budget(MODEL, 20)
+
+def test_long_system_prompt_is_shortened_not_the_question(counter):
+    messages = [{"role": "system", "content": "s" * 1000}, {"role": "user", "content": "what is up"}]
+    fitted, budget = counter.fit_messages(MODEL, messages, 20)
+    assert fitted[-1] == messages[-1]
+    assert budget["prompt_tokens"] == counter.count_messages(MODEL, fitted) <= counter.prompt_budget(MODEL, 20)
+
+def test_never_sends_an_empty_latest_turn():
+    counter = TokenCounter(default_context=16, completion_reserve=16)
+    with pytest.raises(ContextOverflowError):
+        counter.fit_messages(MODEL, [{"role": "user", "content": "hello " * 50}], 16)
+
+def test_prompt_keeps_its_end(counter):
+    prompt, budget = counter.fit_prompt(MODEL, "a" * 1000 + "END", 20)
+    assert prompt.endswith("END")
+    assert budget["prompt_tokens"] == counter.count(MODEL, prompt) <= counter.prompt_budget(MODEL, 20)
@@ -0,0 +1,36 @@
+import sys
+import shlex
+import asyncio
+
+from app.tool_coordinator import READ_CHUNK, STREAM_BUFFER_CHUNKS, ToolCoordinator
+
+def test_slow_reader_backpressures_the_command(tmp_path):
+    written = tmp_path / "written"
+    writer = ("import os, sys\n"
+              "n = 0\n"
+              "while True:\n"
+              "    n += os.write(1, b'x' * 4096)\n"
+              f"    open({str(written)!r} + '.tmp', 'w').write(str(n))\n"
+              f"    os.replace({str(written)!r} + '.tmp', {str(written)!r})\n")
+    command = f"{sys.executable} -c {shlex.quote(writer)}"
+
+    async def consume():
+        stream = ToolCoordinator(shell_timeout=1.5, max_output_bytes=10 ** 9).astream_shell(command)
+        await stream.__anext__()
+        await asyncio.sleep(1)  # Nothing is read, so the writer should block once the buffers fill
+        stalled_at = int(written.read_text())
+        final = [event async for event in stream][-1]
+        return stalled_at, final
+    stalled_at, final = asyncio.run(consume())
+    assert final["timed_out"] and not final["truncated"]
+    # The bounded queue, the pipe and the stream reader buffer hold a few hundred KB at most
+    assert stalled_at < (STREAM_BUFFER_CHUNKS * READ_CHUNK) + 4 * 1024 * 1024
+
+def test_output_cap_kills_the_command():
+    result = asyncio.run(ToolCoordinator(max_output_bytes=10000).arun_shell("yes | head -c 1000000"))
+    assert result["truncated"] and not result["timed_out"]
+    assert len(result["stdout"]) == 10000
+
+def test_small_command_completes():
+    result = asyncio.run(ToolCoordinator().arun_shell("echo out; echo err >&2; exit 3"))
+    assert result == {"stdout": "out\n", "stderr": "err\n", "returncode": 3, "truncated": False, "timed_out": False}
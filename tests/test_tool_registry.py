@@ -0,0 +1,57 @@
+import sys
+import asyncio
+
+import pytest
+
+from app.orchestrator import Orchestrator
+from app.tool_registry import ToolRegistry
+
+HANG = '''
+import threading
+MODE = "thread"
+MAX_CONCURRENCY = 2
+release = threading.Event()
+calls = []
+
+def run(seconds=None):
+    calls.append(seconds)
+    release.wait(seconds)
+    return {"ok": True}
+'''
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    package = tmp_path / "hang_tools"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    (package / "hang.py").write_text(HANG)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    registry = ToolRegistry(tools_dir=str(package), package="hang_tools", thread_workers=4)
+    yield registry
+    registry.modules.get("hang", [None])[0].release.set()
+    registry.thread_pool.shutdown(wait=True)
+    for name in [m for m in sys.modules if m.startswith("hang_tools")]:
+        del sys.modules[name]
+
+def test_timed_out_thread_keeps_its_slot_until_it_returns(registry):
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await registry.arun("hang", timeout=0.05)
+        with pytest.raises(asyncio.TimeoutError):
+            await registry.arun("hang", timeout=0.05)
+        assert registry.stats()["hang"]["abandoned"] == 2
+        # Both slots are held by hung threads, so the next call cannot even start
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(registry.arun("hang", kwargs={"seconds": 0}), 0.2)
+        assert len(registry.modules["hang"][0].calls) == 2
+        registry.modules["hang"][0].release.set()
+        assert await asyncio.wait_for(registry.arun("hang", kwargs={"seconds": 0}), 2) == {"ok": True}
+        assert registry.stats()["hang"]["abandoned"] == 0
+    asyncio.run(scenario())
+
+def test_orchestrator_does_not_retry_timed_out_thread_steps(registry):
+    orchestrator = Orchestrator(None, registry, attempts=3, backoff_base=0)
+    result = asyncio.run(orchestrator.run("t", [{"id": "a", "tool": "hang", "timeout": 0.05}]))
+    assert result["steps"]["a"]["status"] == "failed"
+    assert result["steps"]["a"]["attempts"] == 1
+    assert len(registry.modules["hang"][0].calls) == 1